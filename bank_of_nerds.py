@@ -6,12 +6,32 @@ information for the various accounts of pre-defined customers,
 as well as ones added during runtime."""
 
 import argparse
+import asyncio
+import csv
+import difflib
+import functools
+import io
+import itertools
+import os
+import sys
 import lib.menu as menu
+import lib.money as money
 import lib.account as account
+import lib.account_types as account_types
 import lib.retirement as retirement
 import lib.checking as checking
 import lib.customer as customer
+import lib.directory as directory
+import lib.export as export
+import lib.group_commit as group_commit
+import lib.id_allocator as id_allocator
+import lib.metrics as metrics
+import lib.month_end as month_end
+import lib.onboarding as onboarding
 import lib.savings as savings
+import lib.snapshot as snapshot
+import lib.sqlite_backend as sqlite_backend
+import lib.transaction_log as transaction_log
 import lib.money_market_fund as market_fund
 
 
@@ -20,7 +40,9 @@ def create_main_menu():
 
     Returns a tuple of a menu object with the program's allowable
     menu selections, a dictionary with keys and values of the
-    menu options, and a reversed dictionary of the same pairings."""
+    menu options, and a reversed dictionary of the same pairings.
+    A "Metrics" option is listed after "Quit" while metrics are
+    enabled, so the other options keep their numbers either way."""
     main_menu = menu.Menu()
     menu_dict = {}
     menu_dict_rev = {}
@@ -32,8 +54,12 @@ def create_main_menu():
         "Withdraw",
         "Deposit",
         "New Account",
+        "Find User",
+        "Bank Totals",
         "Quit",
     ]
+    if metrics.registry is not None:
+        menu_options.append("Metrics")
     for idx, selection in enumerate(menu_options, 1):
         main_menu.add_selection(selection)
         menu_dict.update({selection: str(idx)})
@@ -41,37 +67,49 @@ def create_main_menu():
     return (main_menu, menu_dict, menu_dict_rev)
 
 
-def get_input(quit_string=None, quit_idx=None):
-    """Returns sanitized user input or -1 if program should exit
+def get_input(out, quit_string=None, quit_idx=None):
+    """Prompts for and returns sanitized user input or -1 to exit
 
     Keyword arguments:
+    out -- text buffer of output not yet shown to the user
     quit_string -- word to quit program on
     quit_idx -- numerical index into main menu of the quit button
 
-    At least quit_string must be passed as an argument,
-    otherwise quit button functionality will not be performed.
-    Returns sanitized user input or -1 if the program should
-    perform either 'go-back' or a 'quit'."""
+    Used with 'yield from' inside a teller session: yields all
+    buffered output followed by a prompt, and is sent back the line
+    entered in response, or None once input has ended. At least
+    quit_string must be passed as an argument, otherwise quit
+    button functionality will not be performed. Returns sanitized
+    user input or -1 if the program should perform either 'go-back'
+    or a 'quit'."""
     while True:
-        try:
-            selection = input("> ")
-            selection = selection.title().strip()
-            if not selection:
-                continue
-            if quit_string:
-                if selection == quit_string or selection == str(quit_idx):
-                    return -1
-            break
-
-        except (KeyboardInterrupt, EOFError) as e:
+        print("> ", end="", file=out)
+        output = out.getvalue()
+        out.seek(0)
+        out.truncate()
+        selection = yield output
+        if selection is None:
+            # Input ended due to EOF or KeyboardInterrupt
             return -1
+        selection = selection.title().strip()
+        if not selection:
+            continue
+        if quit_string:
+            if selection == quit_string or selection == str(quit_idx):
+                return -1
+        return selection
 
-    return selection
 
+def generate_default_users(users):
+    """Manually generates the two required default users
 
-def generate_default_users(users_list):
-    """Manually generates the two required default users"""
-    user1 = customer.Customer("Sherri", "Perrson", 83)
+    Keyword arguments:
+    users -- Directory of all users in customer database
+
+    Returns the passed directory with both users added. They are
+    always users 1 and 2, so that journal records of them still
+    apply after a restart however new user IDs are handed out."""
+    user1 = customer.Customer("Sherri", "Perrson", 83, user_id=1)
     savings1 = savings.Savings(14356.99)
     checking1 = checking.Checking(1504.32)
     retirement1 = retirement.Retirement(43265.00)
@@ -81,28 +119,87 @@ def generate_default_users(users_list):
     user1.add_account("401K", retirement1)
     user1.add_account("Money Market Fund", market_fund1)
 
-    user2 = customer.Customer("John", "Doe", 24)
+    user2 = customer.Customer("John", "Doe", 24, user_id=2)
     savings2 = savings.Savings(25.42)
-    user2.add_account("Savings", savings1)
+    user2.add_account("Savings", savings2)
+
+    users.add(user1)
+    users.add(user2)
+    return users
 
-    users_list.append(user1)
-    users_list.append(user2)
-    return users_list
 
+def get_users(users):
+    """Returns a formatted string of all users and their IDs
 
-def get_users(users_list):
-    "Returns a formatted string of all users and their IDs"
+    users is any iterable of users, such as Directory.scan(), which
+    lists every user without keeping them all loaded."""
     legend = "(Last), (First) : (User_id)"
     final_list = [legend, "-" * len(legend)]
-    for user in users_list:
+    for user in users:
         final_list.append(
             (f"{user.last_name}, " f"{user.first_name} : {user.user_id}")
         )
     return "\n".join(final_list)
 
 
-def get_account_printout(selected_user):
-    """Returns a formatted string of a customer's account statement"""
+def get_found_users(users, text, limit=20):
+    """Returns a formatted string of the users found by name, or None
+
+    Keyword arguments:
+    users -- Directory of all users in customer database
+    text -- start of the first and/or last name of the users to find
+    limit -- most users to list
+
+    Users are listed as by get_users. None is returned if no user
+    was found."""
+    found = list(itertools.islice(users.find_by_name(text), limit + 1))
+    if not found:
+        return None
+    printout = get_users(found[:limit])
+    if len(found) > limit:
+        printout += f"\n(Only the first {limit} users found are listed)"
+    return printout
+
+
+def get_totals_printout(users, selected_user=None):
+    """Returns a formatted string of the total balance of each type
+
+    Keyword arguments:
+    users -- Directory of all users in customer database
+    selected_user -- Customer whose total is also listed, or None"""
+    legend = "(Account Type) : (Total Balance)"
+    final_list = [legend, "-" * len(legend)]
+    for account_type in account_types.TYPES:
+        cents = users.total_cents(account_type)
+        final_list.append(f"{account_type} : ${money.format_cents(cents)}")
+    final_list.append(f"Total : ${money.format_cents(users.total_cents())}")
+    if selected_user:
+        f_name = selected_user.first_name
+        l_name = selected_user.last_name
+        cents = selected_user.total_cents
+        final_list.append(
+            f"{f_name} {l_name}'s Total : ${money.format_cents(cents)}"
+        )
+    return "\n".join(final_list)
+
+
+def get_account_printout(selected_user, database=None):
+    """Returns a formatted string of a customer's account statement
+
+    Keyword arguments:
+    selected_user -- the Customer whose statement is shown
+    database -- SQLiteBackend holding the customer to read the
+        balances from with an indexed query, or None to render them
+        from the customer's accounts"""
+    with metrics.timer("bank_statement_seconds"):
+        return _render_account_printout(selected_user, database)
+
+
+def _render_account_printout(selected_user, database):
+    if database is None:
+        balances = selected_user.get_all_balances()
+    else:
+        balances = database.get_all_balances(selected_user.user_id)
     f_name = selected_user.first_name
     l_name = selected_user.last_name
     account_title = f"{f_name} {l_name}'s Accounts"
@@ -113,7 +210,7 @@ def get_account_printout(selected_user):
             "\n",
             "-" * len(account_title),
             "\n",
-            selected_user.get_all_balances(),
+            balances,
             "\n",
         )
     )
@@ -124,129 +221,421 @@ def get_args():
     """Returns the program's command line arguments"""
     parser = argparse.ArgumentParser()
     parser.add_argument("--secret", choices=("backdoor",), default="")
+    parser.add_argument(
+        "--batch",
+        type=argparse.FileType("r"),
+        metavar="FILE",
+        help="apply 'user_id:type:number:amt:op' records from FILE "
+        "('-' for stdin) instead of starting the teller",
+    )
+    parser.add_argument(
+        "--journal",
+        metavar="FILE",
+        help="replay FILE on start-up and log every change to it",
+    )
+    parser.add_argument(
+        "--snapshot",
+        metavar="FILE",
+        help="load customers from FILE on start-up and save them on exit",
+    )
+    parser.add_argument(
+        "--db",
+        metavar="FILE",
+        help="keep customers in the SQLite database FILE",
+    )
+    parser.add_argument(
+        "--export",
+        metavar="FILE",
+        help="write every account to FILE instead of starting the teller",
+    )
+    parser.add_argument(
+        "--export-format",
+        choices=("csv", "jsonl"),
+        default="csv",
+        help="format of the --export file (default: csv)",
+    )
+    parser.add_argument(
+        "--import",
+        dest="import_file",
+        metavar="FILE",
+        help="add the users and accounts of the CSV file FILE instead of "
+        "starting the teller",
+    )
+    parser.add_argument(
+        "--close-month",
+        metavar="FILE",
+        help="charge monthly fees and reset withdrawal limits of every "
+        "account, writing their closing balances to FILE, instead of "
+        "starting the teller",
+    )
+    parser.add_argument(
+        "--serve",
+        type=int,
+        metavar="PORT",
+        help="serve teller sessions over TCP on localhost PORT",
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="FILE",
+        help="record transaction metrics and write them to FILE on exit",
+    )
+    parser.add_argument(
+        "--replay",
+        type=argparse.FileType("r"),
+        metavar="FILE",
+        help="run a teller session on the lines of FILE without a console, "
+        "showing the menu only once",
+    )
+    parser.add_argument(
+        "--expect",
+        type=argparse.FileType("r"),
+        metavar="FILE",
+        help="print the differences between the output of --replay and FILE",
+    )
+    parser.add_argument(
+        "--ids",
+        metavar="FILE",
+        help="take new user IDs in blocks reserved in FILE, which may be "
+        "shared by several running programs",
+    )
     args = parser.parse_args()
+    if args.db and (args.journal or args.snapshot):
+        parser.error("--db cannot be used with --journal or --snapshot")
+    if args.expect and not args.replay:
+        parser.error("--expect can only be used with --replay")
     return args
 
 
-def perform_transaction(account_type, number, amount, user, user_func):
+def perform_transaction(
+    account_type, number, amount, user, user_func, journal=None
+):
     """Calls the passed transaction function after input validation
 
     Keyword arguments:
-    account_type -- type of account to check against below tuple
+    account_type -- name of a registered account type
     number -- account number of given type
-    amount -- amount to withdraw or deposit
+    amount -- amount to withdraw or deposit, in dollars as a string or
+        number, or in Cents
     user -- the Customer whose account is being modified
     user_func -- the function (withdraw/deposit) to perform
+    journal -- TransactionLog to record any change of balance in
 
     Performs the validation of the first three arguments to ensure
     the passed function call is safe. Returns -4 for transactional
     error, -3 for invalid account type, -2 for number or amount
-    unable to be converted to the correct data type, -1 for
+    unable to be converted to the correct data type or for an amount
+    that would take the balance out of range, -1 for
     negative values, 0 for invalid index, and 1 for success.
     Also returns an informative string detailing the transaction
-    details if relevant."""
-    account_types = ("Checking", "Savings", "Money Market Fund", "401K")
-    if account_type not in account_types:
+    details if relevant. While metrics are enabled, every return
+    code is counted by operation."""
+    result = _perform_transaction(
+        account_type, number, amount, user, user_func, journal
+    )
+    if metrics.registry is not None:
+        op = "withdraw" if user_func == user.withdraw_from else "deposit"
+        metrics.registry.inc("bank_transactions_total", op=op, code=result[0])
+    return result
+
+
+def _perform_transaction(
+    account_type, number, amount, user, user_func, journal
+):
+    kind = account_types.get(account_type)
+    if kind is None:
         # Case: invalid account type
-        return -3
-
-    return_msg = {
-        "Checking": {
-            -1: "overdraft limit exceeded", 0: "account overdrafted"},
-        "Savings": {-1: "account balance exceeded"},
-        "401K": {
-            -2: "not old enough to withdraw",
-            -1: "account balance exceeded",
-        },
-        "Money Market Fund": {
-            -2: "max monthly withdrawls: 2",
-            -1: "account balance exceeded",
-        },
-    }
+        return (-3, None)
     info_msg = None
 
     try:
         number = int(number) - 1  # Index is number - 1
-        amount = float(amount)
+        amount = money.Cents(money.to_cents(amount))
     except (TypeError, ValueError):
-        # Case: unable to convert number/amount to int or float
+        # Case: unable to convert number/amount to int or cents
         return (-2, None)
     if amount < 0 or number < 0:
         # Case: negative withdrawl/deposit amount
         return (-1, None)
     try:
-        if account_type == "401K" and user_func == user.withdraw_from:
-            rc = user_func(account_type, number, amount, user.age)
-        else:
-            rc = user_func(account_type, number, amount)
+        rc = user_func(account_type, number, amount)
+        if journal is not None and rc >= 0:
+            op = "Withdraw" if user_func == user.withdraw_from else "Deposit"
+            journal.log_transaction(user, op, account_type, number, amount)
 
         if rc < 1:
-            info_msg = return_msg[account_type][rc]
+            info_msg = kind.messages[rc]
         if rc == 1:
             return (1, None)
         return (-4, info_msg) if info_msg else (1, info_msg)
 
     except IndexError:
         return (0, None)
+    except OverflowError:
+        # Case: the balance would no longer fit, nothing was changed
+        return (-2, None)
+
+
+def run_batch(records, users, journal=None):
+    """Applies a stream of transaction records in a single pass
+
+    Keyword arguments:
+    records -- iterable of 'user_id:type:number:amt:op' strings
+    users -- Directory of all users in customer database
+    journal -- TransactionLog to record applied transactions in
+
+    Each record is validated exactly as the teller's Withdraw and
+    Deposit modes validate input, then applied with
+    perform_transaction. Blank lines are skipped. Returns a
+    dictionary of return code to the number of records that
+    produced it, using perform_transaction's codes as well as -5
+    for an unknown user_id and -6 for a malformed record."""
+    summary = {}
+    for record in records:
+        record = record.strip().title()
+        if not record:
+            continue
+        try:
+            user_id, account_type, number, amount, op = record.split(":")
+            user = users.get(int(user_id))
+        except ValueError:
+            # Case: wrong number of fields or non-numeric user_id
+            user = None
+            rc = -6
+        else:
+            if user is None:
+                rc = -5
+            elif op == "Withdraw":
+                (rc, info_msg) = perform_transaction(
+                    account_type,
+                    number,
+                    amount,
+                    user,
+                    user.withdraw_from,
+                    journal,
+                )
+            elif op == "Deposit":
+                (rc, info_msg) = perform_transaction(
+                    account_type,
+                    number,
+                    amount,
+                    user,
+                    user.deposit_into,
+                    journal,
+                )
+            else:
+                rc = -6
+        summary[rc] = summary.get(rc, 0) + 1
+    return summary
+
+
+def run_month_end(users, stream, journal=None):
+    """Closes the month for every account, writing a CSV record of each
+
+    Keyword arguments:
+    users -- Directory of all users in customer database
+    stream -- text stream to write to, opened with newline=''
+    journal -- journal to record every account charged or reset in
+
+    Fees are charged as set out in month_end.DEFAULT_FEES. The
+    program's customers are held as Customer objects rather than in
+    an AccountStore, so this is a per-account loop over them with
+    month_end.close_month_customers, not the bulk close_month pass,
+    and runs at the speed of Python method calls. Returns
+    a tuple of the number of accounts closed, the number of them
+    charged a fee, and the total of the fees charged in cents."""
+    writer = csv.writer(stream)
+    writer.writerow(("user_id", "account_type", "number", "balance", "fee"))
+    closed = charged = fees = 0
+    for user_id, account_type, number, cents, fee in (
+        month_end.close_month_customers(users, journal=journal)
+    ):
+        writer.writerow(
+            (
+                user_id,
+                account_type,
+                number,
+                money.format_cents(cents),
+                money.format_cents(fee),
+            )
+        )
+        closed += 1
+        if fee:
+            charged += 1
+            fees += fee
+    return (closed, charged, fees)
+
+
+def get_batch_summary(summary):
+    """Returns a formatted string of a batch run's return code counts"""
+    return_messages = {
+        -6: "Malformed record",
+        -5: "Unknown user",
+        -4: "Transaction failed",
+        -3: "Invalid account type",
+        -2: "Invalid type/amount",
+        -1: "Type/Amount must be positive",
+        0: "Invalid account number",
+        1: "Successful",
+    }
+    legend = "(Result) : (Records)"
+    final_list = [legend, "-" * len(legend)]
+    for rc in sorted(summary, reverse=True):
+        final_list.append(f"{return_messages[rc]} ({rc}) : {summary[rc]}")
+    final_list.append(f"Total : {sum(summary.values())}")
+    return "\n".join(final_list)
+
+
+def open_journal(path, users, offset=0, group_size=64):
+    """Replays an existing transaction log, returns it opened for writing
+
+    Keyword arguments:
+    path -- path of the log file, created if it does not exist
+    users -- Directory of all users in customer database
+    offset -- number of bytes of the log already applied to users
+    group_size -- number of records to write to disk at a time
 
+    A last record torn by a crash is cut off the log, so that new
+    records are appended after the last complete one."""
+    if os.path.exists(path):
+        end = transaction_log.replay(path, users, offset)
+        if os.path.getsize(path) > end:
+            os.truncate(path, end)
+    return transaction_log.TransactionLog(path, group_size)
 
-def secret_print(users):
+
+def open_bank(opt, group_size=64):
+    """Returns the Directory of all users and the opened journal
+
+    Keyword arguments:
+    opt -- the program's command line arguments
+    group_size -- number of journal records to write at a time
+
+    Users are loaded lazily from the '--db' database, which is also
+    returned as the journal and is seeded with the default users
+    when empty. Otherwise users are loaded lazily from the
+    '--snapshot' file if it exists, and are otherwise the default
+    users. Any '--journal' records newer than the snapshot are then
+    applied. The journal is None if neither '--db' nor '--journal'
+    was used."""
+    if opt.db:
+        database = sqlite_backend.SQLiteBackend(opt.db, group_size)
+        if not len(database):
+            database.save_customers(
+                generate_default_users(directory.Directory())
+            )
+        return (directory.Directory(database), database)
+    offset = 0
+    if opt.snapshot and os.path.exists(opt.snapshot):
+        saved_users = snapshot.Snapshot(opt.snapshot)
+        users = directory.Directory(saved_users)
+        offset = saved_users.journal_offset
+    else:
+        users = generate_default_users(directory.Directory())
+    journal = None
+    if opt.journal:
+        journal = open_journal(opt.journal, users, offset, group_size)
+    return (users, journal)
+
+
+def close_bank(opt, users, journal):
+    """Closes the journal and saves all users to the snapshot file
+
+    Keyword arguments:
+    opt -- the program's command line arguments
+    users -- Directory of all users in customer database
+    journal -- the journal opened by open_bank, or None
+
+    Metrics are also written to the '--metrics' file if used."""
+    if journal is not None:
+        journal.close()
+    if opt.metrics:
+        metrics.registry.write(opt.metrics)
+    if opt.snapshot:
+        offset = 0
+        if journal is not None:
+            offset = journal.offset
+        elif users.backing is not None:
+            offset = users.backing.journal_offset
+        snapshot.write_snapshot(opt.snapshot, users.scan(), offset)
+
+
+def secret_print(users, out=None):
     """Prints the values of the default users on start-up"""
     for user in users:
         print(
             f"{user.first_name} {user.last_name}\n",
             f"Age: {user.age} User_id: {user.user_id}\n",
-            get_account_printout(user), sep=""
+            get_account_printout(user), sep="", file=out
         )
 
 
-def select_user(users):
+def select_user(users, user_input):
     """Returns selected user, 0 if invalid option or -1 for "go-back"
 
     Keyword arguments:
-    users -- list of all users in customer databse
+    users -- Directory of all users in customer database
+    user_input -- the User_ID entered, or -1 for 'go-back'
 
+    Users are selected by their User_ID as listed by get_users.
     Returns selected user, 0 should the program produce an error,
     and -1 for 'go-back'"""
-    user_input = get_input("B")
     if user_input == -1:
         return -1
     try:
         user_input = int(user_input)
     except ValueError:
         return 0
-    if 0 < user_input <= len(users):
-        selected_user = users[user_input - 1]
-        return selected_user
-    else:
+    selected_user = users.get(user_input)
+    if selected_user is None:
         return 0
+    return selected_user
 
 
-def use_teller(opt):
-    """Allows the user to interact with the teller interface
-    
+def teller_session(
+    users, journal=None, secret=False, redraw=True, commit=True
+):
+    """Runs one session of the teller interface as a generator
+
     Keyword arguments:
-    opt -- whether or not '--secret=backdoor' was used
-    
+    users -- Directory of all users in customer database
+    journal -- journal to record every change in, or None
+    secret -- whether or not '--secret=backdoor' was used
+    redraw -- whether the main menu is shown before every selection,
+        rather than only once at the start of the session
+    commit -- whether the journal is committed after every selection,
+        rather than by the caller before showing what was yielded
+
     This function runs the main loop for accepting user input,
     parsing responses to prompts, and calling the appropriate
-    helper functions during runtime."""
+    helper functions. It never reads or prints on its own: it
+    yields everything to be shown to the user up to each prompt,
+    and is sent each line entered in response (None once input
+    has ended) until the user quits."""
     main_menu, menu_dict, menu_dict_rev = create_main_menu()
-    users = []
-    users = generate_default_users(users)
+    out = io.StringIO()
+    write = functools.partial(print, file=out)
     selected_user = None
-    account_types = ("Checking", "Savings", "Money Market Fund", "401K")
+    database = None
+    if isinstance(journal, sqlite_backend.SQLiteBackend):
+        # Statements are read back from the database the bank keeps
+        database = journal
     default_error = "No active user account, "
     back_to_menu = "returning to main menu.\n"
 
-    if opt.secret == "backdoor":
-        secret_print(users)
+    if secret:
+        secret_print(users, out)
+    if not redraw:
+        write(main_menu)
 
     while True:
+        if journal is not None and commit:
+            # Every change made by the last selection reaches the disk
+            journal.commit()
         default_error = "No active user account, "
-        print(main_menu)
+        if redraw:
+            write(main_menu)
 
-        user_input = get_input("Quit", menu_dict["Quit"])
+        user_input = yield from get_input(out, "Quit", menu_dict["Quit"])
         if user_input == -1:
             # Program exiting due to EOF, KeyboardInterrupt, or "quit"
             return
@@ -258,14 +647,21 @@ def use_teller(opt):
             user_input = menu_dict_rev[user_input]
         else:
             # User passed unrecognized selection
-            print("Unrecognized selection, please try again.")
+            write("Unrecognized selection, please try again.")
             continue
 
         if user_input == "Get Users":
-            print("\n", get_users(users), "\n", sep="")
+            write("\n", get_users(users.scan()), "\n", sep="")
+
+        elif user_input == "Bank Totals":
+            totals = get_totals_printout(users, selected_user)
+            write("\n", totals, "\n", sep="")
+
+        elif user_input == "Metrics":
+            write("\n", metrics.registry.render(), sep="")
 
         elif user_input == "New User":
-            print(
+            write(
                 "User Account creation mode:",
                 "\n" "Provide name and age by 'first:last:age': (B for back)",
                 "\n",
@@ -273,13 +669,13 @@ def use_teller(opt):
                 "\n",
                 sep="",
             )
-            user_input = get_input("B")
+            user_input = yield from get_input(out, "B")
             if user_input == -1:
                 continue
             try:
                 f_name, l_name, age = user_input.split(":")
             except ValueError:
-                print(
+                write(
                     "\n",
                     "Incorrect number of values provided, ",
                     back_to_menu,
@@ -290,7 +686,7 @@ def use_teller(opt):
             try:
                 age = int(age)
                 if age < 0 or age > 120:
-                    print(
+                    write(
                         "\n",
                         "Invalid age supplied, ",
                         back_to_menu,
@@ -299,45 +695,83 @@ def use_teller(opt):
                     )
                     continue
             except (ValueError, TypeError):
-                print("\n", "Invalid age field, ", back_to_menu, "\n", sep="")
+                write("\n", "Invalid age field, ", back_to_menu, "\n", sep="")
                 continue
-            users.append(customer.Customer(f_name, l_name, age))
-            print("\n", "User account added successfully.", "\n", sep="")
+            with metrics.timer("bank_new_user_seconds"):
+                new_user = users.add(customer.Customer(f_name, l_name, age))
+                if journal is not None:
+                    journal.log_customer(new_user)
+            write("\n", "User account added successfully.", "\n", sep="")
 
         elif user_input == "Select User":
-            print(
+            write(
                 "\n",
-                get_users(users),
+                get_users(users.scan()),
                 "\n\n",
                 "Enter a User_ID from the above list: (B for back)",
                 "\n",
                 sep="",
             )
             default_error = "Invalid ID, "
-            return_code = select_user(users)
+            user_input = yield from get_input(out, "B")
+            return_code = select_user(users, user_input)
+            if return_code == -1:
+                continue
+            if return_code == 0:
+                write("\n", default_error, back_to_menu, "\n", sep="")
+            selected_user = return_code
+
+        elif user_input == "Find User":
+            write(
+                "User search mode:",
+                "\n",
+                "Provide the start of a first and/or last name: (B for back)",
+                "\n",
+                "ex. 'jo sm'",
+                "\n",
+                sep="",
+            )
+            user_input = yield from get_input(out, "B")
+            if user_input == -1:
+                continue
+            found = get_found_users(users, user_input)
+            if found is None:
+                write("\n", "No users found, ", back_to_menu, "\n", sep="")
+                continue
+            write(
+                "\n",
+                found,
+                "\n\n",
+                "Enter a User_ID from the above list: (B for back)",
+                "\n",
+                sep="",
+            )
+            user_input = yield from get_input(out, "B")
+            return_code = select_user(users, user_input)
             if return_code == -1:
                 continue
             if return_code == 0:
-                print("\n", default_error, back_to_menu, "\n", sep="")
+                write("\n", "Invalid ID, ", back_to_menu, "\n", sep="")
+                continue
             selected_user = return_code
 
         elif user_input == "Display Accounts":
             if not selected_user:
-                print("\n", default_error, back_to_menu, sep="")
+                write("\n", default_error, back_to_menu, sep="")
                 continue
-            print(get_account_printout(selected_user))
+            write(get_account_printout(selected_user, database))
 
         elif user_input in ("Withdraw", "Deposit"):
             if not selected_user:
-                print("\n", default_error, back_to_menu, sep="")
+                write("\n", default_error, back_to_menu, sep="")
                 continue
             transaction_type = user_input
             if user_input == "Withdraw":
                 user_func = selected_user.withdraw_from
             else:
                 user_func = selected_user.deposit_into
-            print(get_account_printout(selected_user))
-            print(
+            write(get_account_printout(selected_user, database))
+            write(
                 f"{transaction_type} mode:",
                 "\n" "Select account by 'type:number:amt': (B for back)",
                 "\n",
@@ -345,13 +779,13 @@ def use_teller(opt):
                 "\n",
                 sep="",
             )
-            user_input = get_input("B")
+            user_input = yield from get_input(out, "B")
             if user_input == -1:
                 continue
             try:
                 account_type, number, amount = user_input.split(":")
             except ValueError:
-                print(
+                write(
                     "\n",
                     "Incorrect number of values provided, ",
                     back_to_menu,
@@ -360,7 +794,12 @@ def use_teller(opt):
                 )
                 continue
             (rc, info_msg) = perform_transaction(
-                account_type, number, amount, selected_user, user_func
+                account_type,
+                number,
+                amount,
+                selected_user,
+                user_func,
+                journal,
             )
             return_messages = {
                 -4: "Transaction failed",
@@ -371,7 +810,7 @@ def use_teller(opt):
                 1: f"{transaction_type} successful",
             }
             if info_msg:
-                print(
+                write(
                     "\n",
                     return_messages[rc],
                     ": ",
@@ -382,13 +821,13 @@ def use_teller(opt):
                     sep="",
                 )
                 continue
-            print("\n", return_messages[rc], " ", back_to_menu, "\n", sep="")
+            write("\n", return_messages[rc], " ", back_to_menu, "\n", sep="")
 
         elif user_input == "New Account":
             if not selected_user:
-                print("\n", default_error, back_to_menu, sep="")
+                write("\n", default_error, back_to_menu, sep="")
                 continue
-            print(
+            write(
                 "Account creation mode:",
                 "\n"
                 "Provide type & initial amount by 'type:amt': (B for back)",
@@ -397,13 +836,13 @@ def use_teller(opt):
                 "\n",
                 sep="",
             )
-            user_input = get_input("B")
+            user_input = yield from get_input(out, "B")
             if user_input == -1:
                 continue
             try:
                 account_type, amount = user_input.split(":")
             except ValueError:
-                print(
+                write(
                     "\n",
                     "Incorrect number of values provided, ",
                     back_to_menu,
@@ -412,9 +851,9 @@ def use_teller(opt):
                 )
                 continue
             try:
-                amount = float(amount)
+                amount = money.parse_cents(amount)
                 if amount < 0:
-                    print(
+                    write(
                         "\n",
                         "Initiial amount must be positve, ",
                         back_to_menu,
@@ -423,7 +862,7 @@ def use_teller(opt):
                     )
                     continue
             except ValueError:
-                print(
+                write(
                     "\n",
                     "Amount must be a valid number, ",
                     back_to_menu,
@@ -431,31 +870,245 @@ def use_teller(opt):
                     sep="",
                 )
                 continue
-            if account_type not in account_types:
-                print(
+            kind = account_types.get(account_type)
+            if kind is None:
+                write(
                     "\n", "Invalid account type, ", back_to_menu, "\n", sep=""
                 )
                 continue
-            account_classes = {
-                "Checking": checking.Checking,
-                "Savings": savings.Savings,
-                "401K": retirement.Retirement,
-                "Money Market Fund": market_fund.MoneyMarket,
-            }
-            new_account = account_classes[account_type](amount)
-            selected_user.add_account(account_type, new_account)
-            print("\n", "Account added successfully.", "\n", sep="")
+            with metrics.timer("bank_new_account_seconds"):
+                new_account = kind.account_class(amount)
+                selected_user.add_account(account_type, new_account)
+                if journal is not None:
+                    journal.log_account(
+                        selected_user, account_type, new_account
+                    )
+            write("\n", "Account added successfully.", "\n", sep="")
+
+
+def use_teller(opt):
+    """Allows the user to interact with the teller interface
+
+    Keyword arguments:
+    opt -- the program's command line arguments
+
+    Runs a single teller session on the console until the user
+    quits, with the bank loaded and saved by open_bank/close_bank."""
+    users, journal = open_bank(opt)
+    session = teller_session(users, journal, opt.secret == "backdoor")
+    output = next(session)
+    while True:
+        print(output, end="")
+        try:
+            line = input()
+        except (KeyboardInterrupt, EOFError):
+            line = None
+        try:
+            output = session.send(line)
+        except StopIteration:
+            break
+    close_bank(opt, users, journal)
+
+
+def replay_session(lines, users, journal=None, secret=False):
+    """Returns all output of a teller session run on recorded input
+
+    Keyword arguments:
+    lines -- iterable of the lines entered, in order
+    users -- Directory of all users in customer database
+    journal -- journal to record every change in, or None
+    secret -- whether or not '--secret=backdoor' was used
+
+    The main menu is only shown at the start of the session. Once
+    the lines run out, the session is ended as it would be by the
+    end of console input."""
+    session = teller_session(users, journal, secret, redraw=False)
+    entered = itertools.chain(
+        (line.rstrip("\r\n") for line in lines), itertools.repeat(None)
+    )
+    out = io.StringIO()
+    out.write(next(session))
+    try:
+        while True:
+            out.write(session.send(next(entered)))
+    except StopIteration:
+        pass
+    return out.getvalue()
+
+
+def get_session_diff(expected, output, expected_name="expected"):
+    """Returns a unified diff of replayed output against what was expected
+
+    The diff is empty when the output matches exactly."""
+    return "".join(
+        difflib.unified_diff(
+            expected.splitlines(keepends=True),
+            output.splitlines(keepends=True),
+            expected_name,
+            "replay",
+        )
+    )
+
+
+async def serve_teller(reader, writer, users, journal, committer=None):
+    """Runs one teller session over a connected TCP stream
+
+    Keyword arguments:
+    reader -- asyncio StreamReader of the connection
+    writer -- asyncio StreamWriter of the connection
+    users -- Directory of all users in customer database
+    journal -- journal to record every change in, or None
+    committer -- GroupCommitter of the journal shared by every
+        session, or None to give the session one of its own
+
+    The journal is committed by a worker thread rather than the
+    event loop, and nothing is sent to the teller until every change
+    they made has been committed."""
+    if journal is not None and committer is None:
+        committer = group_commit.GroupCommitter(journal)
+    session = teller_session(users, journal, commit=False)
+    try:
+        output = next(session)
+        while True:
+            writer.write(output.encode())
+            await writer.drain()
+            line = await reader.readline()
+            line = line.decode().rstrip("\r\n") if line else None
+            try:
+                output = session.send(line)
+            except StopIteration:
+                break
+            finally:
+                if committer is not None:
+                    await committer.commit()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def run_server(opt, port, host="127.0.0.1"):
+    """Serves teller sessions sharing one bank until cancelled
+
+    Keyword arguments:
+    opt -- the program's command line arguments
+    port -- TCP port to listen on
+    host -- address to listen on
+
+    Every connection gets its own session, with its own selected
+    user, on the same Directory of users. The journal is committed
+    after every selection by a GroupCommitter shared by all of the
+    sessions, so it is opened to hold many records at a time."""
+    users, journal = open_bank(opt, group_size=4096)
+    committer = None
+    if journal is not None:
+        committer = group_commit.GroupCommitter(journal)
+    server = await asyncio.start_server(
+        functools.partial(
+            serve_teller, users=users, journal=journal, committer=committer
+        ),
+        host,
+        port,
+    )
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        close_bank(opt, users, journal)
 
 
 def main():
-    """Parses command-line options and cals the main teller loop"""
+    """Parses command-line options and cals the main teller loop
+
+    Returns the program's exit status, 1 if a replayed session did
+    not match the '--expect' file and 0 otherwise."""
     opt = get_args()
+    if opt.metrics:
+        metrics.enable()
+    if opt.ids:
+        customer.Customer.allocator = id_allocator.IdAllocator(opt.ids)
+    if opt.batch:
+        users, journal = open_bank(opt, group_size=4096)
+        with opt.batch:
+            summary = run_batch(opt.batch, users, journal)
+        close_bank(opt, users, journal)
+        print(get_batch_summary(summary))
+        return 0
+    if opt.import_file:
+        users, journal = open_bank(opt, group_size=4096)
+        with open(
+            opt.import_file, encoding="utf-8", newline="", buffering=1 << 20
+        ) as import_file:
+            summary = onboarding.import_csv(
+                import_file, users, journal, sys.stdout
+            )
+        close_bank(opt, users, journal)
+        print(
+            f"Imported {summary.customers} users with {summary.accounts} "
+            f"accounts, rejected {summary.rejected} rows"
+        )
+        return 0
+    if opt.close_month:
+        users, journal = open_bank(opt, group_size=4096)
+        with open(
+            opt.close_month,
+            "w",
+            encoding="utf-8",
+            newline="",
+            buffering=1 << 20,
+        ) as closing_file:
+            closed, charged, fees = run_month_end(
+                users, closing_file, journal
+            )
+        close_bank(opt, users, journal)
+        print(
+            f"Closed the month for {closed} accounts, charged {charged} "
+            f"fees totalling ${money.format_cents(fees)}"
+        )
+        return 0
+    if opt.export:
+        users, journal = open_bank(opt)
+        writers = {"csv": export.write_csv, "jsonl": export.write_jsonl}
+        with open(
+            opt.export, "w", encoding="utf-8", newline="", buffering=1 << 20
+        ) as export_file:
+            count = writers[opt.export_format](users.scan(), export_file)
+        if journal is not None:
+            journal.close()
+        print(f"Exported {count} accounts to {opt.export}")
+        return 0
+    if opt.serve:
+        asyncio.run(run_server(opt, opt.serve))
+        return 0
+    if opt.replay:
+        users, journal = open_bank(opt)
+        with opt.replay:
+            output = replay_session(
+                opt.replay, users, journal, opt.secret == "backdoor"
+            )
+        close_bank(opt, users, journal)
+        if not opt.expect:
+            print(output, end="")
+            return 0
+        with opt.expect:
+            diff = get_session_diff(opt.expect.read(), output, opt.expect.name)
+        if diff:
+            print(diff, end="")
+            return 1
+        print(f"Replayed session matches {opt.expect.name}")
+        return 0
     use_teller(opt)
+    return 0
 
 
 if __name__ == "__main__":
+    status = 0
     try:
-        main()
+        status = main()
     except (Exception, GeneratorExit, KeyboardInterrupt, SystemExit) as e:
         name = type(e).__name__
         print("Exception of type", name, "prevented program from continuing!")
+        # Keeps the status of an exit, such as a usage error's
+        status = e.code if isinstance(e, SystemExit) else 1
+    # Exits outside the handler above, which would catch SystemExit
+    sys.exit(status)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""Time the core transaction and statement paths of the teller
+
+Each benchmark is run against a book of generated customers for every
+combination of the requested customer counts and accounts per
+customer, and reports the best time per operation of several runs.
+Results are printed as one JSON object per line, and can be saved
+and compared against a later run to spot regressions:
+
+    python -m bench.benchmarks --output before.jsonl
+    python -m bench.benchmarks --compare before.jsonl
+
+With --shards, batches of deposits are also run through a ShardedBank
+of each given number of worker processes, to measure how throughput
+scales with the cores available:
+
+    python -m bench.benchmarks --only ShardedBank --shards 1 2 4 8"""
+
+import argparse
+import itertools
+import json
+import platform
+import subprocess
+import sys
+import timeit
+
+import bank_of_nerds
+from lib.checking import Checking
+from lib.customer import Customer
+from lib.directory import Directory
+from lib.money import Cents
+from lib.money_market_fund import MoneyMarket
+from lib.retirement import Retirement
+from lib.savings import Savings
+from lib.shard import ShardedBank
+
+# Requests sent to a ShardedBank at a time by its benchmark
+SHARD_BATCH = 10000
+
+ACCOUNT_CLASSES = (
+    ("Checking", Checking),
+    ("Savings", Savings),
+    ("401K", Retirement),
+    ("Money Market Fund", MoneyMarket),
+)
+
+
+def build_book(customers, accounts):
+    """Returns a Directory of customers each holding the given accounts
+
+    Accounts cycle through every account type, and every balance is
+    large enough for the benchmarks never to run an account dry."""
+    users = Directory()
+    for n in range(customers):
+        user = Customer("John", f"Doe{n}", 70)
+        for idx in range(accounts):
+            account_type, account_class = ACCOUNT_CLASSES[idx % 4]
+            user.add_account(account_type, account_class(10 ** 9))
+        users.add(user)
+    return users
+
+
+def first_accounts(users, account_class):
+    """Returns a cycle over the first account of the given class"""
+    found = [
+        account
+        for user in users
+        for accounts in user._accounts.values()
+        for account in accounts
+        if type(account) is account_class
+    ]
+    return itertools.cycle(found or [account_class(10 ** 9)])
+
+
+def get_benchmarks(users):
+    """Returns a dictionary of benchmark name to a callable to time"""
+    user_cycle = itertools.cycle(list(users))
+    checking = first_accounts(users, Checking)
+    savings = first_accounts(users, Savings)
+    retirement = first_accounts(users, Retirement)
+    market_fund = first_accounts(users, MoneyMarket)
+    cents = Cents(1)
+
+    def market_fund_withdraw():
+        account = next(market_fund)
+        account.withdraw(cents)
+        account.reset_withdrawals()
+
+    def withdraw_from():
+        user = next(user_cycle)
+        user.withdraw_from("Checking", 0, cents)
+
+    def deposit_into():
+        user = next(user_cycle)
+        user.deposit_into("Checking", 0, cents)
+
+    def perform_transaction():
+        user = next(user_cycle)
+        bank_of_nerds.perform_transaction(
+            "Checking", "1", "0.01", user, user.deposit_into
+        )
+
+    def get_account_printout():
+        bank_of_nerds.get_account_printout(next(user_cycle))
+
+    def get_account_printout_changed():
+        user = next(user_cycle)
+        user.deposit_into("Checking", 0, cents)
+        bank_of_nerds.get_account_printout(user)
+
+    def new_customer():
+        Customer("John", "Doe", 30)
+
+    return {
+        "Account.deposit": lambda: next(checking).deposit(cents),
+        "Checking.withdraw": lambda: next(checking).withdraw(cents),
+        "Savings.withdraw": lambda: next(savings).withdraw(cents),
+        "Retirement.withdraw": lambda: next(retirement).withdraw(cents, 70),
+        "MoneyMarket.withdraw+reset": market_fund_withdraw,
+        "Customer.withdraw_from": withdraw_from,
+        "Customer.deposit_into": deposit_into,
+        "perform_transaction": perform_transaction,
+        "get_users": lambda: bank_of_nerds.get_users(users.scan()),
+        "get_account_printout": get_account_printout,
+        "get_account_printout (after change)": get_account_printout_changed,
+        "Customer()": new_customer,
+    }
+
+
+def get_commit():
+    """Returns the current git commit hash, or None outside a checkout"""
+    try:
+        result = subprocess.run(
+            ("git", "rev-parse", "--short", "HEAD"),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def run(customers, accounts, repeat, selected=None):
+    """Yields a result dictionary for every benchmark of one book size"""
+    users = build_book(customers, accounts)
+    for name, func in get_benchmarks(users).items():
+        if selected and not any(pattern in name for pattern in selected):
+            continue
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=repeat, number=number))
+        yield {
+            "name": name,
+            "customers": customers,
+            "accounts": accounts,
+            "ops": number,
+            "ns_per_op": round(best / number * 1e9, 1),
+        }
+
+
+def run_shards(customers, shards, repeat):
+    """Returns a result dictionary for a ShardedBank of shards workers
+
+    Every customer holds one Savings account, and deposits are made
+    into all of them in batches of SHARD_BATCH requests."""
+    with ShardedBank(shards) as bank:
+        user_ids = []
+        for n in range(customers):
+            user_id = bank.add_customer("John", "Doe", 30)
+            bank.add_account(user_id, "Savings", Cents(0))
+            user_ids.append(user_id)
+        requests = [
+            ("deposit_into", user_ids[n % customers], "Savings", 0, Cents(1))
+            for n in range(SHARD_BATCH)
+        ]
+        timer = timeit.Timer(lambda: bank.apply_batch(requests))
+        best = min(timer.repeat(repeat=repeat, number=1))
+    return {
+        "name": f"ShardedBank.apply_batch ({shards} shards)",
+        "customers": customers,
+        "accounts": 1,
+        "ops": SHARD_BATCH,
+        "ns_per_op": round(best / SHARD_BATCH * 1e9, 1),
+    }
+
+
+def compare(baseline_path, results):
+    """Returns lines comparing results against a saved baseline run"""
+    with open(baseline_path, encoding="utf-8") as baseline_file:
+        baseline = {}
+        for line in baseline_file:
+            result = json.loads(line)
+            key = (result["name"], result["customers"], result["accounts"])
+            baseline[key] = result["ns_per_op"]
+    lines = []
+    for result in results:
+        key = (result["name"], result["customers"], result["accounts"])
+        if key not in baseline:
+            continue
+        ratio = result["ns_per_op"] / baseline[key]
+        lines.append(
+            f"{result['name']} [{result['customers']}x"
+            f"{result['accounts']}] : {baseline[key]} -> "
+            f"{result['ns_per_op']} ns/op ({ratio:.2f}x)"
+        )
+    return lines
+
+
+def get_args():
+    """Returns the benchmark suite's command line arguments"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--customers", type=int, nargs="+", default=[100, 10000]
+    )
+    parser.add_argument("--accounts", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--only", nargs="+", metavar="NAME", help="run matching benchmarks"
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        nargs="+",
+        default=[],
+        metavar="N",
+        help="also time ShardedBank batches with N worker processes",
+    )
+    parser.add_argument("--output", metavar="FILE")
+    parser.add_argument("--compare", metavar="FILE")
+    return parser.parse_args()
+
+
+def main():
+    """Runs every benchmark and prints or saves the results"""
+    opt = get_args()
+    context = {
+        "commit": get_commit(),
+        "python": platform.python_version(),
+    }
+    results = []
+    for customers, accounts in itertools.product(
+        opt.customers, opt.accounts
+    ):
+        for result in run(customers, accounts, opt.repeat, opt.only):
+            result.update(context)
+            results.append(result)
+            print(json.dumps(result), flush=True)
+    for customers, shards in itertools.product(opt.customers, opt.shards):
+        result = run_shards(customers, shards, opt.repeat)
+        result.update(context)
+        results.append(result)
+        print(json.dumps(result), flush=True)
+    if opt.output:
+        with open(opt.output, "w", encoding="utf-8") as output_file:
+            for result in results:
+                output_file.write(json.dumps(result) + "\n")
+    if opt.compare:
+        print("\n".join(compare(opt.compare, results)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
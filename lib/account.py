@@ -2,46 +2,238 @@
 
 Defines a balance property to hold a current bank account balance,
 as well as methods to manually set that balance, deposit a given
-amount of money, or withdraw a given amount of money."""
+amount of money, or withdraw a given amount of money. Balances are
+held as integer cents, amounts may be given as dollars or Cents.
 
+Setting Account.thread_safe makes every balance change hold the lock
+of its account, taken from a striped table shared by all accounts, so
+accounts may be shared between threads while changes to unrelated
+accounts still run in parallel. The Customer
+holding an account, if any, is told of every change of balance.
+While metrics are enabled, the time taken by and result of every
+change are recorded by account type.
+
+While Account.keep_history is set, every change of balance, and
+every change refused, is also kept in the account's History, which
+is only created by the first one, so accounts that are never used
+hold no history at all. A change that would take the balance beyond
+MAX_CENTS either way is undone and raises OverflowError, so balances
+always fit their history and storage."""
+
+import contextlib
+import functools
+import time
 from abc import ABC, abstractmethod
+from lib import metrics
+from lib.history import History
+from lib.locks import StripedLocks
+from lib.money import MAX_CENTS, format_cents, to_cents
+
+# Locks held while balances change, so no account holds a lock
+_locks = StripedLocks()
+
+# Metric keys of each method and account class, built on first use
+_metric_keys = {}
+
+# Time kept in histories in place of the current time, if not None
+_timestamp = None
+
+
+@contextlib.contextmanager
+def recorded_at(timestamp):
+    """Keeps changes of balance in histories as made at a given time
+
+    Keyword arguments:
+    timestamp -- seconds since the epoch, or None for the current time
+
+    Meant for replaying a journal, so that each change is kept with
+    the time it was first made rather than the time of the replay.
+    It applies to every thread, so should only be used before any
+    accounts are shared between threads."""
+    global _timestamp
+    previous, _timestamp = _timestamp, timestamp
+    try:
+        yield
+    finally:
+        _timestamp = previous
+
+
+def mutator(method):
+    """Makes an account method that may change the balance safe to share
+
+    The method holds the account's lock when thread_safe, and the
+    account's owner is told of any change of balance it made."""
+
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        if metrics.registry is not None:
+            return _measure(self, method, args)
+        if Account.thread_safe:
+            with self.lock:
+                return _apply(self, method, args)
+        return _apply(self, method, args)
+
+    return wrapper
+
+
+def _measure(account, method, args):
+    """Calls method as mutator does, recording its latency and result"""
+    start = time.perf_counter()
+    if Account.thread_safe:
+        with account.lock:
+            rc = _apply(account, method, args)
+    else:
+        rc = _apply(account, method, args)
+    elapsed = time.perf_counter() - start
+    registry = metrics.registry
+    if registry is not None:
+        keys = _metric_keys.get((method, type(account), rc))
+        if keys is None:
+            keys = _metric_key(method, type(account), rc)
+        registry.observe_key(keys[0], elapsed)
+        registry.inc_key(keys[1])
+    return rc
+
+
+def _metric_key(method, account_class, rc):
+    """Returns and keeps the histogram and counter keys of a result"""
+    labels = (("op", method.__name__), ("type", account_class.__name__))
+    keys = (
+        ("bank_account_op_seconds", labels),
+        ("bank_account_results_total", labels + (("code", rc),)),
+    )
+    _metric_keys[(method, account_class, rc)] = keys
+    return keys
+
+
+def _apply(account, method, args):
+    """Calls method, then records and tells the owner of any change
+
+    Refused calls, returning a negative result code, are recorded
+    with their code and no change of balance, and other calls that
+    leave the balance unchanged are not recorded. Changes made by
+    calls returning no result code are recorded with code 1."""
+    before = account._balance
+    rc = method(account, *args)
+    after = account._balance
+    if after == before:
+        if rc is not None and rc < 0 and Account.keep_history:
+            history = account._history
+            if history is None:
+                history = account._history = History(before)
+            history.record(rc, before, _timestamp)
+        return rc
+    if not -MAX_CENTS <= after <= MAX_CENTS:
+        account._balance = before
+        raise OverflowError(f"balance out of range: {after}")
+    if Account.keep_history:
+        history = account._history
+        if history is None:
+            history = account._history = History(before)
+        history.record(1 if rc is None else rc, after, _timestamp)
+    if account._owner is not None:
+        account._owner._account_changed(account, after - before)
+    return rc
 
 
 class Account(ABC):
     """A class that represents a generic bank account
 
+    Class Variables
+    ---------------
+    thread_safe : whether balance changes hold the account's lock
+    keep_history : whether changes of balance are kept in histories
+
     Attributes
     ----------
     balance : float
-        The amount of money a given account has, rounded at
-        two decimal places
+        The amount of money a given account has in dollars,
+        held as a whole number of cents
+    cents : int
+        The amount of money a given account has in cents
+    lock : threading.RLock
+        The lock held while the balance changes, shared with
+        some other accounts
+    history : History
+        Every change of balance made or refused on the account
+        while keep_history was set, created by the first one
+    owner : Customer
+        The customer holding the account, or None
 
     Methods
     -------
     withdraw():
         subtracts an amount from the current balance
     deposit():
-        adds an amount to the current balance"""
+        adds an amount to the current balance
+    assess_fee():
+        subtracts a fee from the current balance"""
+
+    thread_safe = False
+    keep_history = True
+
+    __slots__ = ("_balance", "_owner", "_history")
 
     def __init__(self, _balance):
-        self._balance = round(_balance, 2)
+        # A plain int, as an int subclass such as Cents is larger
+        self._balance = int(to_cents(_balance))
+        self._owner = None
+        self._history = None
 
     def __str__(self):
-        return f'Account balance: ${self._balance:.2f}'
+        return f'Account balance: ${format_cents(self._balance)}'
 
     @property
     def balance(self):
-        """Current account balance"""
-        return self._balance
+        """Current account balance in dollars"""
+        return self._balance / 100
 
     @balance.setter
+    @mutator
     def balance(self, new_balance):
         """Set the balance to the specified value"""
-        self._balance = round(new_balance, 2)
+        self._balance = int(to_cents(new_balance))
 
+    @property
+    def cents(self):
+        """Current account balance in cents"""
+        return self._balance
+
+    @property
+    def owner(self):
+        """Customer holding the account, or None"""
+        return self._owner
+
+    @owner.setter
+    def owner(self, owner):
+        """Set the customer holding the account"""
+        self._owner = owner
+
+    @property
+    def history(self):
+        """Every change of balance made or refused on the account"""
+        if self._history is None:
+            self._history = History(self._balance)
+        return self._history
+
+    @property
+    def lock(self):
+        """Lock held while the balance changes"""
+        return _locks.lock(self)
+
+    @mutator
     def deposit(self, to_deposit):
         """Add money to the current balance, returns 1"""
-        self._balance += round(to_deposit, 2)
+        self._balance += to_cents(to_deposit)
+        return 1
+
+    @mutator
+    def assess_fee(self, fee):
+        """Subtract a fee from the current balance, returns 1
+
+        Fees are charged regardless of the balance, and may take
+        the account below zero."""
+        self._balance -= to_cents(fee)
         return 1
 
     @abstractmethod
@@ -0,0 +1,234 @@
+"""Define 'AccountStore' class for use as a columnar account database
+
+Defines a storage engine that keeps the balance, account type, owner
+user_id, and withdrawal count of every account in contiguous typed
+arrays rather than in one Python object per account. Thin view
+objects that satisfy the Account interface are handed out on demand
+and read and write straight through to the arrays. Type codes are
+those of the account_types registry, and the view class of each
+type is made from its account class the first time it is needed."""
+
+from array import array
+from lib import account_types
+from lib.locks import StripedLocks
+from lib.money import to_cents
+
+# Locks held while stored balances change, chosen by row
+_locks = StripedLocks()
+
+
+class _StoredAccount():
+    """Mixin that redirects an Account's balance into an AccountStore"""
+
+    __slots__ = ()
+
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+        self._owner = None
+
+    @property
+    def _balance(self):
+        return self._store._balances[self._row]
+
+    @_balance.setter
+    def _balance(self, new_balance):
+        self._store._balances[self._row] = new_balance
+
+    @property
+    def _history(self):
+        return self._store._histories.get(self._row)
+
+    @_history.setter
+    def _history(self, history):
+        self._store._histories[self._row] = history
+
+    @property
+    def owner(self):
+        """Customer holding the account, or None"""
+        return self._owner
+
+    @owner.setter
+    def owner(self, owner):
+        """Set the customer holding the account"""
+        self._owner = owner
+        if owner is None:
+            self._store._owned.pop(self._row, None)
+        else:
+            self._store._owned[self._row] = self
+
+    @property
+    def lock(self):
+        """Lock held while the balance changes"""
+        return self._store.lock(self._row)
+
+    @property
+    def row(self):
+        """The account's row number in its AccountStore"""
+        return self._row
+
+    @property
+    def owner_id(self):
+        """The user_id of the customer that holds the account"""
+        return self._store._owners[self._row]
+
+
+class _StoredCount():
+    """Mixin that redirects a withdrawal count into an AccountStore"""
+
+    __slots__ = ()
+
+    @property
+    def _transaction_count(self):
+        return self._store._transaction_counts[self._row]
+
+    @_transaction_count.setter
+    def _transaction_count(self, count):
+        self._store._transaction_counts[self._row] = count
+
+
+# View class of every account class, made on first use
+_view_classes = {}
+
+
+def _view_class(type_code):
+    """Returns the view class of the account type with the given code"""
+    account_class = account_types.BY_CODE[type_code].account_class
+    view_class = _view_classes.get(account_class)
+    if view_class is None:
+        bases = (_StoredAccount, account_class)
+        if any(
+            "_transaction_count" in getattr(base, "__slots__", ())
+            for base in account_class.__mro__
+        ):
+            # Accounts limiting their withdrawals keep count of them
+            bases = (_StoredAccount, _StoredCount, account_class)
+        name = account_class.__name__
+        view_class = _view_classes[account_class] = type(
+            f"Stored{name}",
+            bases,
+            {
+                "__slots__": ("_store", "_row"),
+                "__doc__": f"A {name} account whose state lives in an "
+                "AccountStore",
+            },
+        )
+    return view_class
+
+
+class AccountStore():
+    """A class that represents a columnar store of bank accounts
+
+    Row n of every column belongs to the same account, and an
+    account's row never changes once it has been added. Histories
+    are only kept for rows that have had a transaction, and every
+    view of a row shares the same one. The store keeps the view of
+    every row held by a customer, so that changes made to the
+    arrays themselves can be passed on to the customer.
+
+    Attributes
+    ----------
+    balances : array
+        balance of each account in cents
+    types : array
+        type code of each account, an index into account_types.BY_CODE
+    owners : array
+        user_id of the customer holding each account
+    transaction_counts : array
+        withdrawals made from each account, only used by
+        Money Market Fund accounts
+
+    Methods
+    -------
+    add(owner_id, account_type, balance):
+        adds an account and returns a view of it
+    account(row):
+        returns a view of the account at the given row
+    owned(row):
+        returns the view of a row held by a customer, or None
+    lock(row):
+        returns the lock of the account at the given row
+    total_cents(account_type):
+        returns the sum of all balances, optionally of one type"""
+
+    def __init__(self):
+        self._balances = array("q")
+        self._types = array("b")
+        self._owners = array("q")
+        self._transaction_counts = array("B")
+        self._histories = {}
+        # '[Row] : [View]' pairings of every view held by a customer
+        self._owned = {}
+
+    def __len__(self):
+        return len(self._types)
+
+    @property
+    def balances(self):
+        """Balance in cents of every account by row"""
+        return self._balances
+
+    @property
+    def types(self):
+        """Type code of every account by row"""
+        return self._types
+
+    @property
+    def owners(self):
+        """Owner user_id of every account by row"""
+        return self._owners
+
+    @property
+    def transaction_counts(self):
+        """Withdrawal count of every account by row"""
+        return self._transaction_counts
+
+    def add(self, owner_id, account_type, balance):
+        """Adds an account of the given type, returns a view of it
+
+        Raises ValueError if the account type is not recognized."""
+        type_code = _type_code(account_type)
+        self._balances.append(to_cents(balance))
+        self._types.append(type_code)
+        self._owners.append(owner_id)
+        self._transaction_counts.append(0)
+        return _view_class(type_code)(self, len(self._types) - 1)
+
+    def account(self, row):
+        """Returns a view of the account at the given row
+
+        Raises IndexError if no account has the given row."""
+        return _view_class(self._types[row])(self, row)
+
+    def owned(self, row):
+        """Returns the view of a row held by a customer, or None"""
+        return self._owned.get(row)
+
+    def lock(self, row):
+        """Returns the lock of the account at the given row
+
+        Locks are taken from a striped table by row, so they cost no
+        memory per row, every view of a row shares the same lock, and
+        a lock may also be shared with other rows."""
+        return _locks.lock_for_key(row)
+
+    def total_cents(self, account_type=None):
+        """Returns the sum of balances in cents, optionally of one type"""
+        if account_type is None:
+            return sum(self._balances)
+        type_code = _type_code(account_type)
+        return sum(
+            balance
+            for balance, code in zip(self._balances, self._types)
+            if code == type_code
+        )
+
+
+def _type_code(account_type):
+    """Returns the code of a registered account type
+
+    Raises ValueError if the account type is not recognized."""
+    kind = account_types.get(account_type)
+    if kind is None:
+        raise ValueError(f"unknown account type {account_type!r}")
+    return kind.code
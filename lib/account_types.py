@@ -0,0 +1,92 @@
+"""Define the registry of account types offered by the bank
+
+Every account type is registered once with the class of its
+accounts, the messages shown for each of its failed withdrawals, and
+whether its withdrawals need the customer's age. Types are numbered
+in the order they are registered, and are listed, saved, and loaded
+in that order. Checking, Savings, 401K, and Money Market Fund are
+registered when the module is imported."""
+
+from collections import namedtuple
+from lib.checking import Checking
+from lib.money_market_fund import MoneyMarket
+from lib.retirement import Retirement
+from lib.savings import Savings
+
+# One registered account type, where messages holds '[Return Code] :
+# [Message]' pairings for the codes below 1 its withdraw may return
+AccountType = namedtuple(
+    "AccountType", ("name", "code", "account_class", "messages", "needs_age")
+)
+
+# '[Account Type] : AccountType' pairings in order of type code
+TYPES = {}
+
+# Registered AccountTypes indexed by type code
+BY_CODE = []
+
+# '[Account Class] : AccountType' pairings, including subclasses of
+# registered classes once they have been looked up
+_BY_CLASS = {}
+
+
+def register(name, account_class, messages, needs_age=False):
+    """Registers a new account type and returns its AccountType
+
+    Keyword arguments:
+    name -- name of the type, as entered by tellers
+    account_class -- the Account subclass of accounts of the type
+    messages -- dictionary of '[Return Code] : [Message]' pairings
+        for the codes below 1 returned by the class's withdraw
+    needs_age -- whether withdraw takes the customer's age after
+        the amount to withdraw
+
+    Raises ValueError if a type of the same name is registered."""
+    if name in TYPES:
+        raise ValueError(f"account type {name!r} is already registered")
+    account_type = AccountType(
+        name, len(BY_CODE), account_class, dict(messages), needs_age
+    )
+    TYPES[name] = account_type
+    BY_CODE.append(account_type)
+    _BY_CLASS.setdefault(account_class, account_type)
+    return account_type
+
+
+def get(name):
+    """Returns the AccountType of the given name, or None"""
+    return TYPES.get(name)
+
+
+def of(account):
+    """Returns the AccountType of an account, or None
+
+    Accounts of a subclass of a registered class, such as the views
+    of an AccountStore, are of the same type as the registered one."""
+    account_class = type(account)
+    account_type = _BY_CLASS.get(account_class)
+    if account_type is None:
+        for base in account_class.__mro__:
+            if base in _BY_CLASS:
+                account_type = _BY_CLASS[account_class] = _BY_CLASS[base]
+                break
+    return account_type
+
+
+register(
+    "Checking",
+    Checking,
+    {-1: "overdraft limit exceeded", 0: "account overdrafted"},
+)
+register("Savings", Savings, {-1: "account balance exceeded"})
+register(
+    "401K",
+    Retirement,
+    {-2: "not old enough to withdraw", -1: "account balance exceeded"},
+    needs_age=True,
+)
+register(
+    "Money Market Fund",
+    MoneyMarket,
+    {-2: "max monthly withdrawls: 2", -1: "account balance exceeded"},
+)
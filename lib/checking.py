@@ -8,7 +8,8 @@ an overdraft fee is charged."""
 
 
 from abc import ABC, abstractmethod
-from lib.account import Account
+from lib.account import Account, mutator
+from lib.money import to_cents
 
 
 class Checking(Account):
@@ -17,8 +18,8 @@ class Checking(Account):
     Attributes
     ----------
     balance : float
-        The amount of money a given account has, rounded at
-        two decimal places
+        The amount of money a given account has in dollars,
+        held as a whole number of cents
     Methods
     -------
     withdraw():
@@ -27,9 +28,12 @@ class Checking(Account):
         account, then an overdraft fee of $35 is charged
         on top of the withdrawl, up to $500 over the balance"""
 
+    __slots__ = ()
+
     def __init__(self, _balance):
         super().__init__(_balance)
 
+    @mutator
     def withdraw(self, to_withdraw):
         """Withdraws money from the account
 
@@ -37,11 +41,12 @@ class Checking(Account):
         an overdraft fee of $35 is applied to the account. Returns
         -1 if the overdraft limit is exceeded, 0 if account
         overdrafted successfully, and otherwise 1."""
+        to_withdraw = to_cents(to_withdraw)
         if to_withdraw > self._balance:
-            if to_withdraw - self._balance > 500:
+            if to_withdraw - self._balance > 50000:
                 return -1
             else:
-                self._balance -= to_withdraw + 35
+                self._balance -= to_withdraw + 3500
                 return 0
         else:
             self._balance -= to_withdraw
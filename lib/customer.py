@@ -2,7 +2,23 @@
 
 Defines relevant fields such as the user's name, age, user_id, as
 well as a dictionary of all of their held accounts by type. Methods
-to withdraw from and deposit to the specified account are provided."""
+to withdraw from and deposit to the specified account are provided.
+Only account types the customer actually holds take up space in the
+dictionary. The account statement is rendered once and kept until
+one of the customer's accounts changes or a new one is added, and
+the total of all of the customer's balances is kept up to date as
+they change, as are the totals and indexes of any Directory holding
+them."""
+
+import threading
+from lib import account_types
+from lib.account import Account
+from lib.locks import StripedLocks
+
+# Locks guarding each customer's running total while
+# Account.thread_safe is set, and their names and age, taken while
+# holding an account's lock and before their directory's lock
+_locks = StripedLocks()
 
 
 class Customer():
@@ -11,6 +27,7 @@ class Customer():
     Class Variables
     ---------------
     ID : monotonically-increasing identification number
+    allocator : IdAllocator handing out user_ids instead of ID, or None
 
     Attributes
     ----------
@@ -22,10 +39,16 @@ class Customer():
         customer's age in years
     user_id : int
         customer's unique ID
+    total_cents : int
+        sum of the balances of all of the customer's accounts
+    lock : threading.RLock
+        lock held while the customer's total, names or age change,
+        shared with some other customers
     accounts : dict
         dictionary containing '[Account Type] : [Acc1, Acc2, Acc3...]'
         (where Acc is a sub-class instance derived from Account)
-        pairings that make up all of a given user's accounts
+        pairings that make up all of a given user's accounts, with
+        a key only for each account type the user holds
 
     Methods
     -------
@@ -35,15 +58,47 @@ class Customer():
         adds an amount to the given account's current balance"""
 
     id = 1
+    allocator = None
+    _id_lock = threading.Lock()
+
+    __slots__ = (
+        "_first_name", "_last_name", "_age", "_user_id", "_accounts",
+        "_statement", "_total", "_directory",
+    )
+
+    def __init__(self, first_name, last_name, age, user_id=None):
+        """Creates a customer with the next free user_id
 
-    def __init__(self, first_name, last_name, age):
+        A user_id may be passed when restoring a saved customer, in
+        which case later customers are numbered after it."""
+        allocator = Customer.allocator
+        if allocator is None:
+            with Customer._id_lock:
+                if user_id is None:
+                    user_id = Customer.id
+                Customer.id = max(Customer.id, user_id + 1)
+        elif user_id is None:
+            user_id = allocator.next_id()
+        else:
+            allocator.observe(user_id)
         self._first_name = first_name
         self._last_name = last_name
         self._age = age
-        self._user_id = Customer.id
-        self._accounts = {"Checking": [], "Savings": [],
-                          "401K": [], "Money Market Fund": []}
-        Customer.id += 1
+        self._user_id = user_id
+        self._accounts = {}
+        self._statement = None
+        self._total = 0
+        self._directory = None
+
+    @staticmethod
+    def observe_id(user_id):
+        """Makes sure no new customer is given a user_id up to user_id
+
+        Called when opening saved customers whose user_ids are in use."""
+        if Customer.allocator is not None:
+            Customer.allocator.observe(user_id)
+        with Customer._id_lock:
+            Customer.id = max(Customer.id, user_id + 1)
 
     @property
     def first_name(self):
@@ -53,7 +108,13 @@ class Customer():
     @first_name.setter
     def first_name(self, first_name):
         """Set customer's first name"""
-        self._first_name = first_name
+        with _locks.lock(self):
+            old_first_name = self._first_name
+            self._first_name = first_name
+            if self._directory is not None:
+                self._directory._name_changed(
+                    self, old_first_name, self._last_name
+                )
 
     @property
     def last_name(self):
@@ -63,7 +124,13 @@ class Customer():
     @last_name.setter
     def last_name(self, last_name):
         """Set customer's last name"""
-        self._last_name = last_name
+        with _locks.lock(self):
+            old_last_name = self._last_name
+            self._last_name = last_name
+            if self._directory is not None:
+                self._directory._name_changed(
+                    self, self._first_name, old_last_name
+                )
 
     @property
     def age(self):
@@ -73,29 +140,61 @@ class Customer():
     @age.setter
     def age(self, age):
         """Set a customer's age"""
-        self._age = age
+        with _locks.lock(self):
+            old_age = self._age
+            self._age = age
+            if self._directory is not None:
+                self._directory._age_changed(self, old_age)
 
     @property
     def user_id(self):
         """A customer's unique user ID number"""
         return self._user_id
 
+    @property
+    def lock(self):
+        """Lock held while the customer's total, names or age change"""
+        return _locks.lock(self)
+
+    @property
+    def total_cents(self):
+        """Sum of the balances of all of a customer's accounts in cents"""
+        return self._total
+
+    def type_totals(self):
+        """Returns a dictionary of account type to total balance in cents"""
+        return {
+            account_type: sum(account.cents for account in accounts)
+            for account_type, accounts in self._accounts.items()
+        }
+
     def list_accounts_of_type(self, account_type):
         """Returns string containing balances for given account type"""
         final_listing = []
-        for idx, account in enumerate(self._accounts[account_type], 1):
+        accounts = self._accounts.get(account_type, ())
+        for idx, account in enumerate(accounts, 1):
             account_num = f"{account_type} #{idx}"
-            account_balance = f"{self._accounts[account_type][idx - 1]}"
+            account_balance = f"{account}"
             account_statement = "\n".join([account_num, account_balance])
             final_listing.append(account_statement)
         return "\n\n".join(final_listing)
 
     def get_all_balances(self):
-        """Returns string containing balances for all accounts"""
+        """Returns string containing balances for all accounts
+
+        The string is kept until one of the accounts changes, except
+        when Account.thread_safe is set and it is always rebuilt."""
+        if Account.thread_safe:
+            return self._render_balances()
+        if self._statement is None:
+            self._statement = self._render_balances()
+        return self._statement
+
+    def _render_balances(self):
         final_listing = []
-        for account_type in self._accounts.keys():
-            if not self._accounts[account_type]:
-                # Skip empty account types
+        for account_type in account_types.TYPES:
+            if account_type not in self._accounts:
+                # Skip account types the user does not hold
                 continue
             account_listing = self.list_accounts_of_type(account_type)
             final_listing.append(account_listing)
@@ -103,17 +202,58 @@ class Customer():
 
     def add_account(self, account_type, account):
         """Adds an Account object of given type to accounts dict"""
-        self._accounts[account_type].append(account)
+        # A customer in no directory is only held by the thread making
+        # it, such as a directory loading it while holding its own lock
+        if Account.thread_safe and self._directory is not None:
+            with _locks.lock(self):
+                self._add_account(account_type, account)
+        else:
+            self._add_account(account_type, account)
+
+    def _add_account(self, account_type, account):
+        account.owner = self
+        accounts = self._accounts.get(account_type)
+        if accounts is None:
+            # Made to size, as a list appended to is given spare room
+            self._accounts[account_type] = [account]
+        else:
+            accounts.append(account)
+        self._statement = None
+        self._add_to_totals(account_type, account, account.cents, True)
+
+    def _account_changed(self, account, delta):
+        """Called by an account of the customer whose balance changed"""
+        self._statement = None
+        if self._directory is None:
+            account_type = None
+        else:
+            account_type = account_types.of(account).name
+        if Account.thread_safe:
+            with _locks.lock(self):
+                self._add_to_totals(account_type, account, delta)
+        else:
+            self._add_to_totals(account_type, account, delta)
+
+    def _add_to_totals(self, account_type, account, delta, added=False):
+        self._total += delta
+        if self._directory is not None:
+            self._directory._balance_changed(
+                self, account_type, account, delta, added
+            )
 
     def deposit_into(self, account_type, idx, amount):
         """Adds money to the specified account"""
-        rc = self._accounts[account_type][idx].deposit(amount)
+        rc = self._accounts.get(account_type, ())[idx].deposit(amount)
         return rc
 
     def withdraw_from(self, account_type, idx, amount, age=None):
-        """Subtracts money from the specified account"""
-        if age:
-            rc = self._accounts[account_type][idx].withdraw(amount, age)
+        """Subtracts money from the specified account
+
+        Accounts of a type whose withdrawals need the customer's age
+        are given age, or the customer's own age if it is None."""
+        account = self._accounts.get(account_type, ())[idx]
+        if account_types.TYPES[account_type].needs_age:
+            rc = account.withdraw(amount, self._age if age is None else age)
         else:
-            rc = self._accounts[account_type][idx].withdraw(amount)
+            rc = account.withdraw(amount)
         return rc
@@ -0,0 +1,421 @@
+"""Define 'Directory' class for use as the bank's customer database
+
+Defines a mapping of every Customer held by the bank keyed on their
+user_id, with methods to add, look up, and remove customers in
+constant time regardless of how many customers the bank holds.
+
+A directory may be backed by a read-only source of saved customers,
+such as a Snapshot, in which case each saved customer is only
+loaded the first time it is looked up.
+
+The total balance held in each account type is worked out with a
+single scan the first time it is asked for, and from then on is
+kept up to date by the customers as their balances change. Indexes
+of accounts by balance and of customers by age are built and kept
+up to date the same way, the first time either is queried, as is an
+index of the words of customers' names for finding them by name.
+
+Every change to the directory, its totals and its indexes is made
+holding the directory's lock, except that balance changes only take
+it while Account.thread_safe is set. A customer's own lock is always
+taken before the directory's."""
+
+import heapq
+import threading
+from collections import namedtuple
+from itertools import islice
+from lib import account_types
+from lib.account import Account
+from lib.sorted_index import SortedIndex
+
+# Above every character, so (prefix + _LAST_CHAR,) is above every key
+# whose word starts with prefix
+_LAST_CHAR = "\U0010ffff"
+
+# One account found through a directory's balance index, where
+# number is the account's 1-based number among the user's of its type
+IndexedAccount = namedtuple(
+    "IndexedAccount", ("cents", "user_id", "account_type", "number")
+)
+
+
+class Directory():
+    """A class that represents the bank's customer directory
+
+    Customers are kept in the order they were added, with any
+    customers of the backing source listed first, so iterating
+    over the directory lists customers oldest first.
+
+    Attributes
+    ----------
+    customers : dict
+        dictionary containing '[user_id] : [Customer]' pairings
+        for every customer added or loaded so far
+    backing : object
+        source of saved customers supporting get(user_id),
+        user_ids(), len() and 'in', or None
+
+    Methods
+    -------
+    add(customer):
+        adds a customer to the directory under their user_id
+    get(user_id):
+        returns the customer with the given user_id, or None
+    remove(user_id):
+        removes and returns the customer with the given user_id
+    scan():
+        yields every customer without keeping any more of them loaded
+    total_cents(account_type=None):
+        returns the total balance held, optionally of one type
+    balance_range(account_type, low=None, high=None):
+        yields the accounts of a type with balances in a range
+    top_balances(count, account_type=None):
+        returns the accounts with the highest balances
+    age_range(low=None, high=None):
+        yields the customers with ages in a range
+    find_by_name(text):
+        yields the customers with names starting with the words of text"""
+
+    def __init__(self, backing=None):
+        self._customers = {}
+        self._backing = backing
+        self._removed = set()
+        # user_ids of customers added that the backing did not hold
+        self._added = set()
+        self._totals = None
+        self._balance_indexes = None
+        self._age_index = None
+        self._name_index = None
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        if self._backing is None:
+            return len(self._customers)
+        # A writable backing, such as a SQLiteBackend, may have saved
+        # added customers since, and then already counts them
+        self._added = {
+            user_id for user_id in self._added if user_id not in self._backing
+        }
+        return len(self._backing) - len(self._removed) + len(self._added)
+
+    def __iter__(self):
+        if self._backing is None:
+            return iter(self._customers.values())
+        return self._iter_backed()
+
+    def __contains__(self, user_id):
+        if user_id in self._customers:
+            return True
+        return self._in_backing(user_id)
+
+    @property
+    def customers(self):
+        """All customers added or loaded so far by user_id"""
+        return self._customers
+
+    @property
+    def backing(self):
+        """Source of saved customers, or None"""
+        return self._backing
+
+    def _in_backing(self, user_id):
+        return (
+            self._backing is not None
+            and user_id not in self._removed
+            and user_id in self._backing
+        )
+
+    def _iter_backed(self):
+        for user_id in self._backing.user_ids():
+            if user_id not in self._removed:
+                yield self.get(user_id)
+        for user_id, customer in list(self._customers.items()):
+            if user_id not in self._backing:
+                yield customer
+
+    def scan(self):
+        """Yields every customer in the same order as iterating
+
+        Unlike iterating, customers of the backing source that have
+        not been looked up yet are loaded for the caller only and
+        are not kept, so a full scan runs in constant memory."""
+        if self._backing is None:
+            yield from self._customers.values()
+            return
+        for user_id in self._backing.user_ids():
+            if user_id in self._removed:
+                continue
+            customer = self._customers.get(user_id)
+            yield customer if customer else self._backing.get(user_id)
+        for user_id, customer in list(self._customers.items()):
+            if user_id not in self._backing:
+                yield customer
+
+    def add(self, customer):
+        """Adds a Customer to the directory, returns the Customer
+
+        Raises ValueError if a customer with the same user_id is
+        already in the directory."""
+        with customer.lock, self._lock:
+            return self._add(customer)
+
+    def _add(self, customer):
+        if customer.user_id in self:
+            raise ValueError(f"duplicate user_id {customer.user_id}")
+        self._customers[customer.user_id] = customer
+        customer._directory = self
+        if self._totals is not None:
+            for account_type, cents in customer.type_totals().items():
+                self._totals[account_type] = (
+                    self._totals.get(account_type, 0) + cents
+                )
+        if self._age_index is not None:
+            self._age_index.add((customer.age, customer.user_id))
+            for key, account_type in _account_keys(customer):
+                self._balance_index(account_type).add(key)
+        if self._name_index is not None:
+            for key in _name_keys(customer):
+                self._name_index.add(key)
+        if self._backing is not None:
+            if customer.user_id in self._backing:
+                self._removed.discard(customer.user_id)
+            else:
+                self._added.add(customer.user_id)
+        return customer
+
+    def get(self, user_id):
+        """Returns the Customer with the given user_id or None"""
+        customer = self._customers.get(user_id)
+        if customer is None and self._backing is not None:
+            with self._lock:
+                customer = self._customers.get(user_id)
+                if customer is None and self._in_backing(user_id):
+                    customer = self._backing.get(user_id)
+                    # Already counted in the totals, if worked out
+                    customer._directory = self
+                    self._customers[user_id] = customer
+        return customer
+
+    def remove(self, user_id):
+        """Removes and returns the Customer with the given user_id
+
+        Raises KeyError if no such customer is in the directory."""
+        customer = self.get(user_id)
+        if customer is None:
+            raise KeyError(user_id)
+        with customer.lock, self._lock:
+            if self._customers.get(user_id) is not customer:
+                raise KeyError(user_id)
+            return self._remove(customer)
+
+    def _remove(self, customer):
+        user_id = customer.user_id
+        del self._customers[user_id]
+        customer._directory = None
+        if self._totals is not None:
+            for account_type, cents in customer.type_totals().items():
+                self._totals[account_type] -= cents
+        if self._age_index is not None:
+            self._age_index.remove((customer.age, customer.user_id))
+            for key, account_type in _account_keys(customer):
+                self._balance_index(account_type).remove(key)
+        if self._name_index is not None:
+            for key in _name_keys(customer):
+                self._name_index.remove(key)
+        if self._backing is not None:
+            if user_id in self._backing:
+                self._removed.add(user_id)
+            else:
+                self._added.discard(user_id)
+        return customer
+
+    def total_cents(self, account_type=None):
+        """Returns the total balance in cents, optionally of one type
+
+        The first call scans every customer once, and later calls
+        take constant time."""
+        with self._lock:
+            if self._totals is None:
+                totals = dict.fromkeys(account_types.TYPES, 0)
+                for customer in self.scan():
+                    for name, cents in customer.type_totals().items():
+                        totals[name] = totals.get(name, 0) + cents
+                self._totals = totals
+            if account_type is None:
+                return sum(self._totals.values())
+            return self._totals.get(account_type, 0)
+
+    def balance_range(self, account_type, low=None, high=None):
+        """Yields an IndexedAccount for every account in a balance range
+
+        Keyword arguments:
+        account_type -- type of the accounts to find
+        low -- lowest balance in cents, or None for no lower bound
+        high -- highest balance in cents, or None for no upper bound
+
+        Accounts are yielded lowest balance first. The first query
+        of any index scans every customer once to build them all."""
+        low = None if low is None else (low,)
+        high = None if high is None else (high, float("inf"))
+        with self._lock:
+            index = self._indexes()[0].get(account_type)
+            if index is None:
+                return
+            keys = list(index.irange(low, high))
+        for cents, user_id, number in keys:
+            yield IndexedAccount(cents, user_id, account_type, number)
+
+    def top_balances(self, count, account_type=None):
+        """Returns a list of the count accounts with the highest balances
+
+        Accounts of every type are considered if account_type is
+        None. Each is given as an IndexedAccount, highest first."""
+        with self._lock:
+            if account_type is not None:
+                index = self._indexes()[0].get(account_type, ())
+                return [
+                    IndexedAccount(cents, user_id, account_type, number)
+                    for cents, user_id, number in islice(
+                        reversed(index), count
+                    )
+                ]
+            per_type = [
+                self.top_balances(count, account_type)
+                for account_type in self._indexes()[0]
+            ]
+        return list(islice(heapq.merge(*per_type, reverse=True), count))
+
+    def age_range(self, low=None, high=None):
+        """Yields every Customer with an age from low to high inclusive
+
+        Either bound may be None to leave that end of the range
+        open. Customers are yielded youngest first."""
+        low = None if low is None else (low,)
+        high = None if high is None else (high, float("inf"))
+        with self._lock:
+            keys = list(self._indexes()[1].irange(low, high))
+        for _, user_id in keys:
+            yield self.get(user_id)
+
+    def find_by_name(self, text):
+        """Yields every Customer with a name starting with the words of text
+
+        Each word of text must be the start of a word of the
+        customer's first or last name, ignoring case, so 'jo sm'
+        finds John Smith. Customers are yielded in order of the name
+        matching the longest word. The first query scans every
+        customer once to build the index of names."""
+        words = text.casefold().split()
+        if not words:
+            return
+        # Look up the longest word, as the fewest names start with it
+        longest = max(words, key=len)
+        with self._lock:
+            if self._name_index is None:
+                self._name_index = SortedIndex(
+                    key for customer in self.scan()
+                    for key in _name_keys(customer)
+                )
+            keys = list(
+                self._name_index.irange((longest,), (longest + _LAST_CHAR,))
+            )
+        found = set()
+        for _, user_id in keys:
+            if user_id in found:
+                continue
+            found.add(user_id)
+            customer = self.get(user_id)
+            names = [name for name, _ in _name_keys(customer)]
+            if all(
+                any(name.startswith(word) for name in names)
+                for word in words
+            ):
+                yield customer
+
+    def _indexes(self):
+        """Returns the balance indexes by type and the age index"""
+        if self._age_index is None:
+            balance_keys = {name: [] for name in account_types.TYPES}
+            ages = []
+            for customer in self.scan():
+                ages.append((customer.age, customer.user_id))
+                for key, account_type in _account_keys(customer):
+                    balance_keys.setdefault(account_type, []).append(key)
+            self._balance_indexes = {
+                account_type: SortedIndex(keys)
+                for account_type, keys in balance_keys.items()
+            }
+            self._age_index = SortedIndex(ages)
+        return (self._balance_indexes, self._age_index)
+
+    def _balance_index(self, account_type):
+        index = self._balance_indexes.get(account_type)
+        if index is None:
+            index = self._balance_indexes[account_type] = SortedIndex()
+        return index
+
+    def _balance_changed(self, customer, account_type, account, delta, added):
+        """Called by a customer when an account is added or changes"""
+        if Account.thread_safe:
+            with self._lock:
+                self._update_balance(
+                    customer, account_type, account, delta, added
+                )
+        else:
+            self._update_balance(
+                customer, account_type, account, delta, added
+            )
+
+    def _update_balance(self, customer, account_type, account, delta, added):
+        if self._totals is not None:
+            self._totals[account_type] = (
+                self._totals.get(account_type, 0) + delta
+            )
+        if self._age_index is not None:
+            index = self._balance_index(account_type)
+            accounts = customer._accounts[account_type]
+            if added:
+                number = len(accounts)
+            else:
+                number = 1 + next(
+                    idx for idx, held in enumerate(accounts) if held is account
+                )
+                index.remove((account.cents - delta, customer.user_id, number))
+            index.add((account.cents, customer.user_id, number))
+
+    def _name_changed(self, customer, first_name, last_name):
+        """Called by a customer whose first or last name changed"""
+        with self._lock:
+            if self._name_index is not None:
+                user_id = customer.user_id
+                for key in _name_keys_of(first_name, last_name, user_id):
+                    self._name_index.remove(key)
+                for key in _name_keys(customer):
+                    self._name_index.add(key)
+
+    def _age_changed(self, customer, old_age):
+        """Called by a customer whose age changed"""
+        with self._lock:
+            if self._age_index is not None:
+                self._age_index.remove((old_age, customer.user_id))
+                self._age_index.add((customer.age, customer.user_id))
+
+
+def _account_keys(customer):
+    """Yields the balance index key and type of every customer account"""
+    for account_type, accounts in customer._accounts.items():
+        for number, account in enumerate(accounts, 1):
+            yield ((account.cents, customer.user_id, number), account_type)
+
+
+def _name_keys(customer):
+    """Returns the name index keys of the words of a customer's names"""
+    return _name_keys_of(
+        customer.first_name, customer.last_name, customer.user_id
+    )
+
+
+def _name_keys_of(first_name, last_name, user_id):
+    """Returns a set of a (word, user_id) key for every word of the names"""
+    words = f"{first_name} {last_name}".casefold().split()
+    return {(word, user_id) for word in words}
@@ -0,0 +1,68 @@
+"""Define functions to export every account of the bank for reconciliation
+
+Defines a generator producing one record per account, with the
+account holder's user_id and name, the account's type and number,
+and its balance, along with writers for CSV and JSON Lines. Records
+are produced and written one at a time, so exports run in constant
+memory however many accounts are held."""
+
+import csv
+import json
+from lib import account_types
+from lib.money import format_cents
+
+FIELDS = (
+    "user_id",
+    "last_name",
+    "first_name",
+    "account_type",
+    "number",
+    "balance",
+)
+
+
+def iter_records(users):
+    """Yields a tuple of FIELDS for every account of the given users
+
+    Accounts are numbered from 1 within each type as on a statement,
+    and balances are exact decimal strings such as '-235.00'."""
+    for user in users:
+        for account_type in account_types.TYPES:
+            accounts = user._accounts.get(account_type, ())
+            for number, account in enumerate(accounts, 1):
+                yield (
+                    user.user_id,
+                    user.last_name,
+                    user.first_name,
+                    account_type,
+                    number,
+                    format_cents(account.cents),
+                )
+
+
+def write_csv(users, stream):
+    """Writes every account as CSV with a header, returns the count
+
+    Keyword arguments:
+    users -- iterable of every Customer to export
+    stream -- text stream to write to, opened with newline=''"""
+    writer = csv.writer(stream)
+    writer.writerow(FIELDS)
+    count = 0
+    for record in iter_records(users):
+        writer.writerow(record)
+        count += 1
+    return count
+
+
+def write_jsonl(users, stream):
+    """Writes every account as a JSON object per line, returns the count
+
+    Keyword arguments:
+    users -- iterable of every Customer to export
+    stream -- text stream to write to"""
+    count = 0
+    for record in iter_records(users):
+        stream.write(json.dumps(dict(zip(FIELDS, record))) + "\n")
+        count += 1
+    return count
@@ -0,0 +1,76 @@
+"""Define 'GroupCommitter' class for use by the bank's TCP server
+
+Defines a way for any number of teller sessions served on one
+asyncio event loop to wait for their changes to reach the disk
+without blocking the loop. Commits of the journal are made by a
+worker thread one at a time, and every session that asks while one
+is being made is covered by the next, so that a single commit, and
+a single fsync, serves all of them."""
+
+import asyncio
+
+
+class GroupCommitter():
+    """A class that commits a journal for many sessions at a time
+
+    The journal must allow commit() to be called from a worker
+    thread while changes are still being logged on the event loop,
+    as TransactionLog and SQLiteBackend do.
+
+    Attributes
+    ----------
+    journal : object
+        the TransactionLog or SQLiteBackend being committed
+    commits : int
+        number of commits made so far
+
+    Methods
+    -------
+    commit():
+        waits until every change logged so far is committed"""
+
+    def __init__(self, journal):
+        self._journal = journal
+        self._commits = 0
+        self._waiters = []
+        self._task = None
+
+    @property
+    def journal(self):
+        """The journal being committed"""
+        return self._journal
+
+    @property
+    def commits(self):
+        """Number of commits made so far"""
+        return self._commits
+
+    async def commit(self):
+        """Returns once every change logged before the call is committed
+
+        Raises any error the journal raised while committing."""
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        if self._task is None:
+            self._task = loop.create_task(self._run())
+        await waiter
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self._waiters:
+                waiters, self._waiters = self._waiters, []
+                try:
+                    await loop.run_in_executor(None, self._journal.commit)
+                except Exception as error:
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_exception(error)
+                else:
+                    self._commits += 1
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_result(None)
+        finally:
+            self._task = None
@@ -0,0 +1,106 @@
+"""Define 'History' class for use as an account's transaction history
+
+Defines a compact log of every transaction made on an account, held
+as parallel typed arrays of timestamps, result codes, and balances
+after each transaction, rather than as one Python object per
+transaction. The change each transaction made is worked out from
+the balances before and after it rather than stored. Timestamps
+never decrease, so transactions in a time range and the balance as
+of a given time are found by binary search."""
+
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+# One transaction of a History, where cents is the signed change of
+# balance it made and balance is the balance once it was made
+Transaction = namedtuple(
+    "Transaction", ("timestamp", "cents", "code", "balance")
+)
+
+
+class History():
+    """A class that represents the transaction history of one account
+
+    Attributes
+    ----------
+    opening : int
+        balance in cents before the first transaction
+
+    Methods
+    -------
+    record(code, balance, timestamp=None):
+        adds a transaction to the end of the history
+    between(start, end):
+        yields every transaction from start to end
+    balance_at(timestamp):
+        returns the balance in cents as of the given time"""
+
+    __slots__ = ("_opening", "_times", "_codes", "_balances")
+
+    def __init__(self, opening=0):
+        self._opening = opening
+        self._times = array("d")
+        self._codes = array("b")
+        self._balances = array("q")
+
+    def __len__(self):
+        return len(self._times)
+
+    def __getitem__(self, idx):
+        idx = range(len(self._times))[idx]
+        balance = self._balances[idx]
+        before = self._balances[idx - 1] if idx else self._opening
+        return Transaction(
+            self._times[idx], balance - before, self._codes[idx], balance
+        )
+
+    def __iter__(self):
+        before = self._opening
+        for timestamp, code, balance in zip(
+            self._times, self._codes, self._balances
+        ):
+            yield Transaction(timestamp, balance - before, code, balance)
+            before = balance
+
+    @property
+    def opening(self):
+        """Balance in cents before the first transaction"""
+        return self._opening
+
+    def record(self, code, balance, timestamp=None):
+        """Adds a transaction to the end of the history
+
+        Keyword arguments:
+        code -- result code of the transaction
+        balance -- balance in cents once the transaction was made
+        timestamp -- seconds since the epoch, the current time if None
+
+        A timestamp earlier than the last one recorded, such as after
+        the system clock is set back, is recorded as the last one so
+        the history stays in order."""
+        if timestamp is None:
+            timestamp = time.time()
+        if self._times and timestamp < self._times[-1]:
+            timestamp = self._times[-1]
+        self._times.append(timestamp)
+        self._codes.append(code)
+        self._balances.append(balance)
+
+    def between(self, start, end):
+        """Yields every Transaction made from start to end inclusive"""
+        first = bisect_left(self._times, start)
+        last = bisect_right(self._times, end)
+        for idx in range(first, last):
+            yield self[idx]
+
+    def balance_at(self, timestamp):
+        """Returns the balance in cents as of the given time
+
+        Transactions made at exactly that time are included, and
+        the opening balance is returned for times before the first."""
+        idx = bisect_right(self._times, timestamp)
+        if idx == 0:
+            return self._opening
+        return self._balances[idx - 1]
@@ -0,0 +1,111 @@
+"""Define 'IdAllocator' class for use as a source of unique user_ids
+
+Defines a high/low allocator: a shared high-water mark is advanced a
+whole block of IDs at a time, and each thread then hands out the IDs
+of its own block without touching anything shared. When the
+allocator is given a file, the high-water mark is kept in it and is
+advanced while holding an exclusive lock on the file, so processes
+sharing the file never get overlapping blocks, and IDs are never
+reused after a restart. IDs of a block left unused are skipped."""
+
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory file locks, so only one process may use the file
+    fcntl = None
+
+
+class IdAllocator():
+    """A class that represents a source of unique IDs
+
+    Attributes
+    ----------
+    path : str
+        file holding the high-water mark, or None to keep it in
+        memory only
+    block_size : int
+        number of IDs reserved by a thread at a time
+
+    Methods
+    -------
+    next_id():
+        returns an ID never returned before
+    reserve(count):
+        reserves and returns a range of count unused IDs
+    observe(used_id):
+        makes sure an ID already in use is never returned"""
+
+    def __init__(self, path=None, block_size=1024, first_id=1):
+        self._path = path
+        self._block_size = block_size
+        self._high = first_id
+        self._floor = first_id
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def path(self):
+        """File holding the high-water mark, or None"""
+        return self._path
+
+    @property
+    def block_size(self):
+        """Number of IDs reserved by a thread at a time"""
+        return self._block_size
+
+    def next_id(self):
+        """Returns an ID never returned before by this allocator
+
+        IDs come from the calling thread's block, and only reserving
+        a new block once it runs out takes a lock."""
+        local = self._local
+        next_id = getattr(local, "next_id", 0)
+        if next_id < self._floor:
+            next_id = self._floor
+        if next_id >= getattr(local, "end", 0):
+            block = self.reserve(self._block_size)
+            next_id = block.start
+            local.end = block.stop
+        local.next_id = next_id + 1
+        return next_id
+
+    def reserve(self, count):
+        """Reserves and returns a range of count unused IDs
+
+        With a file, the new high-water mark is written and synced
+        to disk before the range is returned."""
+        with self._lock:
+            start = max(self._high, self._floor)
+            if self._path is not None:
+                start = self._reserve_in_file(start, count)
+            self._high = start + count
+            return range(start, start + count)
+
+    def _reserve_in_file(self, start, count):
+        """Advances the file's high-water mark, returns the block start"""
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            saved = os.read(fd, 32).strip()
+            if saved:
+                start = max(start, int(saved))
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, b"%d\n" % (start + count))
+            os.fsync(fd)
+        finally:
+            # Closing the file also releases the lock
+            os.close(fd)
+        return start
+
+    def observe(self, used_id):
+        """Makes sure an ID already in use, and all below it, are skipped
+
+        Used for customers restored with their saved user_id."""
+        if used_id >= self._floor:
+            with self._lock:
+                self._floor = max(self._floor, used_id + 1)
@@ -0,0 +1,60 @@
+"""Define 'StripedLocks' class for use as the locks of many small objects
+
+Defines a fixed table of reentrant locks shared by any number of
+objects, each object always getting the same lock, chosen by its
+identity, or by a key standing for it, such as a row number. Objects
+that are locked only now and then, such as accounts and customers,
+so need no lock of their own, and an object costs no memory at all
+to be lockable.
+
+Two objects may share a lock, so code holding the lock of one
+object must never wait for the lock of another object of the same
+table, unless, like transfers, it takes every lock it needs at once
+in order of lock identity."""
+
+import threading
+
+# Number of locks in a table unless given, enough that unrelated
+# objects locked at the same time rarely share one
+DEFAULT_STRIPES = 1024
+
+
+class StripedLocks():
+    """A class that represents a table of locks shared by objects
+
+    Attributes
+    ----------
+    stripes : int
+        number of locks in the table
+
+    Methods
+    -------
+    lock(obj):
+        returns the lock of an object
+    lock_for_key(key):
+        returns the lock of a hashable key"""
+
+    __slots__ = ("_locks",)
+
+    def __init__(self, stripes=DEFAULT_STRIPES):
+        self._locks = tuple(threading.RLock() for _ in range(stripes))
+
+    def __len__(self):
+        return len(self._locks)
+
+    @property
+    def stripes(self):
+        """Number of locks in the table"""
+        return len(self._locks)
+
+    def lock(self, obj):
+        """Returns the lock of an object, the same one every time"""
+        # Objects are 16-byte aligned, so the low bits never differ
+        return self._locks[(id(obj) >> 4) % len(self._locks)]
+
+    def lock_for_key(self, key):
+        """Returns the lock of a hashable key, the same one every time
+
+        Equal keys get the same lock, so a key can stand for an object
+        that has no identity of its own, such as a row of a table."""
+        return self._locks[hash(key) % len(self._locks)]
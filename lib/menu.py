@@ -1,7 +1,8 @@
 """Create "Menu" objects that contain a multiple selection items.
 
 Contains Menu class and related functions for the creation and
-manipulation of generic menus."""
+manipulation of generic menus. A menu's printout is built once and
+kept until one of its selections is added, removed, or replaced."""
 
 
 class Menu:
@@ -25,13 +26,16 @@ class Menu:
 
     def __init__(self):
         self._selections = []
+        self._printout = None
 
     def __str__(self):
         """Return a string of the printout of sorted menu options"""
-        menu_string = []
-        for idx, selection in enumerate(self._selections, start=1):
-            menu_string.append(f"{idx}. {selection.title()}")
-        return "\n".join(menu_string)
+        if self._printout is None:
+            menu_string = []
+            for idx, selection in enumerate(self._selections, start=1):
+                menu_string.append(f"{idx}. {selection.title()}")
+            self._printout = "\n".join(menu_string)
+        return self._printout
 
     @property
     def selections(self):
@@ -45,11 +49,14 @@ class Menu:
     def add_selection(self, new_selection):
         """Add the given selection to the menu"""
         self._selections.append(new_selection)
+        self._printout = None
 
     def del_selection(self, selection):
         """Remove the given selection from the menu"""
         self._selections.remove(selection)
+        self._printout = None
 
     def replace_selection(self, new_selection, index):
         """Replaces the menu item at index"""
         self._selections[index] = new_selection
+        self._printout = None
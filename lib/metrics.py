@@ -0,0 +1,202 @@
+"""Define an in-process registry of counters and latency histograms
+
+Metrics are off until enable() is called, and every instrumented
+path only checks whether the module's registry is None before doing
+any work. Once enabled, counters are kept per name and set of labels,
+and latencies are counted into fixed histogram buckets, all of which
+can be written out in the Prometheus text exposition format."""
+
+import contextlib
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds of the latency histogram buckets, in seconds
+DEFAULT_BUCKETS = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 1e-2, 0.1, 1.0,
+)
+
+# The enabled Registry, or None while metrics are off
+registry = None
+
+# Stands in for a timer while metrics are off
+_null_timer = contextlib.nullcontext()
+
+
+class Histogram:
+    """Counts of observed values falling into each bucket
+
+    Attributes
+    ----------
+    bounds : tuple
+        upper bound of every bucket but the last, unbounded one
+    counts : list
+        number of values observed in each bucket
+    total : float
+        sum of every value observed
+    count : int
+        number of values observed"""
+
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """Count a value into its bucket"""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Registry:
+    """A collection of named counters and histograms
+
+    Counters and histograms are created the first time they are
+    used, once for each name and set of labels.
+
+    Attributes
+    ----------
+    thread_safe : bool
+        whether every update holds the registry's lock, needed when
+        metrics are recorded from more than one thread
+
+    Methods
+    -------
+    inc(name, amount=1, **labels):
+        add amount to a counter
+    observe(name, value, **labels):
+        count a value into a histogram
+    timer(name, **labels):
+        context manager observing the time spent in its body
+    render():
+        return every metric in Prometheus text format
+    write(path):
+        write every metric to a file in Prometheus text format"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, thread_safe=False):
+        self.thread_safe = thread_safe
+        self._buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        """Add amount to the counter with the given name and labels"""
+        self.inc_key((name, tuple(labels.items())), amount)
+
+    def observe(self, name, value, **labels):
+        """Count a value into the histogram with the given name and labels"""
+        self.observe_key((name, tuple(labels.items())), value)
+
+    def inc_key(self, key, amount=1):
+        """Add amount to a counter keyed by (name, label pairs)
+
+        Hot paths may build their keys once and reuse them."""
+        if self.thread_safe:
+            with self._lock:
+                self._counters[key] = self._counters.get(key, 0) + amount
+        else:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe_key(self, key, value):
+        """Count a value into a histogram keyed by (name, label pairs)"""
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = Histogram(self._buckets)
+                    self._histograms[key] = histogram
+        if self.thread_safe:
+            with self._lock:
+                histogram.observe(value)
+        else:
+            histogram.observe(value)
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels):
+        """Observe the seconds spent in the body of a with statement"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter(self, name, **labels):
+        """Returns the value of a counter, 0 if it was never used"""
+        return self._counters.get((name, tuple(labels.items())), 0)
+
+    def histogram(self, name, **labels):
+        """Returns a histogram, or None if it was never used"""
+        return self._histograms.get((name, tuple(labels.items())))
+
+    def render(self):
+        """Returns every metric in Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items(), key=_sort_key)
+            histograms = sorted(self._histograms.items(), key=_sort_key)
+            last_name = None
+            for (name, labels), value in counters:
+                if name != last_name:
+                    lines.append(f"# TYPE {name} counter")
+                    last_name = name
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+            for (name, labels), histogram in histograms:
+                if name != last_name:
+                    lines.append(f"# TYPE {name} histogram")
+                    last_name = name
+                cumulative = 0
+                bounds = [repr(bound) for bound in histogram.bounds]
+                for bound, count in zip(bounds + ["+Inf"], histogram.counts):
+                    cumulative += count
+                    bucket = _format_labels(labels + (("le", bound),))
+                    lines.append(f"{name}_bucket{bucket} {cumulative}")
+                labels = _format_labels(labels)
+                lines.append(f"{name}_sum{labels} {histogram.total!r}")
+                lines.append(f"{name}_count{labels} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write every metric to a file in Prometheus text format"""
+        with open(path, "w", encoding="utf-8") as metrics_file:
+            metrics_file.write(self.render())
+
+
+def _sort_key(item):
+    (name, labels), _ = item
+    return (name, [(key, str(value)) for key, value in labels])
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{value}"' for key, value in labels)
+    return "{" + pairs + "}"
+
+
+def enable(buckets=DEFAULT_BUCKETS, thread_safe=False):
+    """Turns metrics on with a new, empty registry and returns it"""
+    global registry
+    registry = Registry(buckets, thread_safe)
+    return registry
+
+
+def disable():
+    """Turns metrics off, dropping everything recorded so far"""
+    global registry
+    registry = None
+
+
+def timer(name, **labels):
+    """Returns a context manager observing the time spent in its body
+
+    While metrics are off, the context manager does nothing."""
+    if registry is None:
+        return _null_timer
+    return registry.timer(name, **labels)
@@ -0,0 +1,63 @@
+"""Define helpers for handling money as integer cents
+
+Balances are held as whole numbers of cents so that arithmetic on
+them is exact and needs no rounding. Amounts coming from users are
+parsed straight into cents, and plain int or float amounts of
+dollars are converted to cents wherever they enter an account."""
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_EVEN
+
+# Largest number of cents an amount or balance may be, as balances
+# and histories are stored as signed 64-bit integers
+MAX_CENTS = 2**63 - 1
+
+
+class Cents(int):
+    """An amount of money that is already expressed in whole cents
+
+    Passing a Cents instance to an account method skips the dollar
+    to cent conversion that plain int and float amounts go through."""
+
+    __slots__ = ()
+
+
+def parse_cents(text):
+    """Returns the dollar amount in a string as Cents
+
+    Amounts with more than two decimal places are rounded half to
+    even. Raises ValueError if the string is not a finite number or
+    is more than MAX_CENTS cents either way, and TypeError if it is
+    not a string at all."""
+    if not isinstance(text, str):
+        raise TypeError(f"expected str, got {type(text).__name__}")
+    try:
+        amount = Decimal(text.strip())
+    except InvalidOperation:
+        raise ValueError(f"invalid amount: {text!r}") from None
+    if not amount.is_finite():
+        raise ValueError(f"invalid amount: {text!r}")
+    cents = Cents(amount.scaleb(2).to_integral_value(ROUND_HALF_EVEN))
+    if not -MAX_CENTS <= cents <= MAX_CENTS:
+        raise ValueError(f"amount out of range: {text!r}")
+    return cents
+
+
+def to_cents(amount):
+    """Returns the given amount of dollars as a number of cents
+
+    Cents are returned unchanged, ints are scaled, and floats are
+    rounded to the nearest cent by their shortest decimal form."""
+    if type(amount) is Cents:
+        return amount
+    if isinstance(amount, int):
+        return amount * 100
+    if isinstance(amount, float):
+        return parse_cents(repr(amount))
+    return parse_cents(amount)
+
+
+def format_cents(cents):
+    """Returns a number of cents formatted as dollars, ex. '-235.00'"""
+    sign = "-" if cents < 0 else ""
+    dollars, cents = divmod(abs(cents), 100)
+    return f"{sign}{dollars}.{cents:02d}"
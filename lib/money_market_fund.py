@@ -8,7 +8,8 @@ withdrawals is less then 2."""
 
 
 from abc import ABC, abstractmethod
-from lib.account import Account
+from lib.account import Account, mutator
+from lib.money import to_cents
 
 
 class MoneyMarket(Account):
@@ -17,18 +18,23 @@ class MoneyMarket(Account):
     Attributes
     ----------
     balance : float
-        The amount of money a given account has, rounded at
-        two decimal places
+        The amount of money a given account has in dollars,
+        held as a whole number of cents
     Methods
     -------
     withdraw():
         subtracts an amount from the current balance if
-        customer has made less then 2 withdrawals"""
+        customer has made less then 2 withdrawals
+    reset_withdrawals():
+        allows 2 more withdrawals, for the start of a new month"""
+
+    __slots__ = ("_transaction_count",)
 
     def __init__(self, _balance):
         super().__init__(_balance)
         self._transaction_count = 0
 
+    @mutator
     def withdraw(self, to_withdraw):
         """Withdraws money from the account
 
@@ -37,9 +43,15 @@ class MoneyMarket(Account):
         and otherwise 1"""
         if self._transaction_count >= 2:
             return -2
+        to_withdraw = to_cents(to_withdraw)
         if to_withdraw > self._balance:
             return -1
         else:
             self._balance -= to_withdraw
             self._transaction_count += 1
             return 1
+
+    @mutator
+    def reset_withdrawals(self):
+        """Resets the monthly withdrawal count to zero"""
+        self._transaction_count = 0
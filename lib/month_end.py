@@ -0,0 +1,158 @@
+"""Define month-end rollover processing for the bank's accounts
+
+Defines the period close run at the end of every month: Money Market
+Fund withdrawal counts are reset, monthly fees are charged to
+accounts below their type's minimum balance, and a closing balance
+record is produced for every account. close_month runs over a whole
+AccountStore at once with bulk array operations, while
+close_month_customers covers customers held as Customer objects,
+such as those of the bank's Directory. Either way, fees are kept in
+the accounts' histories and passed on to the customers holding
+them, as any other change of balance is."""
+
+import operator
+import time
+from array import array
+from collections import namedtuple
+from itertools import compress
+from lib import account_types
+from lib.account import Account
+from lib.directory import Directory
+from lib.history import History
+from lib.money import Cents
+
+# Closing balance and fee charged for one account, where number is
+# the row of a stored account or the 1-based number of a customer's
+ClosingRecord = namedtuple(
+    "ClosingRecord", ("user_id", "account_type", "number", "cents", "fee")
+)
+
+# '[Account Type] : ([Minimum balance], [Monthly fee])' in cents,
+# the fee being charged when the closing balance is below minimum
+DEFAULT_FEES = {
+    "Checking": (150000, 1200),
+    "Money Market Fund": (250000, 1500),
+}
+
+
+def close_month(store, fees=DEFAULT_FEES):
+    """Rolls every account of an AccountStore over to a new month
+
+    Keyword arguments:
+    store -- the AccountStore to close the month of
+    fees -- dictionary of '[Account Type] : ([Minimum], [Fee])'
+        pairings in cents
+
+    Every row is handled in one pass over the store's arrays rather
+    than one account object at a time, so the store must not be
+    changed by anything else while the month is closed. Only the
+    rows charged a fee are then visited again, to record the fee in
+    their history and tell the customer holding them, if any.
+    Returns an array of the fee charged to each row."""
+    # Per type code lookups, types without fees can never be charged
+    minimums = [-(2 ** 63)] * len(account_types.BY_CODE)
+    amounts = [0] * len(account_types.BY_CODE)
+    for account_type, (minimum, fee) in fees.items():
+        type_code = account_types.TYPES[account_type].code
+        minimums[type_code] = minimum
+        amounts[type_code] = fee
+    balances = store.balances
+    charged = array(
+        "q",
+        [
+            amounts[type_code] if balance < minimums[type_code] else 0
+            for balance, type_code in zip(balances, store.types)
+        ],
+    )
+    balances[:] = array("q", map(operator.sub, balances, charged))
+    counts = store.transaction_counts
+    counts[:] = array("B", bytes(len(counts)))
+    timestamp = time.time()
+    for row in compress(range(len(charged)), charged):
+        fee = charged[row]
+        if Account.keep_history:
+            history = store._histories.get(row)
+            if history is None:
+                history = store._histories[row] = History(balances[row] + fee)
+            history.record(1, balances[row], timestamp)
+        account = store.owned(row)
+        if account is not None:
+            account.owner._account_changed(account, -fee)
+    return charged
+
+
+def closing_records(store, charged):
+    """Yields a ClosingRecord for every row of a closed AccountStore
+
+    Keyword arguments:
+    store -- the AccountStore the month was closed for
+    charged -- the array of fees returned by close_month"""
+    by_code = account_types.BY_CODE
+    for row, (user_id, type_code, cents, fee) in enumerate(
+        zip(store.owners, store.types, store.balances, charged)
+    ):
+        yield ClosingRecord(
+            user_id, by_code[type_code].name, row, cents, fee
+        )
+
+
+def close_account(account, fee):
+    """Rolls one account over to a new month, charging it fee cents
+
+    No fee is charged if fee is 0. Accounts limiting their monthly
+    withdrawals, such as Money Market Fund accounts, are allowed
+    them again."""
+    if fee:
+        account.assess_fee(Cents(fee))
+    reset_withdrawals = getattr(account, "reset_withdrawals", None)
+    if reset_withdrawals is not None:
+        reset_withdrawals()
+
+
+def close_month_customers(users, fees=DEFAULT_FEES, journal=None):
+    """Rolls every account of the given customers over to a new month
+
+    Keyword arguments:
+    users -- iterable of every Customer to close the month for, or
+        a Directory
+    fees -- dictionary of '[Account Type] : ([Minimum], [Fee])'
+        pairings in cents
+    journal -- journal to record every account closed in, or None
+
+    This is a per-account loop, calling each account's methods, and
+    is how the bank program closes the month, as its Directory holds
+    Customer objects; only accounts held in an AccountStore get the
+    bulk pass of close_month. A Directory is scanned, so that only
+    the customers with an account to charge or reset are kept
+    loaded. Every account
+    charged or reset is recorded in the journal as a 'Close' of the
+    fee charged. Yields a ClosingRecord for every account as it is
+    closed."""
+    directory = users if isinstance(users, Directory) else None
+    if directory is not None:
+        users = directory.scan()
+    for user in users:
+        held = user if directory is None else None
+        for account_type in account_types.TYPES:
+            accounts = user._accounts.get(account_type, ())
+            minimum, fee = fees.get(account_type, (None, 0))
+            for idx, account in enumerate(accounts):
+                charged = fee if fee and account.cents < minimum else 0
+                if charged or getattr(account, "_transaction_count", 0):
+                    if held is None:
+                        # Changes are only kept by the directory's copy
+                        held = directory.get(user.user_id)
+                    account = held._accounts[account_type][idx]
+                    close_account(account, charged)
+                    if journal is not None:
+                        journal.log_transaction(
+                            held, "Close", account_type, idx, charged
+                        )
+                yield ClosingRecord(
+                    user.user_id,
+                    account_type,
+                    idx + 1,
+                    account.cents,
+                    charged,
+                )
+
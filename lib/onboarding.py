@@ -0,0 +1,131 @@
+"""Define functions to onboard many customers at once from a CSV file
+
+Defines a bulk import of customers and their opening accounts, read
+one row at a time and validated with the same rules as the teller's
+New User and New Account modes. Each row names a new customer, an
+opening account, or both; a row without a customer adds its account
+to the customer of the row above, so customers may open any number
+of accounts:
+
+    first_name,last_name,age,account_type,amount
+    John,Smith,21,Checking,400.00
+    ,,,Savings,1250.00
+    Jane,Doe,35,,
+
+Rows are all or nothing: a row that fails validation adds nothing,
+and is reported with the reason it was rejected. Valid customers are
+built and added in batches, so however large the file, only one
+batch of customers is held on top of those already in the bank."""
+
+import csv
+from collections import namedtuple
+from lib import account_types
+from lib.customer import Customer
+from lib.money import parse_cents
+
+FIELDS = ("first_name", "last_name", "age", "account_type", "amount")
+
+# Counts of what an import added and of the rows it rejected
+ImportSummary = namedtuple(
+    "ImportSummary", ("customers", "accounts", "rejected")
+)
+
+
+def import_csv(stream, users, journal=None, rejects=None, batch_size=4096):
+    """Adds every valid customer and account of a CSV file to the bank
+
+    Keyword arguments:
+    stream -- text stream of CSV rows of FIELDS, opened with
+        newline='', optionally starting with a header naming them
+    users -- Directory of all users in customer database
+    journal -- TransactionLog to record new customers and accounts in
+    rejects -- text stream to write a 'line N: reason' line to for
+        every rejected row, or None
+    batch_size -- number of customers to build before adding them
+
+    Ages must be whole numbers from 0 to 120 and amounts must not be
+    negative. Account types are matched like the teller's, so
+    '401k' and 'checking' are accepted. Blank rows are skipped.
+    Returns an ImportSummary."""
+    customers = accounts = rejected = 0
+    batch = []
+    # Accounts of the customer of the most recent valid customer row,
+    # or None if that row was rejected
+    opened = None
+    for line, row in enumerate(csv.reader(stream), 1):
+        row = [field.strip() for field in row]
+        if line == 1 and tuple(row) == FIELDS:
+            continue
+        try:
+            opened = _add_row(row, batch, opened)
+        except ValueError as e:
+            if any(row[:3]):
+                # Accounts on the rows below are not added to anyone
+                opened = None
+            rejected += 1
+            if rejects is not None:
+                rejects.write(f"line {line}: {e}\n")
+            continue
+        if len(batch) > batch_size:
+            customers, accounts = _flush(
+                batch[:-1], users, journal, customers, accounts
+            )
+            del batch[:-1]
+    customers, accounts = _flush(batch, users, journal, customers, accounts)
+    return ImportSummary(customers, accounts, rejected)
+
+
+def _add_row(row, batch, opened):
+    """Validates a row and adds it to the batch, returns the accounts
+    opened by the customer the next row's account would be added to
+
+    Raises ValueError with the reason if the row is rejected."""
+    if not any(row):
+        return opened
+    if len(row) != len(FIELDS):
+        raise ValueError("Incorrect number of values provided")
+    first_name, last_name, age, account_type, amount = row
+    new_customer = first_name or last_name or age
+    if new_customer:
+        try:
+            age = int(age)
+        except ValueError:
+            raise ValueError("Invalid age field") from None
+        if age < 0 or age > 120:
+            raise ValueError("Invalid age supplied")
+    elif opened is None:
+        raise ValueError("No user to add the account to")
+    account = None
+    if account_type or amount:
+        try:
+            cents = parse_cents(amount)
+        except ValueError:
+            raise ValueError("Amount must be a valid number") from None
+        if cents < 0:
+            raise ValueError("Initial amount must be positive")
+        kind = account_types.get(account_type.title())
+        if kind is None:
+            raise ValueError("Invalid account type")
+        account = (kind, cents)
+    if new_customer:
+        opened = []
+        batch.append((first_name, last_name, age, opened))
+    if account is not None:
+        opened.append(account)
+    return opened
+
+
+def _flush(batch, users, journal, customers, accounts):
+    """Builds and adds a batch of customers, returns the new counts"""
+    for first_name, last_name, age, opened in batch:
+        user = users.add(Customer(first_name, last_name, age))
+        if journal is not None:
+            journal.log_customer(user)
+        for kind, cents in opened:
+            account = kind.account_class(cents)
+            user.add_account(kind.name, account)
+            if journal is not None:
+                journal.log_account(user, kind.name, account)
+        customers += 1
+        accounts += len(opened)
+    return (customers, accounts)
@@ -6,7 +6,8 @@ amount of money, or withdraw a given amount of money if they meet
 the age requirment."""
 
 from abc import ABC, abstractmethod
-from lib.account import Account
+from lib.account import Account, mutator
+from lib.money import to_cents
 
 
 class Retirement(Account):
@@ -15,17 +16,20 @@ class Retirement(Account):
     Attributes
     ----------
     balance : float
-        The amount of money a given account has, rounded at
-        two decimal places
+        The amount of money a given account has in dollars,
+        held as a whole number of cents
     Methods
     -------
     withdraw():
         subtracts an amount from the current balance if
         customer meets the age requirments"""
 
+    __slots__ = ()
+
     def __init__(self, _balance):
         super().__init__(_balance)
 
+    @mutator
     def withdraw(self, to_withdraw, customer_age):
         """Withdraws money from the account
 
@@ -34,6 +38,7 @@ class Retirement(Account):
         and otherwise returns 1"""
         if customer_age < 67:
             return -2
+        to_withdraw = to_cents(to_withdraw)
         if to_withdraw > self._balance:
             return -1
         else:
@@ -8,7 +8,8 @@ nothing is withdrawn."""
 
 
 from abc import ABC, abstractmethod
-from lib.account import Account
+from lib.account import Account, mutator
+from lib.money import to_cents
 
 
 class Savings(Account):
@@ -17,8 +18,8 @@ class Savings(Account):
     Attributes
     ----------
     balance : float
-        The amount of money a given account has, rounded at
-        two decimal places
+        The amount of money a given account has in dollars,
+        held as a whole number of cents
     Methods
     -------
     withdraw():
@@ -26,14 +27,18 @@ class Savings(Account):
         customer would withdraw more than what is in the
         account, nothing is withdrawn"""
 
+    __slots__ = ()
+
     def __init__(self, _balance):
         super().__init__(_balance)
 
+    @mutator
     def withdraw(self, to_withdraw):
         """Withdraws money from the account
 
         Returns negative 1 if withdraw exceeds current account
         balance otherwise returns 1"""
+        to_withdraw = to_cents(to_withdraw)
         if to_withdraw > self._balance:
             return -1
         else:
@@ -0,0 +1,241 @@
+"""Define 'ShardedBank' class for use as a multi-process customer database
+
+Defines a router that partitions customers across a pool of worker
+processes by user_id, so that transactions on customers held by
+different workers run on different cores. Each worker owns a
+Directory of its customers, and the router forwards every call to
+the worker holding the customer. Requests are sent to workers in
+batches, with every worker processing its part of a batch at the
+same time.
+
+ShardedBank is only a library: the bank_of_nerds program keeps all
+of its customers in one process and never uses it. How its
+throughput scales with cores can be measured with the --shards
+option of bench.benchmarks. Every request pays for a round trip
+through a pipe, so only batches large enough to keep the workers
+busy can gain from more of them."""
+
+import itertools
+import multiprocessing
+import os
+from lib import account_types
+from lib.customer import Customer
+from lib.directory import Directory
+
+
+def _add_customer(users, user_id, first_name, last_name, age):
+    users.add(Customer(first_name, last_name, age, user_id))
+    return user_id
+
+
+def _add_account(users, user_id, account_type, amount):
+    account = account_types.TYPES[account_type].account_class(amount)
+    _get_user(users, user_id).add_account(account_type, account)
+    return 1
+
+
+def _deposit_into(users, user_id, account_type, idx, amount):
+    return _get_user(users, user_id).deposit_into(account_type, idx, amount)
+
+
+def _withdraw_from(users, user_id, account_type, idx, amount):
+    user = _get_user(users, user_id)
+    return user.withdraw_from(account_type, idx, amount)
+
+
+def _get_all_balances(users, user_id):
+    return _get_user(users, user_id).get_all_balances()
+
+
+def _list_users(users):
+    return [(user.user_id, user.first_name, user.last_name) for user in users]
+
+
+def _get_user(users, user_id):
+    user = users.get(user_id)
+    if user is None:
+        raise KeyError(user_id)
+    return user
+
+
+_HANDLERS = {
+    "add_customer": _add_customer,
+    "add_account": _add_account,
+    "deposit_into": _deposit_into,
+    "withdraw_from": _withdraw_from,
+    "get_all_balances": _get_all_balances,
+    "list_users": _list_users,
+}
+
+
+def _serve_shard(connection):
+    """Runs a worker process's loop until it is sent None
+
+    Every message is a list of (method, args) requests, answered
+    with a list of (succeeded, result or exception) replies."""
+    users = Directory()
+    while True:
+        requests = connection.recv()
+        if requests is None:
+            break
+        replies = []
+        for method, args in requests:
+            try:
+                replies.append((True, _HANDLERS[method](users, *args)))
+            except Exception as e:
+                replies.append((False, e))
+        connection.send(replies)
+    connection.close()
+
+
+class ShardedBank():
+    """A class that represents customers partitioned across processes
+
+    The customer with a given user_id is always held by worker
+    user_id % shards. Exceptions raised by a worker, such as the
+    IndexError of an invalid account number or the KeyError of an
+    unknown user_id, are raised again by the router. New user_ids
+    are numbered from first_user_id, or are taken from allocator, an
+    IdAllocator, when one is given.
+
+    Attributes
+    ----------
+    shards : int
+        number of worker processes
+
+    Methods
+    -------
+    add_customer(first_name, last_name, age):
+        creates a customer on its worker, returns their user_id
+    add_account(user_id, account_type, amount):
+        adds a new account of the given type to a customer
+    deposit_into(user_id, account_type, idx, amount):
+        adds money to a customer's account
+    withdraw_from(user_id, account_type, idx, amount):
+        subtracts money from a customer's account
+    get_all_balances(user_id):
+        returns a customer's account statement
+    get_users():
+        returns (user_id, first, last) of every customer
+    apply_batch(requests):
+        forwards many calls at once, returns all their results
+    close():
+        stops every worker process"""
+
+    def __init__(self, shards=None, first_user_id=1, allocator=None):
+        self._shards = shards or os.cpu_count() or 1
+        if allocator is None:
+            self._next_user_id = itertools.count(first_user_id).__next__
+        else:
+            self._next_user_id = allocator.next_id
+        self._connections = []
+        self._processes = []
+        for _ in range(self._shards):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_serve_shard, args=(child,), daemon=True
+            )
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def shards(self):
+        """Number of worker processes"""
+        return self._shards
+
+    def _call(self, method, user_id, *args):
+        connection = self._connections[user_id % self._shards]
+        connection.send([(method, (user_id,) + args)])
+        [(succeeded, result)] = connection.recv()
+        if not succeeded:
+            raise result
+        return result
+
+    def add_customer(self, first_name, last_name, age):
+        """Creates a customer on its worker, returns their user_id"""
+        user_id = self._next_user_id()
+        return self._call(
+            "add_customer", user_id, first_name, last_name, age
+        )
+
+    def add_account(self, user_id, account_type, amount):
+        """Adds a new account of the given type to a customer"""
+        return self._call("add_account", user_id, account_type, amount)
+
+    def deposit_into(self, user_id, account_type, idx, amount):
+        """Adds money to the specified account, returns its result"""
+        return self._call("deposit_into", user_id, account_type, idx, amount)
+
+    def withdraw_from(self, user_id, account_type, idx, amount):
+        """Subtracts money from the specified account
+
+        Returns the result of the account's withdraw method, with
+        a 401K's age check made against the customer's age."""
+        return self._call(
+            "withdraw_from", user_id, account_type, idx, amount
+        )
+
+    def get_all_balances(self, user_id):
+        """Returns string containing balances for all accounts"""
+        return self._call("get_all_balances", user_id)
+
+    def get_users(self):
+        """Returns (user_id, first, last) of every customer by user_id"""
+        for connection in self._connections:
+            connection.send([("list_users", ())])
+        users = []
+        for connection in self._connections:
+            [(_, shard_users)] = connection.recv()
+            users.extend(shard_users)
+        users.sort()
+        return users
+
+    def apply_batch(self, requests):
+        """Forwards many calls to the workers at once
+
+        Keyword arguments:
+        requests -- iterable of (method, user_id, *args) tuples,
+            where method is the name of one of the calls above
+            other than add_customer and get_users
+
+        Every worker receives its part of the batch in one message
+        and all of them work on it at the same time. Returns the
+        result of every request in order, with the exception for
+        any request that failed in place of its result."""
+        batches = [[] for _ in range(self._shards)]
+        positions = [[] for _ in range(self._shards)]
+        count = 0
+        for method, user_id, *args in requests:
+            shard = user_id % self._shards
+            batches[shard].append((method, (user_id, *args)))
+            positions[shard].append(count)
+            count += 1
+        for connection, batch in zip(self._connections, batches):
+            if batch:
+                connection.send(batch)
+        results = [None] * count
+        for shard, connection in enumerate(self._connections):
+            if not batches[shard]:
+                continue
+            replies = connection.recv()
+            for position, (_, result) in zip(positions[shard], replies):
+                results[position] = result
+        return results
+
+    def close(self):
+        """Stops every worker process"""
+        for connection, process in zip(self._connections, self._processes):
+            if process.is_alive():
+                connection.send(None)
+                process.join()
+            connection.close()
+        self._connections = []
+        self._processes = []
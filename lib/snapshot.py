@@ -0,0 +1,237 @@
+"""Define 'Snapshot' class for use as a memory-mapped customer database
+
+Defines a compact binary file format holding every customer and
+account of the bank, a function to write it, and a class that opens
+it with mmap. Opening a snapshot only reads its fixed-size header,
+and customers are materialized from the mapped file one at a time
+as they are looked up, so start-up time does not grow with the
+number of customers held.
+
+The file starts with a header, followed by a table of fixed-size
+customer records sorted by user_id, a table of fixed-size account
+records grouped by customer, and finally the customers' names."""
+
+import mmap
+import os
+import struct
+from lib import account_types
+from lib.customer import Customer
+from lib.money import Cents
+
+MAGIC = b"BONS"
+VERSION = 1
+
+# magic, version, reserved, customer count, account count,
+# max user_id, journal offset
+_HEADER = struct.Struct("<4sHHqqqq")
+# user_id, first account, name offset, age, account count,
+# first name length, last name length
+_CUSTOMER = struct.Struct("<qqqiIHH")
+# balance in cents, type code, transaction count
+_ACCOUNT = struct.Struct("<qBB")
+
+
+def write_snapshot(path, users, journal_offset=0):
+    """Writes every customer in users to a snapshot file at path
+
+    Keyword arguments:
+    path -- path of the snapshot file, replaced if it exists
+    users -- iterable of every Customer to store, such as
+        Directory.scan()
+    journal_offset -- size of the transaction log already applied
+        to users, so replay can resume after it
+
+    Customers are packed one at a time as they are yielded, so none
+    of them need stay loaded, and their records are only sorted
+    afterwards if they were not yielded in order of user_id. The
+    snapshot is written to a temporary file first and renamed over
+    path, so a crash never leaves a partial snapshot behind."""
+    customer_table = bytearray()
+    account_table = bytearray()
+    names = bytearray()
+    account_count = 0
+    customer_count = 0
+    max_user_id = 0
+    in_order = True
+    for user in users:
+        first_name = user.first_name.encode()
+        last_name = user.last_name.encode()
+        first_account = account_count
+        for account_type in account_types.BY_CODE:
+            for account in user._accounts.get(account_type.name, ()):
+                account_table += _ACCOUNT.pack(
+                    account.cents,
+                    account_type.code,
+                    getattr(account, "_transaction_count", 0),
+                )
+                account_count += 1
+        customer_table += _CUSTOMER.pack(
+            user.user_id,
+            first_account,
+            len(names),
+            user.age,
+            account_count - first_account,
+            len(first_name),
+            len(last_name),
+        )
+        names += first_name + last_name
+        customer_count += 1
+        if user.user_id < max_user_id:
+            in_order = False
+        max_user_id = max(max_user_id, user.user_id)
+    if not in_order:
+        size = _CUSTOMER.size
+        records = sorted(
+            (
+                customer_table[offset:offset + size]
+                for offset in range(0, len(customer_table), size)
+            ),
+            key=lambda record: _CUSTOMER.unpack_from(record)[0],
+        )
+        customer_table = b"".join(records)
+    header = _HEADER.pack(
+        MAGIC,
+        VERSION,
+        0,
+        customer_count,
+        account_count,
+        max_user_id,
+        journal_offset,
+    )
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as snapshot_file:
+        snapshot_file.write(header)
+        snapshot_file.write(customer_table)
+        snapshot_file.write(account_table)
+        snapshot_file.write(names)
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(tmp_path, path)
+
+
+class Snapshot():
+    """A class that represents an open, memory-mapped snapshot file
+
+    Attributes
+    ----------
+    max_user_id : int
+        highest user_id held in the snapshot
+    journal_offset : int
+        size of the transaction log already applied to the snapshot
+
+    Methods
+    -------
+    get(user_id):
+        returns a new Customer built from the snapshot, or None
+    user_ids():
+        yields every user_id in the snapshot in ascending order
+    close():
+        unmaps the snapshot file"""
+
+    def __init__(self, path):
+        with open(path, "rb") as snapshot_file:
+            self._map = mmap.mmap(
+                snapshot_file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        (
+            magic,
+            version,
+            _,
+            self._customer_count,
+            account_count,
+            self._max_user_id,
+            self._journal_offset,
+        ) = _HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} snapshot")
+        self._customers_at = _HEADER.size
+        self._accounts_at = (
+            self._customers_at + self._customer_count * _CUSTOMER.size
+        )
+        self._names_at = self._accounts_at + account_count * _ACCOUNT.size
+        # New customers must never reuse a user_id from the snapshot
+        Customer.observe_id(self._max_user_id)
+
+    def __len__(self):
+        return self._customer_count
+
+    def __contains__(self, user_id):
+        return self._find(user_id) is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def max_user_id(self):
+        """Highest user_id held in the snapshot"""
+        return self._max_user_id
+
+    @property
+    def journal_offset(self):
+        """Size of the transaction log already applied to the snapshot"""
+        return self._journal_offset
+
+    def _user_id_at(self, idx):
+        return struct.unpack_from(
+            "<q", self._map, self._customers_at + idx * _CUSTOMER.size
+        )[0]
+
+    def _find(self, user_id):
+        """Returns the customer table index of user_id or None"""
+        low, high = 0, self._customer_count
+        while low < high:
+            mid = (low + high) // 2
+            if self._user_id_at(mid) < user_id:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self._customer_count and self._user_id_at(low) == user_id:
+            return low
+        return None
+
+    def user_ids(self):
+        """Yields every user_id in the snapshot in ascending order"""
+        for idx in range(self._customer_count):
+            yield self._user_id_at(idx)
+
+    def get(self, user_id):
+        """Returns a new Customer built from the snapshot or None"""
+        idx = self._find(user_id)
+        if idx is None:
+            return None
+        (
+            user_id,
+            first_account,
+            name_off,
+            age,
+            account_count,
+            first_len,
+            last_len,
+        ) = _CUSTOMER.unpack_from(
+            self._map, self._customers_at + idx * _CUSTOMER.size
+        )
+        name_at = self._names_at + name_off
+        first_name = self._map[name_at:name_at + first_len].decode()
+        name_at += first_len
+        last_name = self._map[name_at:name_at + last_len].decode()
+        user = Customer(first_name, last_name, age, user_id)
+        account_at = self._accounts_at + first_account * _ACCOUNT.size
+        for _ in range(account_count):
+            cents, type_code, transaction_count = _ACCOUNT.unpack_from(
+                self._map, account_at
+            )
+            account_type = account_types.BY_CODE[type_code]
+            account = account_type.account_class(Cents(cents))
+            if transaction_count:
+                account._transaction_count = transaction_count
+            user.add_account(account_type.name, account)
+            account_at += _ACCOUNT.size
+        return user
+
+    def close(self):
+        """Unmaps the snapshot file"""
+        self._map.close()
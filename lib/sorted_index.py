@@ -0,0 +1,127 @@
+"""Define 'SortedIndex' class for use as a maintained secondary index
+
+Defines a sorted collection of key tuples that stays sorted as keys
+are added and removed, for answering range and top-N queries without
+scanning everything indexed. Keys are held in a list of sorted chunks
+of bounded size rather than in one flat list, so adding or removing
+a key only shifts the keys of one chunk however many are indexed."""
+
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+
+# Number of keys a chunk holds before it is split in two
+_CHUNK_SIZE = 1000
+
+
+class SortedIndex():
+    """A class that represents a sorted collection of keys
+
+    Keys are usually tuples whose first item is the value indexed
+    on, followed by enough items to tell equal values apart.
+
+    Methods
+    -------
+    add(key):
+        adds a key to the index
+    remove(key):
+        removes a key from the index
+    irange(low=None, high=None):
+        yields every key from low to high in ascending order
+    largest(count):
+        returns the count largest keys in descending order"""
+
+    __slots__ = ("_chunks", "_maxes", "_len")
+
+    def __init__(self, keys=()):
+        keys = sorted(keys)
+        self._chunks = [
+            keys[idx:idx + _CHUNK_SIZE]
+            for idx in range(0, len(keys), _CHUNK_SIZE)
+        ]
+        self._maxes = [chunk[-1] for chunk in self._chunks]
+        self._len = len(keys)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from chunk
+
+    def __reversed__(self):
+        for chunk in reversed(self._chunks):
+            yield from reversed(chunk)
+
+    def __contains__(self, key):
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            return False
+        chunk = self._chunks[pos]
+        idx = bisect_left(chunk, key)
+        return idx < len(chunk) and chunk[idx] == key
+
+    def add(self, key):
+        """Adds a key to the index"""
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            return
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            # Larger than every key so far
+            pos -= 1
+            self._chunks[pos].append(key)
+            self._maxes[pos] = key
+        else:
+            insort(self._chunks[pos], key)
+        self._len += 1
+        chunk = self._chunks[pos]
+        if len(chunk) > 2 * _CHUNK_SIZE:
+            self._chunks[pos:pos + 1] = [
+                chunk[:_CHUNK_SIZE], chunk[_CHUNK_SIZE:]
+            ]
+            self._maxes[pos:pos + 1] = [chunk[_CHUNK_SIZE - 1], chunk[-1]]
+
+    def remove(self, key):
+        """Removes a key from the index
+
+        Raises KeyError if the key is not in the index."""
+        pos = bisect_left(self._maxes, key)
+        if pos < len(self._maxes):
+            chunk = self._chunks[pos]
+            idx = bisect_left(chunk, key)
+            if idx < len(chunk) and chunk[idx] == key:
+                del chunk[idx]
+                self._len -= 1
+                if not chunk:
+                    del self._chunks[pos]
+                    del self._maxes[pos]
+                elif idx == len(chunk):
+                    self._maxes[pos] = chunk[-1]
+                return
+        raise KeyError(key)
+
+    def irange(self, low=None, high=None):
+        """Yields every key from low to high inclusive in ascending order
+
+        Either bound may be None to leave that end of the range open.
+        Bounds are compared as tuples, so (-1,) is below every key
+        starting with -1 and (-1, math.inf) is above all of them."""
+        if low is None:
+            pos, idx = 0, 0
+        else:
+            pos = bisect_left(self._maxes, low)
+            if pos == len(self._maxes):
+                return
+            idx = bisect_left(self._chunks[pos], low)
+        for chunk in islice(self._chunks, pos, None):
+            if high is not None and chunk[-1] > high:
+                yield from islice(chunk, idx, bisect_right(chunk, high))
+                return
+            yield from islice(chunk, idx, None)
+            idx = 0
+
+    def largest(self, count):
+        """Returns a list of the count largest keys, largest first"""
+        return list(islice(reversed(self), count))
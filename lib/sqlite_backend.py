@@ -0,0 +1,427 @@
+"""Define 'SQLiteBackend' class for use as an on-disk customer database
+
+Defines a persistence backend built on the standard library's sqlite3
+module, with tables for customers, accounts, and transactions. It can
+back a Directory, loading each customer with an indexed query the
+first time they are looked up, and records every change made to them
+the same way a TransactionLog does, so the two are interchangeable.
+Changes are buffered and written in bulk with executemany, and
+lookups are answered from the buffers where they can be, so that
+looking customers up does not force a write. Writes are made on a
+connection of their own, with the database in write-ahead logging
+mode, so lookups never wait for a write to finish."""
+
+import heapq
+import json
+import sqlite3
+import threading
+import time
+from lib import account_types
+from lib.customer import Customer
+from lib.money import Cents, format_cents
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    user_id INTEGER PRIMARY KEY,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    age INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    user_id INTEGER NOT NULL REFERENCES customers (user_id),
+    type_code INTEGER NOT NULL,
+    number INTEGER NOT NULL,
+    cents INTEGER NOT NULL,
+    transaction_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, type_code, number)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    type_code INTEGER NOT NULL,
+    number INTEGER NOT NULL,
+    op TEXT NOT NULL,
+    cents INTEGER NOT NULL,
+    timestamp REAL
+);
+CREATE INDEX IF NOT EXISTS transactions_by_account
+    ON transactions (user_id, type_code, number);
+"""
+
+_INSERT_CUSTOMER = (
+    "INSERT INTO customers (user_id, first_name, last_name, age) "
+    "VALUES (?, ?, ?, ?)"
+)
+_INSERT_ACCOUNT = (
+    "INSERT INTO accounts "
+    "(user_id, type_code, number, cents, transaction_count) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+_UPDATE_ACCOUNT = (
+    "UPDATE accounts SET cents = ?, transaction_count = ? "
+    "WHERE user_id = ? AND type_code = ? AND number = ?"
+)
+_INSERT_TRANSACTION = (
+    "INSERT INTO transactions "
+    "(user_id, type_code, number, op, cents, timestamp) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+# Adds the timestamp column to databases created without it
+_ADD_TIMESTAMP = "ALTER TABLE transactions ADD COLUMN timestamp REAL"
+
+_SELECT_CUSTOMER = (
+    "SELECT first_name, last_name, age FROM customers WHERE user_id = ?"
+)
+_SELECT_ACCOUNTS = (
+    "SELECT type_code, cents, transaction_count FROM accounts "
+    "WHERE user_id = ? ORDER BY type_code, number"
+)
+
+
+class SQLiteBackend():
+    """A class that represents a SQLite database of customers
+
+    Changes are buffered until group_size of them are pending or
+    commit() is called, then written with one executemany per
+    statement inside a single database transaction. Customers whose
+    creation is still pending are counted and listed as held, and
+    only loading a customer with pending changes commits them first.
+    commit() may be called from another thread while changes are
+    logged and customers looked up, and lookups made meanwhile see
+    the database as it was before the commit, along with the
+    customers it is writing.
+
+    Attributes
+    ----------
+    path : str
+        path of the database file
+    group_size : int
+        number of pending changes that triggers a commit
+    pending : int
+        number of changes not yet committed to the database
+    max_user_id : int
+        highest user_id held in the database
+
+    Methods
+    -------
+    get(user_id):
+        returns a new Customer loaded from the database, or None
+    user_ids():
+        yields every user_id in the database in ascending order
+    get_all_balances(user_id):
+        returns a customer's account balances without loading them
+    save_customers(customers):
+        writes many customers and their accounts at once
+    log_customer(customer):
+        records the creation of a customer
+    log_account(customer, account_type, account):
+        records an account being added to a customer
+    log_transaction(customer, op, account_type, idx, amount):
+        records a withdrawal, deposit or month-end close of an account
+    commit():
+        writes all pending changes to the database
+    close():
+        commits pending changes and closes the database"""
+
+    def __init__(self, path, group_size=64):
+        self._path = path
+        self._group_size = group_size
+        self._pending = 0
+        self._customer_rows = []
+        self._account_rows = []
+        self._update_rows = []
+        self._transaction_rows = []
+        # user_ids of customers created, and of every customer
+        # changed, by pending changes
+        self._new_user_ids = set()
+        self._changed_user_ids = set()
+        # Guards the buffers, the connection lookups are made on, and
+        # the connection writes are made on, which is held for the
+        # whole of a commit and keeps commits in order
+        self._lock = threading.Lock()
+        self._connection_lock = threading.RLock()
+        self._writer_lock = threading.Lock()
+        self._writer = sqlite3.connect(path, check_same_thread=False)
+        # Lets lookups read the database while a commit writes it
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.executescript(_SCHEMA)
+        columns = self._writer.execute("PRAGMA table_info(transactions)")
+        if "timestamp" not in [column[1] for column in columns]:
+            with self._writer:
+                self._writer.execute(_ADD_TIMESTAMP)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        # New customers must never reuse a user_id from the database
+        Customer.observe_id(self.max_user_id)
+
+    def __len__(self):
+        # Customers being committed may already be in the database,
+        # so are only counted once
+        query = (
+            "SELECT COUNT(*) FROM customers "
+            "WHERE user_id NOT IN (SELECT value FROM json_each(?))"
+        )
+        with self._lock:
+            new_user_ids = list(self._new_user_ids)
+        with self._connection_lock:
+            count = self._connection.execute(
+                query, (json.dumps(new_user_ids),)
+            ).fetchone()[0]
+        return count + len(new_user_ids)
+
+    def __contains__(self, user_id):
+        query = "SELECT 1 FROM customers WHERE user_id = ?"
+        with self._lock:
+            if user_id in self._new_user_ids:
+                return True
+        with self._connection_lock:
+            row = self._connection.execute(query, (user_id,)).fetchone()
+        return row is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def path(self):
+        """Path of the database file"""
+        return self._path
+
+    @property
+    def group_size(self):
+        """Number of pending changes that triggers a commit"""
+        return self._group_size
+
+    @property
+    def pending(self):
+        """Number of changes not yet committed to the database"""
+        return self._pending
+
+    @property
+    def max_user_id(self):
+        """Highest user_id held in the database"""
+        query = "SELECT MAX(user_id) FROM customers"
+        with self._connection_lock:
+            max_user_id = self._connection.execute(query).fetchone()[0]
+        with self._lock:
+            return max(max_user_id or 0, *self._new_user_ids, 0)
+
+    def user_ids(self):
+        """Yields every user_id in the database in ascending order"""
+        query = "SELECT user_id FROM customers ORDER BY user_id"
+        with self._lock:
+            new_user_ids = sorted(self._new_user_ids)
+        with self._connection_lock:
+            cursor = self._connection.execute(query)
+        last_user_id = None
+        # A customer committed while listing may be read back as well
+        for user_id in heapq.merge(self._fetch(cursor), new_user_ids):
+            if user_id != last_user_id:
+                yield user_id
+            last_user_id = user_id
+
+    def _fetch(self, cursor, size=1024):
+        """Yields the first column of every row of cursor"""
+        while True:
+            with self._connection_lock:
+                rows = cursor.fetchmany(size)
+            if not rows:
+                return
+            for (value,) in rows:
+                yield value
+
+    def get(self, user_id):
+        """Returns a new Customer loaded from the database or None"""
+        if user_id in self._changed_user_ids:
+            self.commit()
+        with self._connection_lock:
+            row = self._connection.execute(
+                _SELECT_CUSTOMER, (user_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            account_rows = self._connection.execute(
+                _SELECT_ACCOUNTS, (user_id,)
+            ).fetchall()
+        first_name, last_name, age = row
+        user = Customer(first_name, last_name, age, user_id)
+        for type_code, cents, transaction_count in account_rows:
+            account_type = account_types.BY_CODE[type_code]
+            account = account_type.account_class(Cents(cents))
+            if transaction_count:
+                account._transaction_count = transaction_count
+            user.add_account(account_type.name, account)
+        return user
+
+    def get_all_balances(self, user_id):
+        """Returns string containing balances for all accounts
+
+        The string matches Customer.get_all_balances, but is built
+        straight from the database without loading the customer."""
+        if user_id in self._changed_user_ids:
+            self.commit()
+        with self._connection_lock:
+            account_rows = self._connection.execute(
+                _SELECT_ACCOUNTS, (user_id,)
+            ).fetchall()
+        final_listing = []
+        number = 0
+        last_type_code = None
+        for type_code, cents, _ in account_rows:
+            number = number + 1 if type_code == last_type_code else 1
+            last_type_code = type_code
+            account_type = account_types.BY_CODE[type_code].name
+            final_listing.append(
+                f"{account_type} #{number}\n"
+                f"Account balance: ${format_cents(cents)}"
+            )
+        return "\n\n".join(final_listing)
+
+    def save_customers(self, customers):
+        """Writes many customers and all their accounts at once"""
+        self.commit()
+        customer_rows = []
+        account_rows = []
+        for user in customers:
+            customer_rows.append(
+                (user.user_id, user.first_name, user.last_name, user.age)
+            )
+            for account_type in account_types.BY_CODE:
+                accounts = user._accounts.get(account_type.name, ())
+                for number, account in enumerate(accounts, 1):
+                    account_rows.append(
+                        (
+                            user.user_id,
+                            account_type.code,
+                            number,
+                            account.cents,
+                            getattr(account, "_transaction_count", 0),
+                        )
+                    )
+        with self._writer_lock, self._writer:
+            self._writer.executemany(_INSERT_CUSTOMER, customer_rows)
+            self._writer.executemany(_INSERT_ACCOUNT, account_rows)
+
+    def _changed(self, customer):
+        """Counts a change, returns whether a commit is due
+
+        Called holding the lock of the buffers."""
+        self._changed_user_ids.add(customer.user_id)
+        self._pending += 1
+        return self._pending >= self._group_size
+
+    def log_customer(self, customer):
+        """Records the creation of a customer"""
+        row = (
+            customer.user_id,
+            customer.first_name,
+            customer.last_name,
+            customer.age,
+        )
+        with self._lock:
+            self._customer_rows.append(row)
+            self._new_user_ids.add(customer.user_id)
+            full = self._changed(customer)
+        if full:
+            self.commit()
+
+    def log_account(self, customer, account_type, account):
+        """Records an account being added to a customer"""
+        number = len(customer._accounts[account_type])
+        row = (
+            customer.user_id,
+            account_types.TYPES[account_type].code,
+            number,
+            account.cents,
+            getattr(account, "_transaction_count", 0),
+        )
+        with self._lock:
+            self._account_rows.append(row)
+            full = self._changed(customer)
+        if full:
+            self.commit()
+
+    def log_transaction(self, customer, op, account_type, idx, amount):
+        """Records a withdrawal, deposit or month-end close of an account
+
+        Keyword arguments:
+        customer -- the Customer whose account was modified
+        op -- 'Withdraw', 'Deposit' or 'Close'
+        account_type -- type of the modified account
+        idx -- index of the account within its type
+        amount -- amount withdrawn, deposited or charged as a monthly
+            fee in cents
+
+        The transaction is stored with the time it was logged."""
+        account = customer._accounts[account_type][idx]
+        type_code = account_types.TYPES[account_type].code
+        key = (customer.user_id, type_code, idx + 1)
+        update_row = (
+            account.cents,
+            getattr(account, "_transaction_count", 0),
+        ) + key
+        with self._lock:
+            self._update_rows.append(update_row)
+            self._transaction_rows.append(
+                key + (op, int(amount), time.time())
+            )
+            full = self._changed(customer)
+        if full:
+            self.commit()
+
+    def commit(self):
+        """Writes all pending changes in a single database transaction
+
+        Changes logged while the commit is being made are left for
+        the next one. Customers it writes are still listed as held
+        until it is done."""
+        with self._writer_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                pending = self._pending
+                customer_rows, self._customer_rows = self._customer_rows, []
+                account_rows, self._account_rows = self._account_rows, []
+                update_rows, self._update_rows = self._update_rows, []
+                transaction_rows = self._transaction_rows
+                self._transaction_rows = []
+                self._pending = 0
+            try:
+                with self._writer:
+                    self._writer.executemany(_INSERT_CUSTOMER, customer_rows)
+                    self._writer.executemany(_INSERT_ACCOUNT, account_rows)
+                    self._writer.executemany(_UPDATE_ACCOUNT, update_rows)
+                    self._writer.executemany(
+                        _INSERT_TRANSACTION, transaction_rows
+                    )
+            except BaseException:
+                # Still pending, ahead of any logged since
+                with self._lock:
+                    self._customer_rows[:0] = customer_rows
+                    self._account_rows[:0] = account_rows
+                    self._update_rows[:0] = update_rows
+                    self._transaction_rows[:0] = transaction_rows
+                    self._pending += pending
+                raise
+            with self._lock:
+                self._new_user_ids.difference_update(
+                    row[0] for row in customer_rows
+                )
+                self._changed_user_ids = {
+                    row[0]
+                    for rows in (
+                        self._customer_rows,
+                        self._account_rows,
+                        self._transaction_rows,
+                    )
+                    for row in rows
+                }
+
+    def close(self):
+        """Commits all pending changes and closes the database"""
+        self.commit()
+        with self._writer_lock:
+            self._writer.close()
+        with self._connection_lock:
+            self._connection.close()
@@ -0,0 +1,225 @@
+"""Define 'TransactionLog' class for use as a write-ahead log
+
+Defines an append-only log of every customer, account, and applied
+transaction, with records written to disk in groups so that many
+records share a single fsync. A replay function rebuilds the logged
+customers and accounts and re-applies every logged transaction."""
+
+import json
+import os
+import threading
+import time
+from lib import account_types, month_end
+from lib.account import recorded_at
+from lib.customer import Customer
+from lib.money import Cents
+
+# Record kind of each operation passed to log_transaction
+_KINDS = {"Withdraw": "W", "Deposit": "D", "Close": "M"}
+
+
+class TransactionLog():
+    """A class that represents a write-ahead transaction log
+
+    Every record is one JSON array per line. Records are buffered
+    until group_size of them are pending or commit() is called,
+    then written and flushed to disk with a single fsync. commit()
+    may be called from another thread while records are logged.
+
+    Attributes
+    ----------
+    path : str
+        path of the log file
+    group_size : int
+        number of pending records that triggers a commit
+    pending : int
+        number of records not yet committed to disk
+    offset : int
+        size in bytes of the records committed to disk
+
+    Methods
+    -------
+    log_customer(customer):
+        records the creation of a customer
+    log_account(customer, account_type, account):
+        records an account being added to a customer
+    log_transaction(customer, op, account_type, idx, amount):
+        records a withdrawal, deposit or month-end close of an account
+    commit():
+        writes all pending records to disk
+    close():
+        commits pending records and closes the log"""
+
+    def __init__(self, path, group_size=64):
+        self._path = path
+        self._group_size = group_size
+        self._pending = []
+        # Guards the pending records, and keeps commits in order
+        self._lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def path(self):
+        """Path of the log file"""
+        return self._path
+
+    @property
+    def group_size(self):
+        """Number of pending records that triggers a commit"""
+        return self._group_size
+
+    @property
+    def pending(self):
+        """Number of records not yet committed to disk"""
+        return len(self._pending)
+
+    @property
+    def offset(self):
+        """Size in bytes of the records committed to disk"""
+        return os.path.getsize(self._path)
+
+    def _append(self, record):
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            self._pending.append(line)
+            full = len(self._pending) >= self._group_size
+        if full:
+            self.commit()
+
+    def log_customer(self, customer):
+        """Records the creation of a customer"""
+        self._append(
+            [
+                "C",
+                customer.user_id,
+                customer.first_name,
+                customer.last_name,
+                customer.age,
+            ]
+        )
+
+    def log_account(self, customer, account_type, account):
+        """Records an account being added to a customer"""
+        self._append(["A", customer.user_id, account_type, account.cents])
+
+    def log_transaction(self, customer, op, account_type, idx, amount):
+        """Records a withdrawal, deposit or month-end close of an account
+
+        Keyword arguments:
+        customer -- the Customer whose account was modified
+        op -- 'Withdraw', 'Deposit' or 'Close'
+        account_type -- type of the modified account
+        idx -- index of the account within its type
+        amount -- amount withdrawn, deposited or charged as a monthly
+            fee in cents
+
+        The record holds the time it was logged, which replay() keeps
+        in the account's history as the time of the transaction."""
+        kind = _KINDS[op]
+        self._append(
+            [
+                kind,
+                customer.user_id,
+                account_type,
+                idx,
+                int(amount),
+                time.time(),
+            ]
+        )
+
+    def commit(self):
+        """Writes all pending records to disk with a single fsync
+
+        Records logged while the commit is being made are left for
+        the next one."""
+        with self._commit_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                records, self._pending = self._pending, []
+            try:
+                self._file.write("".join(records))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except BaseException:
+                # Still pending, ahead of any logged since
+                with self._lock:
+                    self._pending[:0] = records
+                raise
+
+    def close(self):
+        """Commits all pending records and closes the log file"""
+        if not self._file.closed:
+            self.commit()
+            self._file.close()
+
+
+def replay(path, users, offset=0):
+    """Re-applies every record of a transaction log, returns its end
+
+    Keyword arguments:
+    path -- path of the log file
+    users -- Directory to restore the logged customers into
+    offset -- number of bytes at the start of the log to skip,
+        such as those already applied to a snapshot
+
+    Customers are restored with their logged user_id, and every
+    transaction is kept in its account's history with the time it
+    was logged, or the time of the replay for records logged without
+    one by older versions. A final record
+    that was only partly written before a crash, without its ending
+    newline, is ignored, and any other unreadable record raises
+    ValueError. Returns the offset in bytes just past the last
+    complete record, where the log should be truncated before more
+    records are appended to it."""
+    with open(path, "rb") as log_file:
+        log_file.seek(offset)
+        lines = log_file.readlines()
+    end = offset
+    for line_no, line in enumerate(lines, 1):
+        if not line.endswith(b"\n"):
+            # Case: torn write of the last record before a crash
+            break
+        try:
+            record = json.loads(line)
+        except ValueError:
+            raise ValueError(f"{path}:{line_no}: unreadable record")
+        end += len(line)
+        kind, user_id = record[0], record[1]
+        if kind == "C":
+            first_name, last_name, age = record[2:]
+            users.add(Customer(first_name, last_name, age, user_id))
+            continue
+        user = users.get(user_id)
+        if user is None:
+            raise ValueError(f"{path}:{line_no}: unknown user {user_id}")
+        if kind == "A":
+            account_type, cents = record[2:]
+            account_class = account_types.TYPES[account_type].account_class
+            account = account_class(Cents(cents))
+            user.add_account(account_type, account)
+        elif kind in ("W", "D", "M"):
+            account_type, idx, cents = record[2:5]
+            timestamp = record[5] if len(record) > 5 else None
+            with recorded_at(timestamp):
+                _replay_transaction(user, kind, account_type, idx, cents)
+        else:
+            raise ValueError(f"{path}:{line_no}: unknown record {kind!r}")
+    return end
+
+
+def _replay_transaction(user, kind, account_type, idx, cents):
+    """Re-applies one logged withdrawal, deposit or month-end close"""
+    if kind == "W":
+        user.withdraw_from(account_type, idx, Cents(cents))
+    elif kind == "D":
+        user.deposit_into(account_type, idx, Cents(cents))
+    else:
+        month_end.close_account(user._accounts[account_type][idx], cents)
@@ -0,0 +1,174 @@
+"""Define functions to move money between accounts in one step
+
+Defines a transfer between any two accounts, of the same customer or
+of different ones, that withdraws from one and deposits into the
+other as a single change, and a settlement of many transfers at once
+that nets them per account so every account's balance is written
+only once. Both honor the withdrawal rules of each account's type:
+Checking overdraft fees, Savings and Money Market Fund rejections,
+and the 401K age requirement.
+
+While Account.thread_safe is set, the locks of every account involved
+are held throughout, always taken in the same order so that
+concurrent transfers between the same accounts cannot deadlock."""
+
+import contextlib
+import functools
+from lib import account_types
+from lib.account import Account, mutator
+from lib.money import MAX_CENTS, Cents, to_cents
+
+
+def transfer(source, destination, amount, age=None):
+    """Moves an amount from one account to another, returns a code
+
+    Keyword arguments:
+    source -- the Account to withdraw from
+    destination -- the Account to deposit into
+    amount -- amount to move, in dollars or Cents
+    age -- age of the customer for accounts whose withdrawals need
+        it, by default the age of the source account's owner
+
+    Returns the code of the withdrawal from source: 1 on success,
+    0 if a Checking account was overdrafted to make it, and a
+    negative code if it was refused, in which case nothing moves.
+    Transfers from an account to itself, including between two views
+    of the same AccountStore row, change nothing and return 1.
+    Raises ValueError if the amount is negative, and OverflowError,
+    before anything moves, if destination cannot hold the amount."""
+    amount = _checked(amount)
+    if _identity(source) == _identity(destination):
+        return 1
+    with _locked((source, destination)):
+        _check_range(destination._balance + amount)
+        rc = _withdraw(source, source.withdraw, amount, age)
+        if rc >= 0:
+            destination.deposit(amount)
+    return rc
+
+
+def settle(transfers):
+    """Applies many transfers at once, returns the code of each
+
+    Keyword arguments:
+    transfers -- iterable of '(source, destination, amount)' tuples
+
+    Transfers are checked in order against working copies of the
+    accounts, with the same rules and codes as transfer(), so a
+    transfer may rely on money moved by an earlier one. Only then is
+    the final balance of each account involved written back, once,
+    however many transfers it took part in. Copies are detached from
+    their customers, who are only told of each account's net change.
+    Raises ValueError before anything moves if an amount is negative,
+    and OverflowError if a final balance would be out of range."""
+    transfers = [
+        (source, destination, _checked(amount))
+        for source, destination, amount in transfers
+    ]
+    accounts = {}
+    for source, destination, _ in transfers:
+        accounts.setdefault(_identity(source), source)
+        accounts.setdefault(_identity(destination), destination)
+    codes = []
+    with _locked(accounts.values()):
+        copies = {
+            key: _detached(account) for key, account in accounts.items()
+        }
+        for source, destination, amount in transfers:
+            source_key = _identity(source)
+            destination_key = _identity(destination)
+            if source_key == destination_key:
+                codes.append(1)
+                continue
+            # The copies' methods are called unwrapped, so that they
+            # take no locks and keep no history of their own
+            source_copy = copies[source_key]
+            withdraw = functools.partial(
+                type(source_copy).withdraw.__wrapped__, source_copy
+            )
+            rc = _withdraw(source, withdraw, amount, None)
+            if rc >= 0:
+                destination_copy = copies[destination_key]
+                Account.deposit.__wrapped__(destination_copy, amount)
+            codes.append(rc)
+        for copy in copies.values():
+            _check_range(copy._balance)
+        for key, account in accounts.items():
+            copy = copies[key]
+            if _state(copy) != _state(account):
+                _write_back(account, copy)
+    return codes
+
+
+def _identity(account):
+    """Returns a key that is the same for every object of one account
+
+    Views of an AccountStore are the same account if they are of the
+    same row of the same store, other accounts only if they are the
+    same object."""
+    store = getattr(account, "_store", None)
+    if store is None:
+        return id(account)
+    return (id(store), account.row)
+
+
+def _checked(amount):
+    """Returns an amount as Cents, raises ValueError if negative"""
+    amount = Cents(to_cents(amount))
+    if amount < 0:
+        raise ValueError(f"cannot transfer a negative amount: {amount}")
+    return amount
+
+
+def _check_range(balance):
+    """Raises OverflowError if a balance cannot be held by an account"""
+    if not -MAX_CENTS <= balance <= MAX_CENTS:
+        raise OverflowError(f"balance out of range: {balance}")
+
+
+def _withdraw(account, withdraw, amount, age):
+    """Calls withdraw with the age too if the account's type needs it"""
+    if not account_types.of(account).needs_age:
+        return withdraw(amount)
+    if age is None:
+        if account.owner is None:
+            raise ValueError("withdrawal needs the age of the account holder")
+        age = account.owner.age
+    return withdraw(amount, age)
+
+
+def _detached(account):
+    """Returns a copy of an account that belongs to no customer"""
+    copy = account_types.of(account).account_class(0)
+    copy._balance = account._balance
+    if hasattr(account, "_transaction_count"):
+        copy._transaction_count = account._transaction_count
+    return copy
+
+
+def _state(account):
+    return (account._balance, getattr(account, "_transaction_count", 0))
+
+
+@mutator
+def _write_back(account, copy):
+    """Sets an account's state to that of its settled copy"""
+    account._balance = copy._balance
+    if hasattr(account, "_transaction_count"):
+        account._transaction_count = copy._transaction_count
+    return 1
+
+
+def _locked(accounts):
+    """Returns a context manager holding the lock of every account
+
+    Does nothing unless Account.thread_safe is set. Locks are taken
+    in order of their identity, and a lock shared by two accounts,
+    as by views of the same AccountStore row or by accounts given
+    the same striped lock, is only taken once."""
+    stack = contextlib.ExitStack()
+    if Account.thread_safe:
+        locks = {id(account.lock): account.lock for account in accounts}
+        for key in sorted(locks):
+            stack.enter_context(locks[key])
+    return stack
@@ -0,0 +1,85 @@
+import unittest
+
+from lib.account import Account
+from lib.account_store import AccountStore
+from lib.checking import Checking
+from lib.customer import Customer
+from lib.money_market_fund import MoneyMarket
+from lib.retirement import Retirement
+
+
+class TestAccountStore(unittest.TestCase):
+    def setUp(self):
+        self.next_id = Customer.id
+        self.store = AccountStore()
+
+    def tearDown(self):
+        Customer.id = self.next_id
+
+    def test_add(self):
+        checking = self.store.add(7, "Checking", 1000)
+        market_fund = self.store.add(8, "Money Market Fund", 250.555)
+        self.assertIsInstance(checking, Checking)
+        self.assertIsInstance(market_fund, MoneyMarket)
+        self.assertIsInstance(market_fund, Account)
+        self.assertEqual(len(self.store), 2)
+        self.assertEqual(market_fund.row, 1)
+        self.assertEqual(market_fund.owner_id, 8)
+        self.assertEqual(market_fund.balance, 250.56)
+        self.assertEqual(market_fund.cents, 25056)
+        self.assertListEqual(list(self.store.types), [0, 3])
+        with self.assertRaises(ValueError):
+            self.store.add(7, "Bogus", 1000)
+
+    def test_views_write_through(self):
+        checking = self.store.add(7, "Checking", 1000)
+        checking.withdraw(1200)
+        self.assertEqual(self.store.balances[0], -23500)
+        # Every view of a row shares the same state
+        self.assertEqual(self.store.account(0).balance, -235)
+        self.store.account(0).deposit(235)
+        self.assertEqual(checking.balance, 0)
+
+    def test_locks(self):
+        first = self.store.add(7, "Checking", 1000)
+        second = self.store.add(8, "Checking", 1000)
+        # Every view of a row shares the lock of its stripe
+        self.assertIs(first.lock, self.store.account(0).lock)
+        self.assertIs(first.lock, self.store.lock(0))
+        self.assertIsNot(first.lock, second.lock)
+
+    def test_money_market_counts(self):
+        market_fund = self.store.add(7, "Money Market Fund", 1000)
+        self.assertEqual(market_fund.withdraw(100), 1)
+        self.assertEqual(self.store.account(0).withdraw(100), 1)
+        self.assertEqual(market_fund.withdraw(100), -2)
+        self.assertEqual(self.store.transaction_counts[0], 2)
+
+    def test_retirement(self):
+        retirement = self.store.add(7, "401K", 1000)
+        self.assertIsInstance(retirement, Retirement)
+        self.assertEqual(retirement.withdraw(500, 50), -2)
+        self.assertEqual(retirement.withdraw(500, 68), 1)
+        self.assertEqual(self.store.balances[0], 50000)
+
+    def test_customer_accounts(self):
+        customer = Customer("John", "Doe", 30)
+        self.store.add(customer.user_id, "Savings", 10)
+        customer.add_account("Savings", self.store.account(0))
+        customer.deposit_into("Savings", 0, 5.5)
+        self.assertEqual(self.store.balances[0], 1550)
+        self.assertEqual(
+            customer.get_all_balances(), "Savings #1\nAccount balance: $15.50"
+        )
+
+    def test_total_cents(self):
+        self.store.add(7, "Checking", 10.10)
+        self.store.add(7, "Savings", 20.20)
+        self.store.add(8, "Checking", 30.30)
+        self.assertEqual(self.store.total_cents(), 6060)
+        self.assertEqual(self.store.total_cents("Checking"), 4040)
+        self.assertEqual(self.store.total_cents("401K"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+
+import bank_of_nerds
+from lib import account_types
+from lib.account import Account, mutator
+from lib.account_store import AccountStore
+from lib.customer import Customer
+from lib.month_end import close_month, closing_records
+from lib.retirement import Retirement
+from lib.savings import Savings
+
+
+class Escrow(Account):
+    __slots__ = ()
+
+    @mutator
+    def withdraw(self, to_withdraw):
+        return -3
+
+
+class TestAccountTypes(unittest.TestCase):
+    def setUp(self):
+        self.next_id = Customer.id
+
+    def tearDown(self):
+        Customer.id = self.next_id
+        if "Escrow" in account_types.TYPES:
+            del account_types.TYPES["Escrow"]
+            account_types.BY_CODE.pop()
+            account_types._BY_CLASS.pop(Escrow, None)
+
+    def test_builtin_types(self):
+        self.assertListEqual(
+            list(account_types.TYPES),
+            ["Checking", "Savings", "401K", "Money Market Fund"],
+        )
+        retirement = account_types.get("401K")
+        self.assertIs(retirement.account_class, Retirement)
+        self.assertTrue(retirement.needs_age)
+        self.assertIs(account_types.BY_CODE[retirement.code], retirement)
+        self.assertFalse(account_types.get("Savings").needs_age)
+        self.assertIsNone(account_types.get("Bogus"))
+
+    def test_register(self):
+        escrow = account_types.register("Escrow", Escrow, {-3: "held"})
+        self.assertEqual(escrow.code, 4)
+        self.assertIs(account_types.get("Escrow"), escrow)
+        with self.assertRaises(ValueError):
+            account_types.register("Escrow", Escrow, {})
+
+    def test_registered_type_in_store(self):
+        account_types.register("Escrow", Escrow, {-3: "held"})
+        store = AccountStore()
+        store.add(1, "Checking", 10)
+        escrow = store.add(1, "Escrow", 5)
+        self.assertIsInstance(escrow, Escrow)
+        self.assertIsInstance(store.account(1), Escrow)
+        self.assertEqual(escrow.withdraw(1), -3)
+        self.assertListEqual(list(store.types), [0, 4])
+        self.assertEqual(store.total_cents("Escrow"), 500)
+        charged = close_month(store, {"Escrow": (1000, 100)})
+        self.assertListEqual(list(charged), [0, 100])
+        records = closing_records(store, charged)
+        self.assertListEqual(
+            [record.account_type for record in records],
+            ["Checking", "Escrow"],
+        )
+
+    def test_registered_type_in_teller(self):
+        account_types.register("Escrow", Escrow, {-3: "held in escrow"})
+        user = Customer("John", "Doe", 30)
+        user.add_account("Savings", Savings(1))
+        user.add_account("Escrow", Escrow(5))
+        self.assertEqual(
+            user.get_all_balances(),
+            "Savings #1\nAccount balance: $1.00\n\n"
+            "Escrow #1\nAccount balance: $5.00",
+        )
+        result = bank_of_nerds.perform_transaction(
+            "Escrow", "1", "1.00", user, user.withdraw_from
+        )
+        self.assertTupleEqual(result, (-4, "held in escrow"))
+
+    def test_withdraw_needs_age(self):
+        young = Customer("John", "Doe", 30)
+        young.add_account("401K", Retirement(100))
+        self.assertEqual(young.withdraw_from("401K", 0, 1), -2)
+        self.assertEqual(young.withdraw_from("401K", 0, 1, 70), 1)
+        self.assertEqual(young._accounts["401K"][0].balance, 99)
+
+
+if __name__ == "__main__":
+    unittest.main()
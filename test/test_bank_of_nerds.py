@@ -0,0 +1,428 @@
+import argparse
+import asyncio
+import functools
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import bank_of_nerds
+from lib.customer import Customer
+from lib.directory import Directory
+from lib.id_allocator import IdAllocator
+from lib.money import Cents
+from lib.transaction_log import TransactionLog
+
+
+class TestRunBatch(unittest.TestCase):
+    def setUp(self):
+        self.next_id = Customer.id
+        self.users = bank_of_nerds.generate_default_users(Directory())
+        self.user1, self.user2 = self.users
+
+    def tearDown(self):
+        Customer.id = self.next_id
+
+    def test_applies_records(self):
+        uid = self.user1.user_id
+        records = io.StringIO(
+            f"{uid}:Checking:1:100.00:Withdraw\n"
+            f"{uid}:savings:1:0.01:deposit\n"
+            "\n"
+            f"{uid}:401k:1:1000:withdraw\n"
+        )
+        summary = bank_of_nerds.run_batch(records, self.users)
+        self.assertDictEqual(summary, {1: 3})
+        self.assertEqual(self.user1._accounts["Checking"][0].balance, 1404.32)
+        self.assertEqual(self.user1._accounts["Savings"][0].balance, 14357)
+        self.assertEqual(self.user1._accounts["401K"][0].balance, 42265)
+
+    def test_return_codes(self):
+        uid = self.user2.user_id
+        records = [
+            f"{uid}:Checking:1:1:Withdraw",
+            f"{uid}:Bogus:1:1:Withdraw",
+            f"{uid}:Savings:one:1:Withdraw",
+            f"{uid}:Savings:1:-1:Withdraw",
+            f"{uid}:Savings:9:1:Deposit",
+            f"{uid}:Savings:1:1000000:Withdraw",
+            "0:Savings:1:1:Deposit",
+            f"{uid}:Savings:1:1",
+            f"{uid}:Savings:1:1:Transfer",
+        ]
+        summary = bank_of_nerds.run_batch(records, self.users)
+        self.assertDictEqual(
+            summary, {-6: 2, -5: 1, -4: 1, -3: 1, -2: 1, -1: 1, 0: 2}
+        )
+
+    def test_amount_out_of_range(self):
+        uid = self.user2.user_id
+        records = [
+            f"{uid}:Savings:1:1e20:Deposit",
+            f"{uid}:Savings:1:92233720368547758.07:Deposit",
+            f"{uid}:Savings:1:0.001:Deposit",
+        ]
+        summary = bank_of_nerds.run_batch(records, self.users)
+        self.assertDictEqual(summary, {-2: 2, 1: 1})
+        self.assertEqual(self.user2._accounts["Savings"][0].cents, 2542)
+        self.assertEqual(self.user2.total_cents, 2542)
+
+    def test_numeric_amounts(self):
+        user = self.user2
+        savings = user._accounts["Savings"][0]
+        for amount in (50.0, 50, Cents(5000)):
+            with self.subTest(amount=amount):
+                cents = savings.cents
+                result = bank_of_nerds.perform_transaction(
+                    "Savings", 1, amount, user, user.deposit_into
+                )
+                self.assertTupleEqual(result, (1, None))
+                self.assertEqual(savings.cents, cents + 5000)
+        result = bank_of_nerds.perform_transaction(
+            "Savings", 1, None, user, user.deposit_into
+        )
+        self.assertTupleEqual(result, (-2, None))
+
+    def test_get_batch_summary(self):
+        result = bank_of_nerds.get_batch_summary({1: 2, -5: 1})
+        expected = (
+            "(Result) : (Records)\n"
+            "--------------------\n"
+            "Successful (1) : 2\n"
+            "Unknown user (-5) : 1\n"
+            "Total : 3"
+        )
+        self.assertEqual(result, expected)
+
+
+class TestOpenBank(unittest.TestCase):
+    def setUp(self):
+        self.next_id = Customer.id
+        self.tmp = tempfile.TemporaryDirectory()
+        self.opt = argparse.Namespace(
+            db=None,
+            snapshot=None,
+            journal=os.path.join(self.tmp.name, "journal"),
+            metrics=None,
+        )
+
+    def tearDown(self):
+        Customer.id = self.next_id
+        Customer.allocator = None
+        self.tmp.cleanup()
+
+    def run_bank(self, *records):
+        """Opens the bank, applies batch records, closes it"""
+        Customer.id = 1
+        users, journal = bank_of_nerds.open_bank(self.opt)
+        bank_of_nerds.run_batch(records, users, journal)
+        bank_of_nerds.close_bank(self.opt, users, journal)
+        return users.get(2)._accounts["Savings"][0].cents
+
+    def test_restart_after_torn_record(self):
+        self.assertEqual(self.run_bank("2:Savings:1:1:Deposit"), 2642)
+        with open(self.opt.journal, "a") as journal_file:
+            # The last record was being written when the program crashed
+            journal_file.write('["D", 2, "Sav')
+        self.assertEqual(self.run_bank("2:Savings:1:2:Deposit"), 2842)
+        self.assertEqual(self.run_bank("2:Savings:1:4:Deposit"), 3242)
+        self.assertEqual(self.run_bank(), 3242)
+
+    def test_db_statement(self):
+        self.opt.journal = None
+        self.opt.db = os.path.join(self.tmp.name, "bank.db")
+        users, journal = bank_of_nerds.open_bank(self.opt)
+        session = bank_of_nerds.teller_session(users, journal)
+        next(session)
+        session.send("3")
+        session.send("2")
+        session.send("deposit")
+        session.send("savings:1:1")
+        output = session.send("display accounts")
+        self.assertIn("Account balance: $26.42", output)
+        session.close()
+        bank_of_nerds.close_bank(self.opt, users, journal)
+
+    def test_restart_with_allocator(self):
+        ids = os.path.join(self.tmp.name, "ids")
+        user_ids = []
+        for _ in range(3):
+            # Every run starts with a new allocator on the same file
+            Customer.allocator = IdAllocator(ids, block_size=4)
+            users, journal = bank_of_nerds.open_bank(self.opt)
+            self.assertEqual([user.user_id for user in users][:2], [1, 2])
+            new_user = users.add(Customer("Jane", "Doe", 30))
+            journal.log_customer(new_user)
+            user_ids.append(new_user.user_id)
+            bank_of_nerds.run_batch(["2:Savings:1:1:Deposit"], users, journal)
+            bank_of_nerds.close_bank(self.opt, users, journal)
+        self.assertEqual(user_ids, [3, 7, 11])
+        self.assertEqual(users.get(2)._accounts["Savings"][0].cents, 2842)
+
+    def test_snapshot_not_loaded(self):
+        self.opt.journal = None
+        self.opt.snapshot = os.path.join(self.tmp.name, "snapshot")
+        users, journal = bank_of_nerds.open_bank(self.opt)
+        bank_of_nerds.close_bank(self.opt, users, journal)
+
+        users, journal = bank_of_nerds.open_bank(self.opt)
+        session = bank_of_nerds.teller_session(users, journal)
+        next(session)
+        output = session.send("get users")
+        self.assertIn("Doe, John : 2", output)
+        session.close()
+        bank_of_nerds.close_bank(self.opt, users, journal)
+        # Listing and saving the users loaded none of them to keep
+        self.assertDictEqual(users.customers, {})
+        users, journal = bank_of_nerds.open_bank(self.opt)
+        self.assertEqual(len(users), 2)
+        users.backing.close()
+
+    def test_run_month_end(self):
+        for backend in ("journal", "db"):
+            with self.subTest(backend=backend):
+                if backend == "db":
+                    self.opt.journal = None
+                    self.opt.db = os.path.join(self.tmp.name, "bank.db")
+                users, journal = bank_of_nerds.open_bank(self.opt)
+                bank_of_nerds.run_batch(
+                    [
+                        "1:Checking:1:100:Withdraw",
+                        "1:Money Market Fund:1:1:Withdraw",
+                    ],
+                    users,
+                    journal,
+                )
+                before = users.total_cents()
+                closing = io.StringIO()
+                self.assertEqual(
+                    bank_of_nerds.run_month_end(users, closing, journal),
+                    (5, 1, 1200),
+                )
+                self.assertEqual(users.total_cents(), before - 1200)
+                self.assertIn(
+                    "1,Checking,1,1392.32,12.00\r\n", closing.getvalue()
+                )
+                bank_of_nerds.close_bank(self.opt, users, journal)
+
+                # The fee and reset withdrawals are kept after a restart
+                users, journal = bank_of_nerds.open_bank(self.opt)
+                user = users.get(1)
+                self.assertEqual(user._accounts["Checking"][0].cents, 139232)
+                market_fund = user._accounts["Money Market Fund"][0]
+                self.assertEqual(market_fund._transaction_count, 0)
+                bank_of_nerds.close_bank(self.opt, users, journal)
+
+
+class TestTellerSession(unittest.TestCase):
+    def setUp(self):
+        self.next_id = Customer.id
+        self.users = bank_of_nerds.generate_default_users(Directory())
+        self.user1, self.user2 = self.users
+
+    def tearDown(self):
+        Customer.id = self.next_id
+
+    def test_session(self):
+        session = bank_of_nerds.teller_session(self.users)
+        output = next(session)
+        self.assertTrue(output.startswith("1. Get Users\n"))
+        self.assertTrue(output.endswith("9. Bank Totals\n10. Quit\n> "))
+        # Blank lines prompt again without redrawing the menu
+        self.assertEqual(session.send(""), "> ")
+        output = session.send("3")
+        self.assertIn("Perrson, Sherri : 1", output)
+        session.send(str(self.user2.user_id))
+        session.send("deposit")
+        output = session.send("savings:1:0.58")
+        self.assertIn("Deposit successful", output)
+        self.assertEqual(self.user2._accounts["Savings"][0].balance, 26)
+        with self.assertRaises(StopIteration):
+            session.send("quit")
+
+    def test_session_end_of_input(self):
+        session = bank_of_nerds.teller_session(self.users)
+        next(session)
+        session.send("2")
+        # End of input backs out of the prompt, then quits
+        self.assertTrue(session.send(None).endswith("10. Quit\n> "))
+        with self.assertRaises(StopIteration):
+            session.send(None)
+
+    def test_session_find_user(self):
+        session = bank_of_nerds.teller_session(self.users)
+        next(session)
+        session.send("8")
+        output = session.send("nobody")
+        self.assertIn("No users found", output)
+        session.send("Find User")
+        output = session.send("perr")
+        self.assertIn("Perrson, Sherri : 1", output)
+        self.assertNotIn(self.user2.last_name, output)
+        session.send(str(self.user1.user_id))
+        output = session.send("display accounts")
+        self.assertIn("Savings #1", output)
+
+    def test_get_found_users(self):
+        user3 = self.users.add(Customer("Sam", "Smith", 30))
+        printout = bank_of_nerds.get_found_users(self.users, "s", limit=1)
+        self.assertIn(f"Smith, Sam : {user3.user_id}", printout)
+        self.assertNotIn("Perrson", printout)
+        self.assertTrue(printout.endswith("first 1 users found are listed)"))
+        self.assertIsNone(bank_of_nerds.get_found_users(self.users, "x"))
+
+    def test_server(self):
+        async def teller(port, lines):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write("".join(f"{line}\n" for line in lines).encode())
+            await writer.drain()
+            output = await reader.read()
+            writer.close()
+            return output.decode()
+
+        async def run():
+            server = await asyncio.start_server(
+                functools.partial(
+                    bank_of_nerds.serve_teller, users=self.users, journal=None
+                ),
+                "127.0.0.1",
+                0,
+            )
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                user_id = self.user2.user_id
+                outputs = await asyncio.gather(
+                    *(
+                        teller(port, [3, user_id, 6, "savings:1:1", "quit"])
+                        for _ in range(5)
+                    )
+                )
+                output = await teller(port, [3, user_id, 4, "quit"])
+            return outputs, output
+
+        outputs, output = asyncio.run(run())
+        for session_output in outputs:
+            self.assertIn("Deposit successful", session_output)
+        # Every session shares the same bank
+        self.assertIn("Account balance: $30.42", output)
+
+    def test_server_journal(self):
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        journal = TransactionLog(path, group_size=4096)
+        user_id = self.user2.user_id
+        lines = [3, user_id, 6, "savings:1:1", 6, "savings:1:1", "quit"]
+
+        async def run():
+            server = await asyncio.start_server(
+                functools.partial(
+                    bank_of_nerds.serve_teller,
+                    users=self.users,
+                    journal=journal,
+                ),
+                "127.0.0.1",
+                0,
+            )
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                reader, writer = await asyncio.open_connection(
+                    "127.0.0.1", port
+                )
+                writer.write("".join(f"{line}\n" for line in lines).encode())
+                await writer.drain()
+                output = await reader.read()
+                writer.close()
+            return output.decode()
+
+        output = asyncio.run(run())
+        self.assertEqual(output.count("Deposit successful"), 2)
+        # Both deposits were committed before the replies were sent
+        self.assertEqual(journal.pending, 0)
+        with open(path) as log_file:
+            self.assertEqual(len(log_file.readlines()), 2)
+        journal.close()
+
+
+class TestReplaySession(unittest.TestCase):
+    def setUp(self):
+        self.next_id = Customer.id
+        self.users = bank_of_nerds.generate_default_users(Directory())
+        self.user1, self.user2 = self.users
+
+    def tearDown(self):
+        Customer.id = self.next_id
+
+    def test_replay_session(self):
+        lines = io.StringIO(f"3\n{self.user2.user_id}\n6\nsavings:1:1\n")
+        output = bank_of_nerds.replay_session(lines, self.users)
+        # The menu is only shown once, and input ends the session
+        self.assertEqual(output.count("10. Quit"), 1)
+        self.assertIn("Deposit successful", output)
+        self.assertTrue(output.endswith("> "))
+        self.assertEqual(self.user2._accounts["Savings"][0].balance, 26.42)
+
+    def test_replay_session_quit(self):
+        lines = ["1\r\n", "quit\n", "2\n"]
+        output = bank_of_nerds.replay_session(lines, self.users)
+        self.assertEqual(output.count("> "), 2)
+
+    def test_get_session_diff(self):
+        diff = bank_of_nerds.get_session_diff("a\nb\n", "a\nb\n")
+        self.assertEqual(diff, "")
+        diff = bank_of_nerds.get_session_diff("a\nb\n", "a\nc\n")
+        self.assertIn("-b\n+c\n", diff)
+        self.assertTrue(diff.startswith("--- expected\n+++ replay\n"))
+
+    def test_expect_exit_status(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            lines = os.path.join(tmp, "lines")
+            expected = os.path.join(tmp, "expected")
+            with open(lines, "w") as lines_file:
+                lines_file.write("1\n")
+
+            def run(*args):
+                return subprocess.run(
+                    [sys.executable, bank_of_nerds.__file__, *args],
+                    cwd=tmp,
+                    capture_output=True,
+                    text=True,
+                )
+
+            with open(expected, "w") as expected_file:
+                expected_file.write(run("--replay", lines).stdout)
+            result = run("--replay", lines, "--expect", expected)
+            self.assertEqual(result.returncode, 0)
+            self.assertIn("Replayed session matches", result.stdout)
+            with open(expected, "a") as expected_file:
+                expected_file.write("more\n")
+            result = run("--replay", lines, "--expect", expected)
+            self.assertEqual(result.returncode, 1)
+            self.assertIn("more\n", result.stdout)
+
+    def test_crash_exit_status(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = os.path.join(tmp, "journal")
+            with open(journal, "w") as journal_file:
+                journal_file.write("garbage\n")
+            args = [sys.executable, bank_of_nerds.__file__]
+            result = subprocess.run(
+                args + ["--journal", journal],
+                cwd=tmp,
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                text=True,
+            )
+            self.assertEqual(result.returncode, 1)
+            self.assertIn("ValueError", result.stdout)
+            # Usage errors keep the status argparse exits with
+            result = subprocess.run(
+                args + ["--bogus"], cwd=tmp, capture_output=True
+            )
+            self.assertEqual(result.returncode, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
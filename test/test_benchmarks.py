@@ -0,0 +1,51 @@
+import json
+import os
+import tempfile
+import unittest
+
+from bench.benchmarks import (
+    build_book,
+    compare,
+    get_benchmarks,
+    run_shards,
+)
+from lib.customer import Customer
+
+
+class TestBenchmarks(unittest.TestCase):
+    def setUp(self):
+        self.next_id = Customer.id
+
+    def tearDown(self):
+        Customer.id = self.next_id
+
+    def test_build_book(self):
+        users = build_book(3, 5)
+        self.assertEqual(len(users), 3)
+        for user in users:
+            self.assertEqual(len(user._accounts["Checking"]), 2)
+            self.assertEqual(len(user._accounts["Money Market Fund"]), 1)
+
+    def test_benchmarks_run(self):
+        for accounts in (1, 4):
+            for name, func in get_benchmarks(build_book(2, accounts)).items():
+                with self.subTest(name=name, accounts=accounts):
+                    func()
+                    func()
+
+    def test_run_shards(self):
+        result = run_shards(4, 2, 1)
+        self.assertEqual(result["name"], "ShardedBank.apply_batch (2 shards)")
+        self.assertEqual(result["customers"], 4)
+        self.assertGreater(result["ns_per_op"], 0)
+
+    def test_compare(self):
+        result = {"name": "get_users", "customers": 1, "accounts": 1}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "baseline.jsonl")
+            with open(path, "w", encoding="utf-8") as baseline_file:
+                baseline_file.write(json.dumps({**result, "ns_per_op": 200}))
+            lines = compare(path, [{**result, "ns_per_op": 300}])
+        self.assertListEqual(
+            lines, ["get_users [1x1] : 200 -> 300 ns/op (1.50x)"]
+        )
@@ -14,21 +14,31 @@ class TestCustomer(unittest.TestCase):
         self.assertEqual(self.customer.last_name, "Doe")
         self.assertEqual(self.customer.age, 30)
         self.assertEqual(self.customer.user_id, 4)
-        self.assertDictEqual(
-            self.customer._accounts,
-            {
-                "Checking": [],
-                "Savings": [],
-                "401K": [],
-                "Money Market Fund": [],
-            },
-        )
+        self.assertDictEqual(self.customer._accounts, {})
 
     def test_add_account(self):
         checking = Checking(1000)
         self.customer.add_account("Checking", checking)
         self.assertListEqual(self.customer._accounts["Checking"], [checking])
 
+    def test_lazy_accounts(self):
+        self.customer.add_account("Savings", Savings(10))
+        self.customer.add_account("Checking", Checking(20))
+        self.assertListEqual(
+            sorted(self.customer._accounts), ["Checking", "Savings"]
+        )
+        # Accounts are listed in a fixed order, not the order added
+        result = self.customer.get_all_balances()
+        expected = (
+            "Checking #1\nAccount balance: $20.00\n\n"
+            "Savings #1\nAccount balance: $10.00"
+        )
+        self.assertEqual(result, expected)
+        with self.assertRaises(IndexError):
+            self.customer.deposit_into("401K", 0, 500)
+        self.assertFalse(hasattr(self.customer, "__dict__"))
+        self.assertFalse(hasattr(Checking(20), "__dict__"))
+
     def test_deposit_into(self):
         checking = Checking(1000)
         self.customer.add_account("Checking", checking)
@@ -42,6 +52,43 @@ class TestCustomer(unittest.TestCase):
         expected = "Savings #1\nAccount balance: $2000.00"
         self.assertEqual(result, expected)
 
+    def test_restore_user_id(self):
+        customer = Customer("Jane", "Doe", 40, user_id=Customer.id + 10)
+        next_customer = Customer("Jim", "Doe", 50)
+        self.assertEqual(next_customer.user_id, customer.user_id + 1)
+
+    def test_statement_cache(self):
+        checking = Checking(1000)
+        self.customer.add_account("Checking", checking)
+        statement = self.customer.get_all_balances()
+        self.assertIs(self.customer.get_all_balances(), statement)
+        # Failed withdrawals leave the statement as it was
+        self.customer.withdraw_from("Checking", 0, 2000)
+        self.assertIs(self.customer.get_all_balances(), statement)
+        # Changes made directly on the account are picked up too
+        checking.deposit(1)
+        self.assertEqual(
+            self.customer.get_all_balances(),
+            "Checking #1\nAccount balance: $1001.00",
+        )
+        self.customer.add_account("Savings", Savings(5))
+        self.assertIn("Savings #1", self.customer.get_all_balances())
+        self.assertIs(checking.owner, self.customer)
+
+    def test_total_cents(self):
+        checking = Checking(10)
+        self.customer.add_account("Checking", checking)
+        self.customer.add_account("Savings", Savings(5))
+        self.assertEqual(self.customer.total_cents, 1500)
+        # Overdraft fees count against the total
+        self.customer.withdraw_from("Checking", 0, 20)
+        self.assertEqual(self.customer.total_cents, -4000)
+        checking.deposit(1)
+        self.assertEqual(self.customer.total_cents, -3900)
+        self.assertDictEqual(
+            self.customer.type_totals(), {"Checking": -4400, "Savings": 500}
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
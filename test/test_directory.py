@@ -0,0 +1,176 @@
+import os
+import tempfile
+import unittest
+
+from lib.checking import Checking
+from lib.customer import Customer
+from lib.directory import Directory, IndexedAccount
+from lib.savings import Savings
+from lib.snapshot import Snapshot, write_snapshot
+
+
+class TestDirectory(unittest.TestCase):
+    def setUp(self):
+        self.directory = Directory()
+        self.customer1 = Customer("John", "Doe", 30)
+        self.customer2 = Customer("Jane", "Doe", 31)
+
+    def test_add(self):
+        self.directory.add(self.customer1)
+        self.assertEqual(len(self.directory), 1)
+        self.assertIn(self.customer1.user_id, self.directory)
+        with self.assertRaises(ValueError):
+            self.directory.add(self.customer1)
+
+    def test_get(self):
+        self.directory.add(self.customer1)
+        self.directory.add(self.customer2)
+        result = self.directory.get(self.customer2.user_id)
+        self.assertIs(result, self.customer2)
+        self.assertIsNone(self.directory.get(0))
+
+    def test_remove(self):
+        self.directory.add(self.customer1)
+        self.directory.add(self.customer2)
+        result = self.directory.remove(self.customer1.user_id)
+        self.assertIs(result, self.customer1)
+        self.assertNotIn(self.customer1.user_id, self.directory)
+        # Remaining user_ids are unaffected by the removal
+        result = self.directory.get(self.customer2.user_id)
+        self.assertIs(result, self.customer2)
+        with self.assertRaises(KeyError):
+            self.directory.remove(self.customer1.user_id)
+
+    def test_iter(self):
+        self.directory.add(self.customer2)
+        self.directory.add(self.customer1)
+        self.assertListEqual(
+            list(self.directory), [self.customer2, self.customer1]
+        )
+
+    def test_total_cents(self):
+        self.customer1.add_account("Checking", Checking(10))
+        self.directory.add(self.customer1)
+        self.assertEqual(self.directory.total_cents(), 1000)
+        self.customer1.add_account("Savings", Savings(5))
+        self.customer1.withdraw_from("Checking", 0, 1)
+        self.assertEqual(self.directory.total_cents("Checking"), 900)
+        self.assertEqual(self.directory.total_cents("Savings"), 500)
+        self.assertEqual(self.directory.total_cents("401K"), 0)
+        self.customer2.add_account("Savings", Savings(2))
+        self.directory.add(self.customer2)
+        self.assertEqual(self.directory.total_cents(), 1600)
+        self.directory.remove(self.customer1.user_id)
+        self.assertEqual(self.directory.total_cents(), 200)
+        # Removed customers no longer count
+        self.customer1.deposit_into("Savings", 0, 100)
+        self.assertEqual(self.directory.total_cents(), 200)
+
+    def test_backed_total_cents(self):
+        self.customer1.add_account("Checking", Checking(10))
+        self.customer2.add_account("Savings", Savings(5))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bank.snap")
+            write_snapshot(path, [self.customer1, self.customer2])
+            with Snapshot(path) as snapshot:
+                directory = Directory(snapshot)
+                loaded = directory.get(self.customer1.user_id)
+                loaded.deposit_into("Checking", 0, 1)
+                self.assertEqual(directory.total_cents(), 1600)
+                # Customers loaded after the totals are not counted twice
+                directory.get(self.customer2.user_id).deposit_into(
+                    "Savings", 0, 1
+                )
+                self.assertEqual(directory.total_cents("Savings"), 600)
+                self.assertEqual(directory.total_cents(), 1700)
+
+    def test_balance_range(self):
+        self.customer1.add_account("Checking", Checking(10))
+        self.customer1.add_account("Checking", Checking(-5))
+        self.directory.add(self.customer1)
+        overdrafted = list(self.directory.balance_range("Checking", high=-1))
+        self.assertListEqual(
+            overdrafted,
+            [IndexedAccount(-500, self.customer1.user_id, "Checking", 2)],
+        )
+        # The index follows every change once built
+        self.customer1.withdraw_from("Checking", 0, 20)
+        self.customer2.add_account("Checking", Checking(-1))
+        self.directory.add(self.customer2)
+        self.customer2.add_account("Checking", Checking(3))
+        overdrafted = self.directory.balance_range("Checking", high=-1)
+        self.assertListEqual(
+            [(a.cents, a.number) for a in overdrafted],
+            [(-4500, 1), (-500, 2), (-100, 1)],
+        )
+        self.assertListEqual(
+            list(self.directory.balance_range("Checking", 0, 1000)),
+            [IndexedAccount(300, self.customer2.user_id, "Checking", 2)],
+        )
+        self.directory.remove(self.customer2.user_id)
+        self.assertEqual(
+            len(list(self.directory.balance_range("Checking"))), 2
+        )
+        self.assertListEqual(list(self.directory.balance_range("Bogus")), [])
+
+    def test_top_balances(self):
+        self.customer1.add_account("Checking", Checking(10))
+        self.customer1.add_account("Savings", Savings(30))
+        self.customer2.add_account("Savings", Savings(20))
+        self.directory.add(self.customer1)
+        self.directory.add(self.customer2)
+        top = self.directory.top_balances(2)
+        self.assertListEqual([a.cents for a in top], [3000, 2000])
+        top = self.directory.top_balances(5, "Savings")
+        self.assertListEqual(
+            [a.user_id for a in top],
+            [self.customer1.user_id, self.customer2.user_id],
+        )
+
+    def test_age_range(self):
+        self.directory.add(self.customer1)
+        self.directory.add(self.customer2)
+        self.assertListEqual(
+            list(self.directory.age_range(31)), [self.customer2]
+        )
+        self.customer1.age = 67
+        self.assertListEqual(
+            list(self.directory.age_range(67)), [self.customer1]
+        )
+        self.assertListEqual(
+            list(self.directory.age_range(high=66)), [self.customer2]
+        )
+
+    def test_find_by_name(self):
+        self.directory.add(self.customer1)
+        self.directory.add(self.customer2)
+        self.assertListEqual(
+            list(self.directory.find_by_name("DO")),
+            [self.customer1, self.customer2],
+        )
+        self.assertListEqual(
+            list(self.directory.find_by_name("d ja")), [self.customer2]
+        )
+        self.assertListEqual(list(self.directory.find_by_name("joe")), [])
+        self.assertListEqual(list(self.directory.find_by_name(" ")), [])
+        self.customer1.first_name = "Joe"
+        self.customer2.last_name = "Van Dyke"
+        self.assertListEqual(
+            list(self.directory.find_by_name("joe")), [self.customer1]
+        )
+        self.assertListEqual(
+            list(self.directory.find_by_name("dyk")), [self.customer2]
+        )
+        self.assertListEqual(
+            list(self.directory.find_by_name("jane d")), [self.customer2]
+        )
+        self.directory.remove(self.customer1.user_id)
+        self.assertListEqual(list(self.directory.find_by_name("jo")), [])
+        customer3 = self.directory.add(Customer("Johanna", "Smith", 40))
+        self.assertListEqual(
+            list(self.directory.find_by_name("jo")), [customer3]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from lib.checking import Checking
+from lib.customer import Customer
+from lib.directory import Directory
+from lib.export import FIELDS, iter_records, write_csv, write_jsonl
+from lib.savings import Savings
+from lib.snapshot import Snapshot, write_snapshot
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.customer1 = Customer("Sherri", "Perrson, Jr.", 83)
+        self.customer1.add_account("Savings", Savings(14356.99))
+        self.customer1.add_account("Checking", Checking(-235))
+        self.customer1.add_account("Checking", Checking(1))
+        self.customer2 = Customer("John", "Doe", 24)
+        self.users = [self.customer1, self.customer2]
+
+    def test_iter_records(self):
+        user_id = self.customer1.user_id
+        name = ("Perrson, Jr.", "Sherri")
+        self.assertListEqual(
+            list(iter_records(self.users)),
+            [
+                (user_id, *name, "Checking", 1, "-235.00"),
+                (user_id, *name, "Checking", 2, "1.00"),
+                (user_id, *name, "Savings", 1, "14356.99"),
+            ],
+        )
+
+    def test_write_csv(self):
+        stream = io.StringIO(newline="")
+        self.assertEqual(write_csv(self.users, stream), 3)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(lines[0], ",".join(FIELDS))
+        self.assertEqual(
+            lines[1],
+            f'{self.customer1.user_id},"Perrson, Jr.",Sherri,Checking,1,'
+            "-235.00",
+        )
+
+    def test_write_jsonl(self):
+        stream = io.StringIO()
+        self.assertEqual(write_jsonl(self.users, stream), 3)
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(records[2]["account_type"], "Savings")
+        self.assertEqual(records[2]["balance"], "14356.99")
+        self.assertEqual(records[2]["number"], 1)
+
+    def test_scan_snapshot(self):
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        write_snapshot(path, self.users)
+        with Snapshot(path) as snapshot:
+            users = Directory(snapshot)
+            stream = io.StringIO()
+            self.assertEqual(write_jsonl(users.scan(), stream), 3)
+            # Scanned customers are not kept loaded
+            self.assertDictEqual(users.customers, {})
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+
+from lib.customer import Customer
+from lib.group_commit import GroupCommitter
+from lib.transaction_log import TransactionLog
+
+
+class SlowJournal():
+    """Journal whose commits wait until the test lets them finish"""
+
+    def __init__(self):
+        self.commits = 0
+        self.release = threading.Event()
+        self.error = None
+
+    def commit(self):
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        self.commits += 1
+
+
+class TestGroupCommitter(unittest.TestCase):
+    def test_commit_groups(self):
+        journal = SlowJournal()
+        committer = GroupCommitter(journal)
+
+        async def run():
+            first = asyncio.ensure_future(committer.commit())
+            await asyncio.sleep(0.01)
+            # Every session asking while a commit is made shares the next
+            rest = [
+                asyncio.ensure_future(committer.commit()) for _ in range(10)
+            ]
+            await asyncio.sleep(0.01)
+            self.assertFalse(first.done())
+            journal.release.set()
+            await asyncio.gather(first, *rest)
+
+        asyncio.run(run())
+        self.assertEqual(journal.commits, 2)
+        self.assertEqual(committer.commits, 2)
+        self.assertIs(committer.journal, journal)
+
+    def test_commit_error(self):
+        journal = SlowJournal()
+        journal.error = OSError("disk full")
+        journal.release.set()
+        committer = GroupCommitter(journal)
+
+        async def run():
+            with self.assertRaises(OSError):
+                await committer.commit()
+            journal.error = None
+            await committer.commit()
+
+        asyncio.run(run())
+        self.assertEqual(committer.commits, 1)
+
+    def test_log_while_committing(self):
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        customer = Customer("John", "Doe", 30)
+        journal = TransactionLog(path, group_size=1000)
+        committer = GroupCommitter(journal)
+
+        async def run():
+            for _ in range(200):
+                journal.log_customer(customer)
+                commit = asyncio.ensure_future(committer.commit())
+                await asyncio.sleep(0)
+            await commit
+
+        asyncio.run(run())
+        self.assertEqual(journal.pending, 0)
+        with open(path) as log_file:
+            self.assertEqual(len(log_file.readlines()), 200)
+        journal.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
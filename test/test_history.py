@@ -0,0 +1,114 @@
+import unittest
+
+from lib.account import Account
+from lib.account_store import AccountStore
+from lib.checking import Checking
+from lib.customer import Customer
+from lib.history import History, Transaction
+from lib.money import MAX_CENTS, Cents
+from lib.money_market_fund import MoneyMarket
+from lib.savings import Savings
+
+
+class TestHistory(unittest.TestCase):
+    def setUp(self):
+        self.history = History(1000)
+        self.history.record(1, 1500, timestamp=10.0)
+        self.history.record(1, 1300, timestamp=20.0)
+        self.history.record(-1, 1300, timestamp=20.0)
+        self.history.record(1, 1200, timestamp=30.0)
+
+    def test_record(self):
+        self.assertEqual(len(self.history), 4)
+        self.assertEqual(self.history[1], Transaction(20.0, -200, 1, 1300))
+        self.assertEqual(list(self.history)[-1], self.history[3])
+
+    def test_record_in_order(self):
+        self.history.record(1, 1250, timestamp=5.0)
+        self.assertEqual(self.history[-1].timestamp, 30.0)
+
+    def test_between(self):
+        self.assertListEqual(
+            [t.cents for t in self.history.between(20.0, 30.0)],
+            [-200, 0, -100],
+        )
+        self.assertListEqual(list(self.history.between(11.0, 19.0)), [])
+        self.assertEqual(len(list(self.history.between(0, 100))), 4)
+
+    def test_balance_at(self):
+        self.assertEqual(self.history.balance_at(9.9), 1000)
+        self.assertEqual(self.history.balance_at(10.0), 1500)
+        self.assertEqual(self.history.balance_at(25.0), 1300)
+        self.assertEqual(self.history.balance_at(99.0), 1200)
+
+
+class TestAccountHistory(unittest.TestCase):
+    def setUp(self):
+        self.next_id = Customer.id
+
+    def tearDown(self):
+        Customer.id = self.next_id
+
+    def test_lazy_history(self):
+        account = Checking(10)
+        self.assertIsNone(account._history)
+        account.deposit(5)
+        self.assertEqual(account.history.opening, 1000)
+        self.assertEqual(len(account.history), 1)
+
+    def test_transactions_recorded(self):
+        account = Checking(10)
+        account.withdraw(Cents(2000))
+        # Refused withdrawals change nothing but are still recorded
+        account.withdraw(Cents(100000))
+        # Deposits of nothing are not
+        account.deposit(0)
+        account.balance = 7
+        codes = [(t.cents, t.code, t.balance) for t in account.history]
+        self.assertListEqual(
+            codes, [(-5500, 0, -4500), (0, -1, -4500), (5200, 1, 700)]
+        )
+        self.assertEqual(account.history[-1].cents, 5200)
+        self.assertEqual(account.history[0].cents, -5500)
+
+    def test_keep_history(self):
+        account = Checking(10)
+        Account.keep_history = False
+        try:
+            account.deposit(5)
+        finally:
+            Account.keep_history = True
+        self.assertIsNone(account._history)
+        self.assertEqual(account.cents, 1500)
+
+    def test_balance_out_of_range(self):
+        customer = Customer("John", "Doe", 30)
+        account = Savings(10)
+        customer.add_account("Savings", account)
+        with self.assertRaises(OverflowError):
+            account.deposit(Cents(MAX_CENTS))
+        # Nothing changed, and the account still works
+        self.assertEqual(account.cents, 1000)
+        self.assertEqual(customer.total_cents, 1000)
+        self.assertIsNone(account._history)
+        account.deposit(Cents(1))
+        self.assertEqual(customer.total_cents, 1001)
+
+    def test_reset_not_recorded(self):
+        account = MoneyMarket(10)
+        account.withdraw(1)
+        account.reset_withdrawals()
+        self.assertEqual(len(account.history), 1)
+
+    def test_stored_account_history(self):
+        store = AccountStore()
+        store.add(1, "Savings", 10).deposit(Cents(50))
+        store.account(0).withdraw(Cents(25))
+        self.assertListEqual(
+            [t.balance for t in store.account(0).history], [1050, 1025]
+        )
+        self.assertIsNone(store.add(1, "Checking", 0)._history)
+
+
+if __name__ == "__main__":
+    unittest.main()
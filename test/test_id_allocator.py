@@ -0,0 +1,81 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from lib.customer import Customer
+from lib.id_allocator import IdAllocator
+
+
+class TestIdAllocator(unittest.TestCase):
+    def setUp(self):
+        self.next_id = Customer.id
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "ids")
+
+    def tearDown(self):
+        Customer.id = self.next_id
+        Customer.allocator = None
+        self.tmp.cleanup()
+
+    def test_next_id(self):
+        allocator = IdAllocator(block_size=4)
+        self.assertEqual(
+            [allocator.next_id() for _ in range(6)], [1, 2, 3, 4, 5, 6]
+        )
+        self.assertEqual(allocator.reserve(3), range(9, 12))
+
+    def test_threads_unique(self):
+        allocator = IdAllocator(self.path, block_size=16)
+        ids = [[] for _ in range(8)]
+
+        def take(taken):
+            for _ in range(100):
+                taken.append(allocator.next_id())
+
+        threads = [
+            threading.Thread(target=take, args=(taken,)) for taken in ids
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        every_id = [user_id for taken in ids for user_id in taken]
+        self.assertEqual(len(set(every_id)), 800)
+        for taken in ids:
+            self.assertEqual(taken, sorted(taken))
+
+    def test_persisted(self):
+        first = IdAllocator(self.path, block_size=10)
+        self.assertEqual(first.next_id(), 1)
+        with open(self.path, encoding="utf-8") as ids_file:
+            self.assertEqual(ids_file.read(), "11\n")
+        # A second allocator on the same file, as after a restart or
+        # in another process, never overlaps the first one's block
+        second = IdAllocator(self.path, block_size=10)
+        self.assertEqual(second.next_id(), 11)
+        self.assertEqual(first.next_id(), 2)
+        self.assertEqual(first.reserve(5), range(21, 26))
+
+    def test_observe(self):
+        allocator = IdAllocator(block_size=10)
+        self.assertEqual(allocator.next_id(), 1)
+        allocator.observe(5)
+        self.assertEqual(allocator.next_id(), 6)
+        allocator.observe(3)
+        self.assertEqual(allocator.next_id(), 7)
+        allocator.observe(20)
+        self.assertEqual(allocator.next_id(), 21)
+
+    def test_customer(self):
+        Customer.allocator = IdAllocator(self.path, block_size=10)
+        self.assertEqual(Customer("John", "Doe", 30, 40).user_id, 40)
+        self.assertEqual(Customer("Jane", "Doe", 30).user_id, 41)
+        Customer.observe_id(50)
+        self.assertEqual(Customer("Jack", "Doe", 30).user_id, 51)
+        Customer.allocator = IdAllocator(self.path, block_size=10)
+        self.assertEqual(Customer("Jill", "Doe", 30).user_id, 61)
+
+
+if __name__ == "__main__":
+    unittest.main()
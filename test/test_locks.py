@@ -0,0 +1,40 @@
+import threading
+import unittest
+
+from lib.locks import DEFAULT_STRIPES, StripedLocks
+
+
+class TestStripedLocks(unittest.TestCase):
+    def test_lock(self):
+        locks = StripedLocks(8)
+        self.assertEqual(len(locks), 8)
+        self.assertEqual(locks.stripes, 8)
+        self.assertEqual(StripedLocks().stripes, DEFAULT_STRIPES)
+        objs = [object() for _ in range(64)]
+        for obj in objs:
+            self.assertIs(locks.lock(obj), locks.lock(obj))
+        # Objects are spread over more than one of the locks
+        self.assertGreater(len({id(locks.lock(obj)) for obj in objs}), 1)
+
+    def test_lock_for_key(self):
+        locks = StripedLocks(8)
+        for key in range(64):
+            self.assertIs(locks.lock_for_key(key), locks.lock_for_key(key))
+        self.assertIs(locks.lock_for_key(3), locks.lock_for_key(11))
+        self.assertIsNot(locks.lock_for_key(3), locks.lock_for_key(4))
+
+    def test_reentrant(self):
+        locks = StripedLocks(1)
+        first, second = object(), object()
+        # Two objects sharing a lock can be locked by the same thread
+        with locks.lock(first), locks.lock(second):
+            thread = threading.Thread(target=locks.lock(first).acquire)
+            thread.start()
+            thread.join(timeout=0.1)
+            self.assertTrue(thread.is_alive())
+        thread.join(timeout=5)
+        self.assertFalse(thread.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -27,6 +27,19 @@ class TestMenu(unittest.TestCase):
         self.assertIn("New Option", menu.selections)
         self.assertNotIn("Option 1", menu.selections)
 
+    def test_str(self):
+        menu = Menu()
+        menu.add_selection("get users")
+        menu.add_selection("quit")
+        self.assertEqual(str(menu), "1. Get Users\n2. Quit")
+        self.assertIs(str(menu), str(menu))
+        menu.replace_selection("new user", 0)
+        self.assertEqual(str(menu), "1. New User\n2. Quit")
+        menu.del_selection("quit")
+        self.assertEqual(str(menu), "1. New User")
+        menu.add_selection("quit")
+        self.assertEqual(str(menu), "1. New User\n2. Quit")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+
+import bank_of_nerds
+from lib import metrics
+from lib.checking import Checking
+from lib.customer import Customer
+from lib.directory import Directory
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = metrics.Registry(buckets=(0.5, 1.0))
+
+    def test_inc(self):
+        self.registry.inc("hits", code=1)
+        self.registry.inc("hits", 2, code=1)
+        self.registry.inc("hits", code=0)
+        self.assertEqual(self.registry.counter("hits", code=1), 3)
+        self.assertEqual(self.registry.counter("hits", code=0), 1)
+        self.assertEqual(self.registry.counter("hits", code=-1), 0)
+
+    def test_observe(self):
+        for value in (0.1, 0.5, 0.7, 2.0):
+            self.registry.observe("latency", value, op="withdraw")
+        histogram = self.registry.histogram("latency", op="withdraw")
+        self.assertListEqual(histogram.counts, [2, 1, 1])
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.total, 3.3)
+
+    def test_timer(self):
+        with self.registry.timer("latency"):
+            pass
+        self.assertEqual(self.registry.histogram("latency").count, 1)
+
+    def test_render(self):
+        self.registry.inc("hits", op="deposit", code=1)
+        self.registry.observe("latency", 0.75)
+        self.assertEqual(
+            self.registry.render(),
+            "# TYPE hits counter\n"
+            'hits{op="deposit",code="1"} 1\n'
+            "# TYPE latency histogram\n"
+            'latency_bucket{le="0.5"} 0\n'
+            'latency_bucket{le="1.0"} 1\n'
+            'latency_bucket{le="+Inf"} 1\n'
+            "latency_sum 0.75\n"
+            "latency_count 1\n",
+        )
+
+    def test_write(self):
+        self.registry.inc("hits")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "metrics.prom")
+            self.registry.write(path)
+            with open(path, encoding="utf-8") as metrics_file:
+                self.assertEqual(metrics_file.read(), self.registry.render())
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.next_id = Customer.id
+        self.registry = metrics.enable()
+
+    def tearDown(self):
+        metrics.disable()
+        Customer.id = self.next_id
+
+    def test_disabled(self):
+        metrics.disable()
+        account = Checking(10)
+        self.assertEqual(account.withdraw(20), 0)
+        self.assertIs(metrics.timer("latency"), metrics.timer("latency"))
+
+    def test_account_results(self):
+        account = Checking(10)
+        self.assertEqual(account.withdraw(20), 0)
+        self.assertEqual(account.withdraw(1000), -1)
+        self.assertEqual(account.deposit(5), 1)
+        results = "bank_account_results_total"
+        for op, code in (("withdraw", 0), ("withdraw", -1), ("deposit", 1)):
+            count = self.registry.counter(
+                results, op=op, type="Checking", code=code
+            )
+            self.assertEqual(count, 1)
+        histogram = self.registry.histogram(
+            "bank_account_op_seconds", op="withdraw", type="Checking"
+        )
+        self.assertEqual(histogram.count, 2)
+
+    def test_transactions(self):
+        users = bank_of_nerds.generate_default_users(Directory())
+        user_id = next(iter(users)).user_id
+        records = [
+            f"{user_id}:Checking:1:1:Withdraw",
+            f"{user_id}:Bogus:1:1:Deposit",
+        ]
+        bank_of_nerds.run_batch(records, users)
+        total = "bank_transactions_total"
+        self.assertEqual(
+            self.registry.counter(total, op="withdraw", code=1), 1
+        )
+        self.assertEqual(
+            self.registry.counter(total, op="deposit", code=-3), 1
+        )
+
+    def test_menu(self):
+        users = bank_of_nerds.generate_default_users(Directory())
+        session = bank_of_nerds.teller_session(users)
+        output = next(session)
+        self.assertTrue(output.endswith("10. Quit\n11. Metrics\n> "))
+        session.send("3")
+        session.send(str(next(iter(users)).user_id))
+        session.send("4")
+        output = session.send("Metrics")
+        self.assertIn("# TYPE bank_statement_seconds histogram", output)
+        self.assertIn("bank_statement_seconds_count 1", output)
+        output = session.send("11")
+        self.assertIn("# TYPE bank_statement_seconds histogram", output)
@@ -0,0 +1,43 @@
+import unittest
+
+from lib.money import MAX_CENTS, Cents, format_cents, parse_cents, to_cents
+
+
+class TestMoney(unittest.TestCase):
+    def test_parse_cents(self):
+        self.assertEqual(parse_cents("400.00"), 40000)
+        self.assertEqual(parse_cents(" 0.1 "), 10)
+        self.assertEqual(parse_cents("-3"), -300)
+        self.assertEqual(parse_cents("1.005"), 100)
+        self.assertEqual(parse_cents("1.015"), 102)
+        self.assertIsInstance(parse_cents("1"), Cents)
+        self.assertEqual(parse_cents("-92233720368547758.07"), -MAX_CENTS)
+        for text in ("", "abc", "1.2.3", "nan", "inf", "1e20", "-1e17"):
+            with self.assertRaises(ValueError):
+                parse_cents(text)
+        with self.assertRaises(TypeError):
+            parse_cents(None)
+
+    def test_to_cents(self):
+        self.assertEqual(to_cents(Cents(5)), 5)
+        self.assertEqual(to_cents(5), 500)
+        self.assertEqual(to_cents(14356.99), 1435699)
+        self.assertEqual(to_cents(0.1 + 0.2), 30)
+        self.assertEqual(to_cents("2.50"), 250)
+
+    def test_format_cents(self):
+        self.assertEqual(format_cents(0), "0.00")
+        self.assertEqual(format_cents(5), "0.05")
+        self.assertEqual(format_cents(150432), "1504.32")
+        self.assertEqual(format_cents(-23500), "-235.00")
+        self.assertEqual(format_cents(-5), "-0.05")
+
+    def test_no_drift(self):
+        total = 0
+        for _ in range(1000):
+            total += to_cents(0.1)
+        self.assertEqual(total, 10000)
+
+
+if __name__ == "__main__":
+    unittest.main()
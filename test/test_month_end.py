@@ -0,0 +1,127 @@
+import os
+import tempfile
+import unittest
+
+from lib.account_store import AccountStore
+from lib.checking import Checking
+from lib.customer import Customer
+from lib.directory import Directory
+from lib.money_market_fund import MoneyMarket
+from lib.month_end import (
+    ClosingRecord,
+    close_month,
+    close_month_customers,
+    closing_records,
+)
+from lib.savings import Savings
+from lib.snapshot import Snapshot, write_snapshot
+from lib.transaction_log import TransactionLog, replay
+
+FEES = {"Checking": (100000, 1200), "Money Market Fund": (250000, 1500)}
+
+
+class TestMonthEnd(unittest.TestCase):
+    def test_close_month(self):
+        store = AccountStore()
+        store.add(1, "Checking", 999.99)
+        store.add(1, "Checking", 1000)
+        store.add(2, "Savings", 1)
+        market_fund = store.add(2, "Money Market Fund", 10)
+        market_fund.withdraw(1)
+        market_fund.withdraw(1)
+        self.assertEqual(market_fund.withdraw(1), -2)
+
+        charged = close_month(store, FEES)
+        self.assertListEqual(list(charged), [1200, 0, 0, 1500])
+        self.assertListEqual(list(store.balances), [98799, 100000, 100, -700])
+        self.assertListEqual(list(store.transaction_counts), [0, 0, 0, 0])
+        self.assertEqual(market_fund.withdraw(1), -1)
+        self.assertListEqual(
+            list(closing_records(store, charged)),
+            [
+                ClosingRecord(1, "Checking", 0, 98799, 1200),
+                ClosingRecord(1, "Checking", 1, 100000, 0),
+                ClosingRecord(2, "Savings", 2, 100, 0),
+                ClosingRecord(2, "Money Market Fund", 3, -700, 1500),
+            ],
+        )
+
+    def test_close_month_customers(self):
+        customer = Customer("John", "Doe", 30)
+        market_fund = MoneyMarket(5000)
+        market_fund.withdraw(1)
+        market_fund.withdraw(1)
+        customer.add_account("Money Market Fund", market_fund)
+        customer.add_account("Savings", Savings(1))
+        customer.add_account("Checking", Checking(2000))
+        customer.add_account("Checking", Checking(20))
+
+        records = list(close_month_customers([customer], FEES))
+        user_id = customer.user_id
+        self.assertListEqual(
+            records,
+            [
+                ClosingRecord(user_id, "Checking", 1, 200000, 0),
+                ClosingRecord(user_id, "Checking", 2, 800, 1200),
+                ClosingRecord(user_id, "Savings", 1, 100, 0),
+                ClosingRecord(user_id, "Money Market Fund", 1, 499800, 0),
+            ],
+        )
+        self.assertEqual(market_fund.withdraw(1), 1)
+
+    def test_close_month_owners(self):
+        store = AccountStore()
+        checking = store.add(1, "Checking", 10)
+        store.add(1, "Checking", 10)
+        customer = Customer("John", "Doe", 30)
+        customer.add_account("Checking", checking)
+        users = Directory()
+        users.add(customer)
+        self.assertEqual(users.total_cents(), 1000)
+        customer.get_all_balances()
+
+        close_month(store, FEES)
+        # Only the customer holding the first row is told of its fee
+        self.assertEqual(customer.total_cents, -200)
+        self.assertEqual(users.total_cents(), -200)
+        self.assertIn("$-2.00", customer.get_all_balances())
+        self.assertEqual(checking.history[-1].cents, -1200)
+        self.assertEqual(store.account(1).history[-1].balance, -200)
+        self.assertEqual(store.total_cents(), -400)
+
+    def test_close_month_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            saved = Directory()
+            customer = saved.add(Customer("John", "Doe", 30))
+            customer.add_account("Checking", Checking(2000))
+            customer.add_account("Checking", Checking(20))
+            other = saved.add(Customer("Jane", "Doe", 30))
+            other.add_account("Savings", Savings(1))
+            path = os.path.join(tmp, "snapshot")
+            write_snapshot(path, saved, 0)
+            log_path = os.path.join(tmp, "journal")
+
+            with Snapshot(path) as snapshot, TransactionLog(
+                log_path
+            ) as journal:
+                users = Directory(snapshot)
+                records = list(close_month_customers(users, FEES, journal))
+                self.assertEqual(len(records), 3)
+                # Only the customer charged a fee is kept loaded
+                self.assertListEqual(
+                    list(users.customers), [customer.user_id]
+                )
+                held = users.get(customer.user_id)
+                self.assertEqual(held._accounts["Checking"][1].cents, 800)
+                self.assertEqual(users.total_cents(), 200000 + 800 + 100)
+
+            with Snapshot(path) as snapshot:
+                restored = Directory(snapshot)
+                replay(log_path, restored)
+                self.assertEqual(
+                    restored.get(customer.user_id).get_all_balances(),
+                    held.get_all_balances(),
+                )
+
+if __name__ == "__main__":
+    unittest.main()
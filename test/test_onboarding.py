@@ -0,0 +1,89 @@
+import io
+import os
+import tempfile
+import unittest
+
+from lib.customer import Customer
+from lib.directory import Directory
+from lib.onboarding import ImportSummary, import_csv
+from lib.transaction_log import TransactionLog, replay
+
+ROWS = """first_name,last_name,age,account_type,amount
+John,Smith,21,Checking,400.00
+,,,savings,1250
+,,,401k,10.5
+Jane,Doe,35,,
+
+Old,Timer,121,Checking,1
+,,,Savings,5
+Bad,Amount,40,Checking,lots
+Bad,Type,40,Vault,1
+Negative,Amount,40,Savings,-1
+,,,Savings,2
+Too,Few,40
+Jack,Doe,x,,
+"""
+
+
+class TestOnboarding(unittest.TestCase):
+    def setUp(self):
+        self.next_id = Customer.id
+        self.users = Directory()
+
+    def tearDown(self):
+        Customer.id = self.next_id
+
+    def test_import_csv(self):
+        rejects = io.StringIO()
+        summary = import_csv(io.StringIO(ROWS), self.users, rejects=rejects)
+        self.assertEqual(summary, ImportSummary(2, 3, 8))
+        john, jane = self.users
+        self.assertEqual(
+            (john.first_name, john.last_name, john.age), ("John", "Smith", 21)
+        )
+        self.assertEqual(
+            {name: len(accounts) for name, accounts in john._accounts.items()},
+            {"Checking": 1, "Savings": 1, "401K": 1},
+        )
+        self.assertEqual(john.total_cents, 40000 + 125000 + 1050)
+        self.assertEqual((jane.first_name, jane._accounts), ("Jane", {}))
+        self.assertEqual(
+            rejects.getvalue().splitlines(),
+            [
+                "line 7: Invalid age supplied",
+                "line 8: No user to add the account to",
+                "line 9: Amount must be a valid number",
+                "line 10: Invalid account type",
+                "line 11: Initial amount must be positive",
+                "line 12: No user to add the account to",
+                "line 13: Incorrect number of values provided",
+                "line 14: Invalid age field",
+            ],
+        )
+
+    def test_batches(self):
+        rows = "".join(
+            f"User,{idx},{idx},Checking,{idx}\n,,,Savings,1\n"
+            for idx in range(10)
+        )
+        summary = import_csv(io.StringIO(rows), self.users, batch_size=3)
+        self.assertEqual(summary, ImportSummary(10, 20, 0))
+        for idx, user in enumerate(self.users):
+            self.assertEqual(user.age, idx)
+            self.assertEqual(user.total_cents, idx * 100 + 100)
+
+    def test_journal(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "journal")
+            with TransactionLog(path) as journal:
+                import_csv(io.StringIO(ROWS), self.users, journal)
+            restored = Directory()
+            replay(path, restored)
+        self.assertEqual(
+            [(user.user_id, user.total_cents) for user in restored],
+            [(user.user_id, user.total_cents) for user in self.users],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
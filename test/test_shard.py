@@ -0,0 +1,72 @@
+import unittest
+
+from lib.money import Cents
+from lib.shard import ShardedBank
+
+
+class TestShardedBank(unittest.TestCase):
+    def setUp(self):
+        # Every test gets its own workers and customers
+        self.bank = ShardedBank(shards=3)
+        self.addCleanup(self.bank.close)
+        self.user_ids = [
+            self.bank.add_customer("John", f"Doe{n}", 20 + n * 20)
+            for n in range(4)
+        ]
+
+    def test_get_users(self):
+        self.assertListEqual(
+            self.bank.get_users(),
+            [(self.user_ids[n], "John", f"Doe{n}") for n in range(4)],
+        )
+
+    def test_transactions(self):
+        user_id = self.user_ids[0]
+        self.bank.add_account(user_id, "Checking", Cents(1000))
+        self.assertEqual(
+            self.bank.withdraw_from(user_id, "Checking", 0, Cents(1500)), 0
+        )
+        self.assertEqual(
+            self.bank.deposit_into(user_id, "Checking", 0, Cents(4000)), 1
+        )
+        self.assertIn(
+            "Checking #1\nAccount balance: $0.00",
+            self.bank.get_all_balances(user_id),
+        )
+        with self.assertRaises(IndexError):
+            self.bank.deposit_into(user_id, "Checking", 1, Cents(1))
+        with self.assertRaises(KeyError):
+            self.bank.deposit_into(0, "Savings", 0, Cents(1))
+
+    def test_retirement_age(self):
+        young, old = self.user_ids[1], self.user_ids[3]
+        self.bank.add_account(young, "401K", Cents(1000))
+        self.bank.add_account(old, "401K", Cents(1000))
+        self.assertEqual(
+            self.bank.withdraw_from(young, "401K", 0, Cents(1)), -2
+        )
+        self.assertEqual(self.bank.withdraw_from(old, "401K", 0, Cents(1)), 1)
+
+    def test_apply_batch(self):
+        user_ids = self.user_ids
+        for user_id in user_ids:
+            self.bank.add_account(user_id, "Savings", Cents(0))
+        requests = []
+        for n in range(100):
+            user_id = user_ids[n % len(user_ids)]
+            requests.append(("deposit_into", user_id, "Savings", 0, Cents(2)))
+        requests.append(("withdraw_from", user_ids[2], "Savings", 0, 1000))
+        requests.append(("deposit_into", user_ids[2], "Savings", 5, 1))
+        results = self.bank.apply_batch(requests)
+        self.assertListEqual(results[:100], [1] * 100)
+        self.assertEqual(results[100], -1)
+        self.assertIsInstance(results[101], IndexError)
+        for user_id in user_ids:
+            self.assertIn(
+                "Savings #1\nAccount balance: $0.50",
+                self.bank.get_all_balances(user_id),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+
+from lib.checking import Checking
+from lib.customer import Customer
+from lib.directory import Directory
+from lib.money_market_fund import MoneyMarket
+from lib.savings import Savings
+from lib.snapshot import Snapshot, write_snapshot
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp()
+        os.close(handle)
+        self.customer1 = Customer("Sherri", "Perrson", 83)
+        self.customer1.add_account("Savings", Savings(14356.99))
+        self.customer1.add_account("Checking", Checking(-12.5))
+        self.customer1.add_account("Checking", Checking(3))
+        market_fund = MoneyMarket(3560.75)
+        market_fund.withdraw(10)
+        self.customer1.add_account("Money Market Fund", market_fund)
+        self.customer2 = Customer("Zoë", "Doe", 24)
+        write_snapshot(
+            self.path, [self.customer2, self.customer1], journal_offset=42
+        )
+        self.snapshot = Snapshot(self.path)
+
+    def tearDown(self):
+        self.snapshot.close()
+        os.remove(self.path)
+
+    def test_header(self):
+        self.assertEqual(len(self.snapshot), 2)
+        self.assertEqual(self.snapshot.max_user_id, self.customer2.user_id)
+        self.assertEqual(self.snapshot.journal_offset, 42)
+        self.assertGreater(Customer.id, self.customer2.user_id)
+        self.assertListEqual(
+            list(self.snapshot.user_ids()),
+            [self.customer1.user_id, self.customer2.user_id],
+        )
+
+    def test_get(self):
+        restored = self.snapshot.get(self.customer1.user_id)
+        self.assertIsNot(restored, self.customer1)
+        self.assertEqual(restored.first_name, "Sherri")
+        self.assertEqual(restored.last_name, "Perrson")
+        self.assertEqual(restored.age, 83)
+        self.assertEqual(
+            restored.get_all_balances(), self.customer1.get_all_balances()
+        )
+        market_fund = restored._accounts["Money Market Fund"][0]
+        self.assertEqual(market_fund.withdraw(10), 1)
+        self.assertEqual(market_fund.withdraw(10), -2)
+        restored = self.snapshot.get(self.customer2.user_id)
+        self.assertEqual(restored.first_name, "Zoë")
+        self.assertEqual(restored._accounts, {})
+        self.assertIsNone(self.snapshot.get(0))
+        self.assertNotIn(0, self.snapshot)
+
+    def test_not_a_snapshot(self):
+        with open(self.path, "wb") as snapshot_file:
+            snapshot_file.write(b"\0" * 64)
+        with self.assertRaises(ValueError):
+            Snapshot(self.path)
+
+    def test_backed_directory(self):
+        users = Directory(self.snapshot)
+        self.assertEqual(len(users), 2)
+        self.assertDictEqual(users.customers, {})
+        user_id = self.customer1.user_id
+        self.assertIn(user_id, users)
+        # Customers are loaded once, on first access
+        restored = users.get(user_id)
+        self.assertIs(users.get(user_id), restored)
+        self.assertListEqual(list(users.customers), [user_id])
+
+        new_customer = users.add(Customer("John", "Doe", 30))
+        self.assertEqual(len(users), 3)
+        with self.assertRaises(ValueError):
+            users.add(Customer("Sherri", "Perrson", 83, user_id))
+        users.remove(user_id)
+        self.assertNotIn(user_id, users)
+        self.assertIsNone(users.get(user_id))
+        self.assertListEqual(
+            [user.user_id for user in users],
+            [self.customer2.user_id, new_customer.user_id],
+        )
+        self.assertEqual(len(users), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
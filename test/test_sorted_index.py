@@ -0,0 +1,58 @@
+import math
+import random
+import unittest
+
+from lib import sorted_index
+from lib.sorted_index import SortedIndex
+
+
+class TestSortedIndex(unittest.TestCase):
+    def setUp(self):
+        self.chunk_size = sorted_index._CHUNK_SIZE
+        sorted_index._CHUNK_SIZE = 4
+        self.keys = [(random.randrange(-50, 50), n) for n in range(200)]
+        self.index = SortedIndex(self.keys[:100])
+        for key in self.keys[100:]:
+            self.index.add(key)
+
+    def tearDown(self):
+        sorted_index._CHUNK_SIZE = self.chunk_size
+
+    def test_add(self):
+        self.assertEqual(len(self.index), 200)
+        self.assertListEqual(list(self.index), sorted(self.keys))
+        self.assertListEqual(
+            list(reversed(self.index)), sorted(self.keys, reverse=True)
+        )
+        self.assertIn(self.keys[0], self.index)
+        self.assertNotIn((0, -1), self.index)
+
+    def test_remove(self):
+        for key in self.keys[::2]:
+            self.index.remove(key)
+        self.assertListEqual(list(self.index), sorted(self.keys[1::2]))
+        with self.assertRaises(KeyError):
+            self.index.remove(self.keys[0])
+        for key in self.keys[1::2]:
+            self.index.remove(key)
+        self.assertEqual(len(self.index), 0)
+        self.assertListEqual(list(self.index.irange()), [])
+
+    def test_irange(self):
+        expected = sorted(key for key in self.keys if -10 <= key[0] <= 10)
+        result = list(self.index.irange((-10,), (10, math.inf)))
+        self.assertListEqual(result, expected)
+        expected = sorted(key for key in self.keys if key[0] < 0)
+        self.assertListEqual(
+            list(self.index.irange(high=(-1, math.inf))), expected
+        )
+        self.assertListEqual(list(self.index.irange(low=(100,))), [])
+
+    def test_largest(self):
+        self.assertListEqual(
+            self.index.largest(10), sorted(self.keys, reverse=True)[:10]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
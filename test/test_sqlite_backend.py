@@ -0,0 +1,219 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+from lib.checking import Checking
+from lib.customer import Customer
+from lib.directory import Directory
+from lib.money import Cents
+from lib.money_market_fund import MoneyMarket
+from lib.savings import Savings
+from lib.sqlite_backend import SQLiteBackend
+
+
+class TestSQLiteBackend(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp()
+        os.close(handle)
+        self.database = SQLiteBackend(self.path, group_size=3)
+        self.customer = Customer("Sherri", "Perrson", 83)
+        self.customer.add_account("Savings", Savings(14356.99))
+        self.customer.add_account("Checking", Checking(10))
+        self.customer.add_account("Checking", Checking(20))
+        self.customer.add_account("Money Market Fund", MoneyMarket(100))
+        self.database.save_customers([self.customer])
+
+    def tearDown(self):
+        self.database.close()
+        os.remove(self.path)
+
+    def test_save_customers(self):
+        self.assertEqual(len(self.database), 1)
+        self.assertIn(self.customer.user_id, self.database)
+        self.assertNotIn(0, self.database)
+        self.assertEqual(self.database.max_user_id, self.customer.user_id)
+        self.assertListEqual(
+            list(self.database.user_ids()), [self.customer.user_id]
+        )
+
+    def test_get(self):
+        restored = self.database.get(self.customer.user_id)
+        self.assertEqual(restored.first_name, "Sherri")
+        self.assertEqual(restored.age, 83)
+        self.assertEqual(
+            restored.get_all_balances(), self.customer.get_all_balances()
+        )
+        self.assertIsNone(self.database.get(0))
+
+    def test_get_all_balances(self):
+        self.assertEqual(
+            self.database.get_all_balances(self.customer.user_id),
+            self.customer.get_all_balances(),
+        )
+        self.assertEqual(self.database.get_all_balances(0), "")
+
+    def test_log_changes(self):
+        users = Directory(self.database)
+        user = users.get(self.customer.user_id)
+        new_user = users.add(Customer("John", "Doe", 24))
+        self.database.log_customer(new_user)
+        user.withdraw_from("Money Market Fund", 0, Cents(1000))
+        self.database.log_transaction(
+            user, "Withdraw", "Money Market Fund", 0, Cents(1000)
+        )
+        self.assertEqual(self.database.pending, 2)
+        new_account = Savings(25.42)
+        new_user.add_account("Savings", new_account)
+        self.database.log_account(new_user, "Savings", new_account)
+        # The third change fills the group and commits all of them
+        self.assertEqual(self.database.pending, 0)
+        self.database.close()
+
+        self.database = SQLiteBackend(self.path)
+        self.assertEqual(len(self.database), 2)
+        restored = self.database.get(user.user_id)
+        self.assertEqual(
+            restored.get_all_balances(), user.get_all_balances()
+        )
+        market_fund = restored._accounts["Money Market Fund"][0]
+        self.assertEqual(market_fund._transaction_count, 1)
+        restored = self.database.get(new_user.user_id)
+        self.assertEqual(
+            restored.get_all_balances(), new_user.get_all_balances()
+        )
+        self.assertGreater(Customer.id, new_user.user_id)
+
+    def test_transaction_times(self):
+        start = time.time()
+        self.database.log_transaction(
+            self.customer, "Deposit", "Savings", 0, Cents(1)
+        )
+        self.database.commit()
+        with sqlite3.connect(self.path) as connection:
+            (logged,) = connection.execute(
+                "SELECT timestamp FROM transactions"
+            ).fetchone()
+        connection.close()
+        self.assertTrue(start <= logged <= time.time())
+
+    def test_transaction_times_added(self):
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        # A database created before transactions held their time
+        with sqlite3.connect(path) as connection:
+            connection.execute(
+                "CREATE TABLE transactions (id INTEGER PRIMARY KEY, "
+                "user_id INTEGER NOT NULL, type_code INTEGER NOT NULL, "
+                "number INTEGER NOT NULL, op TEXT NOT NULL, "
+                "cents INTEGER NOT NULL)"
+            )
+        connection.close()
+        database = SQLiteBackend(path)
+        user = Customer("John", "Doe", 24)
+        user.add_account("Savings", Savings(0))
+        database.save_customers([user])
+        database.log_transaction(user, "Deposit", "Savings", 0, Cents(1))
+        database.close()
+        with sqlite3.connect(path) as connection:
+            rows = connection.execute(
+                "SELECT op, cents FROM transactions"
+            ).fetchall()
+        connection.close()
+        self.assertListEqual(rows, [("Deposit", 1)])
+
+    def test_lookups_do_not_commit(self):
+        users = Directory(self.database)
+        self.assertEqual(len(users), 1)
+        new_user = users.add(Customer("John", "Doe", 24))
+        self.database.log_customer(new_user)
+        self.assertEqual(self.database.pending, 1)
+        self.assertIn(new_user.user_id, self.database)
+        self.assertEqual(len(self.database), 2)
+        self.assertEqual(self.database.max_user_id, new_user.user_id)
+        self.assertListEqual(
+            list(self.database.user_ids()),
+            [self.customer.user_id, new_user.user_id],
+        )
+        users.get(self.customer.user_id)
+        self.assertEqual(self.database.pending, 1)
+        # Each customer is counted once, before and after the commit
+        self.assertEqual(len(users), 2)
+        self.database.commit()
+        self.assertEqual(len(users), 2)
+        users.add(Customer("Jane", "Doe", 25))
+        self.assertEqual(len(users), 3)
+        self.assertEqual(len(list(users.scan())), 3)
+
+    def test_lookups_during_commit(self):
+        new_user = Customer("John", "Doe", 24)
+        self.database.log_customer(new_user)
+        user_ids = [self.customer.user_id, new_user.user_id]
+        # A commit part way through writing the new customer, as if
+        # made by another thread, does not hold lookups up
+        writer = self.database._writer
+        with self.database._writer_lock:
+            writer.execute(
+                "INSERT INTO customers VALUES (?, 'John', 'Doe', 24)",
+                (new_user.user_id,),
+            )
+            try:
+                self.assertEqual(len(self.database), 2)
+                self.assertIn(new_user.user_id, self.database)
+                self.assertListEqual(
+                    list(self.database.user_ids()), user_ids
+                )
+                self.assertEqual(
+                    self.database.get_all_balances(self.customer.user_id),
+                    self.customer.get_all_balances(),
+                )
+            finally:
+                writer.rollback()
+        # Once written, the customer is only counted once
+        self.database.commit()
+        self.assertEqual(len(self.database), 2)
+        self.assertListEqual(list(self.database.user_ids()), user_ids)
+
+    def test_get_commits_pending_changes(self):
+        users = Directory(self.database)
+        user = users.get(self.customer.user_id)
+        user.deposit_into("Checking", 1, Cents(5))
+        self.database.log_transaction(
+            user, "Deposit", "Checking", 1, Cents(5)
+        )
+        self.assertEqual(self.database.pending, 1)
+        self.assertEqual(
+            self.database.get_all_balances(user.user_id),
+            user.get_all_balances(),
+        )
+        self.assertEqual(self.database.pending, 0)
+
+    def test_commit_from_thread(self):
+        users = Directory(self.database)
+        done = threading.Event()
+
+        def committer():
+            while not done.is_set():
+                self.database.commit()
+
+        thread = threading.Thread(target=committer)
+        thread.start()
+        try:
+            for n in range(200):
+                new_user = users.add(Customer("John", f"Doe{n}", 24))
+                self.database.log_customer(new_user)
+                self.assertIn(new_user.user_id, self.database)
+        finally:
+            done.set()
+            thread.join()
+        self.assertEqual(len(self.database), 201)
+        self.database.commit()
+        self.assertEqual(len(self.database), 201)
+        self.assertEqual(len(list(self.database.user_ids())), 201)
+
+
+if __name__ == "__main__":
+    unittest.main()
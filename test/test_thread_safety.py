@@ -0,0 +1,154 @@
+import sys
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from lib.account import Account
+from lib.account_store import AccountStore
+from lib.checking import Checking
+from lib.customer import Customer
+from lib.directory import Directory
+from lib.money import Cents
+from lib.money_market_fund import MoneyMarket
+from lib.savings import Savings
+
+THREADS = 16
+ROUNDS = 2000
+
+
+class TestThreadSafety(unittest.TestCase):
+    def setUp(self):
+        self.switch_interval = sys.getswitchinterval()
+        # Switch threads as often as possible to provoke races
+        sys.setswitchinterval(1e-6)
+        Account.thread_safe = True
+
+    def tearDown(self):
+        Account.thread_safe = False
+        sys.setswitchinterval(self.switch_interval)
+
+    def hammer(self, accounts):
+        """Deposits and withdraws on every account from many threads
+
+        Returns the amount in cents each account should hold, given
+        the return codes of every withdrawal made."""
+        expected = [account.cents for account in accounts]
+        expected_lock = threading.Lock()
+
+        def worker(seed):
+            deltas = [0] * len(accounts)
+            for n in range(ROUNDS):
+                idx = (seed + n) % len(accounts)
+                account = accounts[idx]
+                account.deposit(Cents(300))
+                rc = account.withdraw(Cents(500))
+                deltas[idx] += 300
+                if rc == 1:
+                    deltas[idx] -= 500
+                elif rc == 0:
+                    # Checking overdraft fee
+                    deltas[idx] -= 500 + 3500
+            with expected_lock:
+                for idx, delta in enumerate(deltas):
+                    expected[idx] += delta
+
+        with ThreadPoolExecutor(THREADS) as pool:
+            list(pool.map(worker, range(THREADS)))
+        return expected
+
+    def test_conservation(self):
+        accounts = [Checking(100000), Savings(1000), Checking(0)]
+        expected = self.hammer(accounts)
+        self.assertListEqual(
+            [account.cents for account in accounts], expected
+        )
+
+    def test_store_conservation(self):
+        store = AccountStore()
+        accounts = [
+            store.add(1, "Savings", 1000),
+            store.add(2, "Checking", 0),
+        ]
+        expected = self.hammer(accounts)
+        self.assertListEqual(list(store.balances), expected)
+
+    def test_money_market_limit(self):
+        market_fund = MoneyMarket(1000)
+
+        def worker(_):
+            return market_fund.withdraw(Cents(100))
+
+        with ThreadPoolExecutor(THREADS) as pool:
+            results = list(pool.map(worker, range(THREADS * 10)))
+        self.assertEqual(results.count(1), 2)
+        self.assertEqual(market_fund.cents, 99800)
+
+    def test_per_account_locks(self):
+        checking1, checking2 = Checking(10), Checking(10)
+        self.assertIs(checking1.lock, checking1.lock)
+        accounts = [checking2]
+        while checking2.lock is checking1.lock:
+            # Accounts only rarely share one of the striped locks
+            checking2 = Checking(10)
+            accounts.append(checking2)
+        # Holding one account's lock does not block another account
+        with checking1.lock:
+            thread = threading.Thread(target=checking2.deposit, args=(5,))
+            thread.start()
+            thread.join(timeout=5)
+            self.assertFalse(thread.is_alive())
+        self.assertEqual(checking2.balance, 15)
+
+    def test_directory_totals(self):
+        users = Directory()
+        customers = []
+        for n in range(THREADS):
+            customer = users.add(Customer("John", f"Doe{n}", 30))
+            customer.add_account("Checking", Checking(1000))
+            customer.add_account("Savings", Savings(1000))
+            customers.append(customer)
+        # Build the totals and indexes so every change updates them
+        users.total_cents()
+        users.top_balances(1)
+        users.find_by_name("john")
+
+        def worker(seed):
+            customer = customers[seed]
+            for n in range(ROUNDS // 10):
+                customers[(seed + n) % THREADS].deposit_into(
+                    "Checking", 0, Cents(100)
+                )
+                customer.age = 30 + n % 5
+                customer.last_name = f"Doe{seed} {n % 3}"
+                new_user = users.add(Customer("Jane", "Roe", 25))
+                new_user.add_account("Savings", Savings(1))
+                users.remove(new_user.user_id)
+
+        with ThreadPoolExecutor(THREADS) as pool:
+            list(pool.map(worker, range(THREADS)))
+        rebuilt = Directory()
+        for customer in customers:
+            users.remove(customer.user_id)
+            rebuilt.add(customer)
+        self.assertEqual(users.total_cents(), 0)
+        self.assertListEqual(users.top_balances(1), [])
+        self.assertListEqual(list(users.find_by_name("j")), [])
+        self.assertEqual(
+            rebuilt.total_cents(), THREADS * (200000 + ROUNDS // 10 * 100)
+        )
+
+    def test_customer_ids(self):
+        def worker(_):
+            return [Customer("John", "Doe", 30).user_id for _ in range(100)]
+
+        with ThreadPoolExecutor(THREADS) as pool:
+            user_ids = [
+                user_id
+                for batch in pool.map(worker, range(THREADS))
+                for user_id in batch
+            ]
+        self.assertEqual(len(set(user_ids)), len(user_ids))
+
+
+if __name__ == "__main__":
+    unittest.main()
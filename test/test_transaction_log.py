@@ -0,0 +1,132 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from lib.checking import Checking
+from lib.customer import Customer
+from lib.directory import Directory
+from lib.money import Cents
+from lib.retirement import Retirement
+from lib.transaction_log import TransactionLog, replay
+
+
+class TestTransactionLog(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp()
+        os.close(handle)
+        self.customer = Customer("John", "Doe", 70)
+        self.checking = Checking(1000)
+        self.retirement = Retirement(50)
+        self.customer.add_account("Checking", self.checking)
+        self.customer.add_account("401K", self.retirement)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def write_log(self, group_size=64):
+        with TransactionLog(self.path, group_size) as journal:
+            journal.log_customer(self.customer)
+            journal.log_account(self.customer, "Checking", self.checking)
+            journal.log_account(self.customer, "401K", self.retirement)
+            self.checking.withdraw(Cents(120000))
+            journal.log_transaction(
+                self.customer, "Withdraw", "Checking", 0, Cents(120000)
+            )
+            self.retirement.withdraw(Cents(2000), self.customer.age)
+            journal.log_transaction(
+                self.customer, "Withdraw", "401K", 0, Cents(2000)
+            )
+            self.checking.deposit(Cents(1))
+            journal.log_transaction(
+                self.customer, "Deposit", "Checking", 0, Cents(1)
+            )
+
+    def test_group_commit(self):
+        journal = TransactionLog(self.path, group_size=3)
+        journal.log_customer(self.customer)
+        journal.log_account(self.customer, "Checking", self.checking)
+        self.assertEqual(journal.pending, 2)
+        self.assertEqual(os.path.getsize(self.path), 0)
+        journal.log_account(self.customer, "401K", self.retirement)
+        self.assertEqual(journal.pending, 0)
+        with open(self.path) as log_file:
+            self.assertEqual(len(log_file.readlines()), 3)
+        journal.close()
+
+    def test_replay(self):
+        self.write_log()
+        users = Directory()
+        end = replay(self.path, users)
+        self.assertEqual(end, os.path.getsize(self.path))
+        restored = users.get(self.customer.user_id)
+        self.assertEqual(restored.first_name, "John")
+        self.assertEqual(restored.age, 70)
+        self.assertEqual(
+            restored.get_all_balances(), self.customer.get_all_balances()
+        )
+        self.assertEqual(restored._accounts["Checking"][0].cents, -23499)
+        self.assertEqual(restored._accounts["401K"][0].cents, 3000)
+
+    def test_replay_history_times(self):
+        start = time.time()
+        self.write_log()
+        with open(self.path) as log_file:
+            records = [json.loads(line) for line in log_file]
+        logged = [record[5] for record in records[3:]]
+        self.assertTrue(start <= logged[0] <= logged[-1] <= time.time())
+        # Records logged without a time are kept at the time of replay
+        user_id = self.customer.user_id
+        with open(self.path, "a") as log_file:
+            log_file.write(json.dumps(["D", user_id, "Checking", 0, 1]))
+            log_file.write("\n")
+        users = Directory()
+        replay(self.path, users)
+        restored = users.get(user_id)
+        times = [
+            transaction.timestamp
+            for transaction in restored._accounts["Checking"][0].history
+        ]
+        self.assertListEqual(times[:2], [logged[0], logged[2]])
+        self.assertGreaterEqual(times[2], start)
+        retirement = restored._accounts["401K"][0]
+        self.assertEqual(retirement.history[0].timestamp, logged[1])
+
+    def test_replay_offset(self):
+        with TransactionLog(self.path) as journal:
+            journal.log_customer(self.customer)
+        with TransactionLog(self.path) as journal:
+            offset = journal.offset
+            journal.log_account(self.customer, "Checking", self.checking)
+        users = Directory()
+        users.add(Customer("John", "Doe", 70, self.customer.user_id))
+        end = replay(self.path, users, offset)
+        self.assertEqual(end, os.path.getsize(self.path))
+        restored = users.get(self.customer.user_id)
+        self.assertEqual(restored._accounts["Checking"][0].cents, 100000)
+
+    def test_replay_torn_record(self):
+        self.write_log()
+        size = os.path.getsize(self.path)
+        with open(self.path, "a") as log_file:
+            log_file.write('["D", 1, "Che')
+        users = Directory()
+        self.assertEqual(replay(self.path, users), size)
+        restored = users.get(self.customer.user_id)
+        self.assertEqual(restored._accounts["Checking"][0].cents, -23499)
+        # A complete record is still torn without its ending newline
+        with open(self.path, "a") as log_file:
+            log_file.write('cking", 0, 1]')
+        self.assertEqual(replay(self.path, Directory()), size)
+
+    def test_replay_corrupt_record(self):
+        self.write_log()
+        with open(self.path, "a") as log_file:
+            log_file.write("garbage\n")
+        with self.assertRaises(ValueError):
+            replay(self.path, Directory())
+
+
+if __name__ == "__main__":
+    unittest.main()
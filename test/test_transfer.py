@@ -0,0 +1,181 @@
+import threading
+import unittest
+
+from lib.account import Account
+from lib.account_store import AccountStore
+from lib.checking import Checking
+from lib.customer import Customer
+from lib.money import MAX_CENTS, Cents
+from lib.money_market_fund import MoneyMarket
+from lib.retirement import Retirement
+from lib.savings import Savings
+from lib.transfer import settle, transfer
+
+
+class TestTransfer(unittest.TestCase):
+    def setUp(self):
+        self.next_id = Customer.id
+        self.customer = Customer("John", "Doe", 30)
+
+    def tearDown(self):
+        Customer.id = self.next_id
+
+    def test_transfer(self):
+        source, destination = Savings(10), Checking(0)
+        self.assertEqual(transfer(source, destination, 4), 1)
+        self.assertEqual(source.cents, 600)
+        self.assertEqual(destination.cents, 400)
+
+    def test_transfer_refused(self):
+        source, destination = Savings(10), Checking(0)
+        self.assertEqual(transfer(source, destination, Cents(1001)), -1)
+        self.assertEqual(source.cents, 1000)
+        self.assertEqual(destination.cents, 0)
+        with self.assertRaises(ValueError):
+            transfer(source, destination, -1)
+
+    def test_transfer_overdraft(self):
+        source, destination = Checking(10), Savings(0)
+        self.assertEqual(transfer(source, destination, 20), 0)
+        self.assertEqual(source.cents, -4500)
+        self.assertEqual(destination.cents, 2000)
+
+    def test_transfer_overflow(self):
+        source = Savings(Cents(1000))
+        destination = Savings(Cents(MAX_CENTS - 50))
+        with self.assertRaises(OverflowError):
+            transfer(source, destination, Cents(100))
+        self.assertEqual(source.cents, 1000)
+        self.assertEqual(destination.cents, MAX_CENTS - 50)
+        self.assertIsNone(source._history)
+
+    def test_transfer_age(self):
+        retirement, savings = Retirement(100), Savings(0)
+        self.customer.add_account("401K", retirement)
+        self.assertEqual(transfer(retirement, savings, 1), -2)
+        self.assertEqual(transfer(retirement, savings, 1, age=70), 1)
+        self.customer.age = 67
+        self.assertEqual(transfer(retirement, savings, 1), 1)
+        self.assertEqual(savings.cents, 200)
+        with self.assertRaises(ValueError):
+            transfer(Retirement(1), savings, 1)
+
+    def test_transfer_between_customers(self):
+        other = Customer("Jane", "Doe", 31)
+        self.customer.add_account("Savings", Savings(10))
+        other.add_account("Checking", Checking(0))
+        transfer(
+            self.customer._accounts["Savings"][0],
+            other._accounts["Checking"][0],
+            3,
+        )
+        self.assertEqual(self.customer.total_cents, 700)
+        self.assertEqual(other.total_cents, 300)
+
+    def test_concurrent_transfers(self):
+        Account.thread_safe = True
+        self.addCleanup(setattr, Account, "thread_safe", False)
+        first, second = Savings(1000), Savings(1000)
+
+        def worker(source, destination):
+            for _ in range(500):
+                transfer(source, destination, Cents(1))
+
+        threads = [
+            threading.Thread(target=worker, args=pair)
+            for pair in [(first, second), (second, first)] * 4
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(first.cents + second.cents, 200000)
+        self.assertEqual(first.cents, 100000)
+
+
+class TestSettle(unittest.TestCase):
+    def setUp(self):
+        self.next_id = Customer.id
+        self.customer = Customer("John", "Doe", 30)
+
+    def tearDown(self):
+        Customer.id = self.next_id
+
+    def test_settle(self):
+        savings, checking = Savings(10), Checking(0)
+        self.customer.add_account("Savings", savings)
+        self.customer.add_account("Checking", checking)
+        codes = settle(
+            [
+                (checking, savings, 5),
+                (savings, checking, 12),
+                (savings, checking, 4),
+                (savings, savings, 100),
+            ]
+        )
+        # The overdraft fee applies, and later transfers see money
+        # moved by earlier ones
+        self.assertListEqual(codes, [0, 1, -1, 1])
+        self.assertEqual(savings.cents, 300)
+        self.assertEqual(checking.cents, -4000 + 1200)
+        # Each account was written once
+        self.assertEqual(len(savings.history), 1)
+        self.assertEqual(len(checking.history), 1)
+        self.assertEqual(self.customer.total_cents, 300 - 2800)
+
+    def test_settle_rules(self):
+        market_fund, retirement = MoneyMarket(10), Retirement(10)
+        self.customer.add_account("401K", retirement)
+        savings = Savings(0)
+        transfers = [(market_fund, savings, 1)] * 3
+        codes = settle(transfers + [(retirement, savings, 1)])
+        self.assertListEqual(codes, [1, 1, -2, -2])
+        self.assertEqual(market_fund._transaction_count, 2)
+        self.assertEqual(savings.cents, 200)
+        self.assertIsNone(retirement._history)
+
+    def test_settle_negative(self):
+        savings, checking = Savings(10), Checking(0)
+        with self.assertRaises(ValueError):
+            settle([(savings, checking, 1), (savings, checking, -1)])
+        self.assertEqual(savings.cents, 1000)
+
+    def test_settle_overflow(self):
+        source, destination = Savings(Cents(1000)), Savings(0)
+        full = Savings(Cents(MAX_CENTS - 50))
+        with self.assertRaises(OverflowError):
+            settle(
+                [
+                    (source, destination, Cents(100)),
+                    (source, full, Cents(100)),
+                ]
+            )
+        # Nothing was written back, not even the accounts in range
+        self.assertEqual(source.cents, 1000)
+        self.assertEqual(destination.cents, 0)
+        self.assertEqual(full.cents, MAX_CENTS - 50)
+
+    def test_settle_stored(self):
+        store = AccountStore()
+        source = store.add(1, "Money Market Fund", 10)
+        destination = store.add(2, "Checking", 0)
+        self.assertListEqual(settle([(source, destination, 4)]), [1])
+        self.assertEqual(store.balances.tolist(), [600, 400])
+        self.assertEqual(store.transaction_counts[0], 1)
+
+    def test_same_stored_row(self):
+        store = AccountStore()
+        checking = store.add(1, "Checking", 10)
+        view = store.account(checking.row)
+        self.assertIsNot(view, checking)
+        # Two views of one row are one account, so no overdraft fee
+        self.assertEqual(transfer(checking, view, 50), 1)
+        self.assertListEqual(
+            settle([(checking, view, 50), (view, checking, 5)]), [1, 1]
+        )
+        self.assertEqual(store.balances.tolist(), [1000])
+        self.assertEqual(len(checking.history), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()